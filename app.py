@@ -1,254 +1,703 @@
+import time  # Timestamps for the stroke filter and the startup report
 
-import os  # Used for handling file operations
-import time  # Time module to calculate FPS (Frames Per Second)
+STARTED_NS = time.perf_counter_ns()  # Origin of the startup timing report (before the heavier imports below)
+
+import os  # Checks for a saved stroke log
+import threading  # Background model loading
 
 import cv2  # OpenCV library for computer vision tasks
-import numpy as np  # NumPy for handling arrays and matrix operations
-import pyautogui  # PyAutoGUI to get screen dimensions and perform automated GUI tasks
+import numpy as np  # Blank frame for the model warm-up
+
+import helpers.buffers as BF  # Preallocated frame buffers
+import helpers.filters as FT  # Stroke smoothing and latency-compensating prediction
+import helpers.frame_sources as FS  # Webcam / video file / image sequence / synthetic frame sources
+import helpers.governor as GV  # Quality governor holding a target frame rate
+import helpers.instrumentation as IN  # Per-stage timing, FPS, stats snapshots and the startup report
+import helpers.painter as PT  # Per-hand brushes when several hands paint at once
+import helpers.persistence as PS  # Canvas checkpoints and crash recovery
+import helpers.pipeline as PL  # Threaded capture/inference pipeline
+import helpers.recorder as RC  # Background video recording and instant replay
+import helpers.strokes as SK  # Vector stroke log (undo, save/load, re-rendering at any size)
+import helpers.toolbar as TB  # Toolbar layout (header images, colors and slot ranges)
 
-import helpers.track_hands as TH  # Custom helper module for hand tracking
+# Not imported here, to keep startup short: pyautogui (see screen_size) and helpers.track_hands, which pulls in
+# MediaPipe (see PaintEngine._load_detector, run on a background thread while the window and camera open)
 
-# Get screen dimensions using PyAutoGUI
-screen_width, screen_height = pyautogui.size()
+IMPORTED_NS = time.perf_counter_ns()
 
 # Variables for brush and eraser settings
 brush_thickness = 15  # Brush thickness
 eraser_thickness = 100  # Eraser thickness
 
-# Time variables for calculating FPS
-currentT = 0
-previousT = 0
-
-# Path to the directory containing overlay/header images
-header_img = header_img = os.path.join(os.path.dirname(__file__), "header_images") 
-header_img_list = os.listdir(header_img)  # Get the list of images in the header folder
-overlay_image = []  # List to store loaded overlay images
-
-# Load all header images into overlay_image list
-for i in header_img_list:
-    image = cv2.imread(f"{header_img}/{i}")  # Read each image file
-    overlay_image.append(image)  # Add to list of overlays
-
-# Open webcam feed using OpenCV
-cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-
-# Set webcam properties: width, height, and FPS
-cap.set(3, screen_width)  # Width
-cap.set(4, screen_height)  # Height
-cap.set(cv2.CAP_PROP_FPS, 60)  # Frames per second
-
-# Set the default overlay image and brush color
-default_overlay = overlay_image[0]  # Initial header image
-draw_color = (81, 242, 56)  # Default color (leafy green)
+# Pipelined mode: capture and hand inference run on their own threads, overlapping with compose/display
+pipelined_mode = False
+pipeline_queue_size = 1  # Frames buffered between stages (older frames are dropped, never queued up)
+
+# Where frames come from: "webcam:0", a video file, an image folder or "synthetic" (see helpers/frame_sources.py)
+frame_source = "webcam:0"
+
+# Run without a window (frames go to a null sink), e.g. for benchmarks on machines without a display
+headless = False
+
+# Width of the frame given to hand detection (None = native camera frame); independent of the screen size
+inference_width = 640
+
+# Run full hand inference only every N frames and follow the hand with optical flow in between (1 = every frame)
+track_every = 1
+
+# Hand landmark model: "solutions" (MediaPipe's legacy Hands graph), "tasks" (MediaPipe Tasks HandLandmarker in
+# live-stream mode: inference runs asynchronously, overlapping capture) or "replay" (recorded landmarks); see
+# helpers/hand_backends.py. hand_backend_params go to the backend, e.g. {"model_path": "resources/hand_landmarker.task"}
+# for tasks or {"path": "hands.npz"} for replay.
+hand_backend = "solutions"
+hand_backend_params = {}
+# With max_num_hands = 1 drawing follows the first hand only. With more, every hand is an independent brush with its
+# own color, mode and stroke (hands keep their brush while they stay in view); see helpers/painter.py MultiHandPainter.
+max_num_hands = 1
+
+# Filter between the index finger tip and the brush: "none" (draw the raw tip), "one_euro" or "kalman" (see
+# helpers/filters.py)
+brush_filter = "none"
+brush_filter_params = {}  # e.g. {"min_cutoff": 1.0, "beta": 0.05} for one_euro, {"process_noise": 1e6} for kalman
+
+# Seconds the brush is predicted ahead to cancel capture + inference latency: a number, None, or "auto" to use the
+# measured p50 latency of the stages before drawing (capped at max_latency_compensation). Needs a brush_filter.
+latency_compensation = None  # e.g. "auto" with brush_filter = "one_euro"
+max_latency_compensation = 0.1
+
+# Canvas storage: "dense" (one screen-sized array) or "tiled" (tiles allocated only where there is ink, which saves
+# memory and compositing time at high resolutions)
+canvas_backend = "dense"
+
+# Strokes are also recorded as vectors: "z" undoes the last stroke, "s" saves them to stroke_file (loaded again at
+# startup if it exists) and "e" exports the drawing as a PNG of export_size, whatever the screen size
+stroke_file = "drawing.strokes"
+export_file = "drawing.png"
+export_size = (3840, 2160)
+
+# Crash recovery: the canvas is kept in canvas_file (memory-mapped with the dense backend), and every
+# checkpoint_interval seconds a background thread flushes it, saves the strokes to stroke_file and, if set, writes a
+# PNG to checkpoint_png. With resume_session, the next start picks the drawing up where it was left.
+canvas_file = None  # e.g. "canvas.npy"
+checkpoint_interval = 10.0
+checkpoint_png = None  # e.g. "autosave.png"
+resume_session = True
+
+# Recording: the composited output to record_file and/or the bare canvas to record_canvas_file (encoded on background
+# threads; frames are dropped, not waited for, when the encoder falls behind). With replay_seconds set (e.g. 10), "r"
+# writes the last replay_seconds of output to replay_file.
+record_file = None  # e.g. "session.mp4"
+record_canvas_file = None  # e.g. "canvas.mp4"
+record_fps = 30
+replay_seconds = 0  # e.g. 10; 0 = no instant replay buffer
+replay_file = "replay.mp4"
+
+# Per-stage timing: show it on screen and/or write periodic snapshots (".csv", or ".prom" for Prometheus text format)
+show_stage_overlay = False
+stats_file = None
+stats_interval = 5.0  # Seconds between snapshots
+
+# Print the startup timing report (imports, window, camera, model loading, first frame) once hands can be detected
+show_startup_report = True
+
+# Quality governor: with a target_fps, hand-drawing, max_num_hands (straight down to the number of hands in use),
+# model complexity, inference width and tracking between inferences are stepped down when frames take longer than
+# 1 / target_fps, and back up when there is headroom. Every change is printed.
+target_fps = None  # e.g. 30
+
+# Several cameras on one machine: list their sources (e.g. ["webcam:0", "webcam:1"], or video files) to paint on all
+# of them at once instead of on frame_source. Each is captured on its own thread, hand inference for all of them runs
+# on inference_workers processes (None = one per camera, up to one per core), and inference_policy picks the next
+# stream: "round_robin", or "priority" with one share per source in stream_priorities. The streams are tiled in one
+# window, or shown in a window each with multi_camera_layout = "windows". See helpers/multi_camera.py.
+frame_sources = []
+inference_policy = "round_robin"
+stream_priorities = None  # e.g. [2, 1, 1]: the first camera gets twice the inference rate of the others
+inference_workers = None
+multi_camera_layout = "tiled"
 
 # Define padding values for texts
 padding_left = 15  # Padding from the left edge
 padding_bottom = 30  # Padding from the bottom edge
 base_padding_right = 15  # Padding from the right edge
 
-# Initialize hand tracking using the custom helper module
-detector = TH.handDetector(min_detection_confidence=0.85)
-
-# Create a blank canvas (black background) matching the screen size for drawing
-image_canvas = np.zeros((screen_height, screen_width, 3), np.uint8)
-
-# Create a resizable window
-cv2.namedWindow("Play_with_Paint", cv2.WINDOW_NORMAL)
-
-# Variables to store previous coordinates (initially zero)
-xp = 0
-yp = 0
-
-count_1 = 0
-
-# Main loop for real-time hand tracking and drawing
-running = True
-while running:
-    ret, frame = cap.read()  # Capture frame from webcam
-    
-    if not ret:
-        break  # Exit loop if the webcam feed is not available
-
-    # Flip the frame horizontally to create a mirror effect
-    frame = cv2.flip(frame, 1)
-    
-    # Resize the frame to match screen dimensions (upscaling)
-    frame = cv2.resize(frame, (screen_width, screen_height))
-    
-    # Get the current frame's dimensions after resizing
-    frame_height, frame_width, _ = frame.shape
-    
-    # default frame dimensions (in pixels):
-    base_width = 640
-    base_height = 480
-    
-    # default value of font scale
-    base_font_scale = 0.5
-    
-    # calculate magnification factor for font size in proportion to the smaller dimension (height or width of the window/screen)
-    if frame_height < frame_width:
-        magnification_factor = frame_height/base_height
-    else:
-        magnification_factor = frame_width/base_width
-        
-    font_scale = base_font_scale*magnification_factor
-
-    # Resize the default overlay image to match the screen width and apply it to the frame
-    default_overlay_resized = cv2.resize(default_overlay, (screen_width, 125))
-    frame[0:125, 0:screen_width] = default_overlay_resized
-
-    # Detect hands in the frame and get the list of landmarks (finger positions)
-    frame = detector.findHands(frame, draw=True)
-    landmark_list = detector.findPosition(frame, draw=False)
-
-    # If landmarks are detected, proceed with gesture recognition
-    if len(landmark_list) != 0:
-        x1, y1 = landmark_list[8][1:]  # Index finger tip position
-        x2, y2 = landmark_list[12][1:]  # Middle finger tip position
-
-        # Get the status of each finger (up/down)
-        my_fingers = detector.fingerStatus()
-        
-        # placeholder for operation mode
-        current_mode = "DEFAULT Mode"
-
-        # Selection mode: both index and middle fingers are up
-        if my_fingers[1] and my_fingers[2]:
-            # Setting the mode
-            current_mode = "SELECT Mode"
-            
-            # Base width used for fixed pixel ranges (initial default)
-            base_screen_width = 1280  # Reference width for 720p resolution
-
-            # Calculate the magnification factor based on the current screen width
-            magnification_factor = screen_width / base_screen_width
-
-            # Adjust the pixel ranges based on the magnification factor
-            # These are the original pixel ranges (355-460, 475-560, etc.)
-            range_1_min = int(355 * magnification_factor)
-            range_1_max = int(460 * magnification_factor)
-            range_2_min = int(475 * magnification_factor)
-            range_2_max = int(560 * magnification_factor)
-            range_3_min = int(610 * magnification_factor)
-            range_3_max = int(685 * magnification_factor)
-            range_4_min = int(755 * magnification_factor)
-            range_4_max = int(865 * magnification_factor)
-            eraser_range_min = int(1060 * magnification_factor)
-            eraser_range_max = int(1220 * magnification_factor)
-
-            # Ensure your fingers are in the toolbar area
-            if y1 < 125:  
-                if range_1_min < x1 < range_1_max:
-                    default_overlay = overlay_image[0]
-                    draw_color = (255, 255, 0)  # Aqua blue
-                elif range_2_min < x1 < range_2_max:
-                    default_overlay = overlay_image[1]
-                    draw_color = (47, 225, 245)  # Yellow
-                elif range_3_min < x1 < range_3_max:
-                    default_overlay = overlay_image[2]
-                    draw_color = (197, 47, 245)  # Pink
-                elif range_4_min < x1 < range_4_max:
-                    default_overlay = overlay_image[3]
-                    draw_color = (81, 242, 56)  # Leafy green
-                elif eraser_range_min < x1 < eraser_range_max:
-                    default_overlay = overlay_image[4]
-                    draw_color = (0, 0, 0)  # Black (eraser mode)
-
-            # Draw a line between the tips of the index and middle fingers
-            cv2.line(frame, (x1, y1), (x2, y2), color=draw_color, thickness=3)
-
-        # Paint mode: only index finger is up
-        if my_fingers[1] and not my_fingers[2]:
-            # Setting the mode
-            current_mode = "PAINT Mode" 
-            
-            # Draw a circle at the tip of the index finger
-            cv2.circle(frame, (x1, y1), 15, draw_color, thickness=-1)
-
-            # Logic for drawing lines: use previous (xp, yp) and current (x1, y1) finger coordinates
-            if xp == 0 and yp == 0:  # Initial point check
-                xp, yp = x1, y1
-
-            # Eraser mode: draw thicker black lines
-            if draw_color == (0, 0, 0):
-                cv2.line(frame, (xp, yp), (x1, y1), color=draw_color, thickness=eraser_thickness)
-                cv2.line(image_canvas, (xp, yp), (x1, y1), color=draw_color, thickness=eraser_thickness)
-            else:  # Paint mode: draw colored lines
-                cv2.line(frame, (xp, yp), (x1, y1), color=draw_color, thickness=brush_thickness)
-                cv2.line(image_canvas, (xp, yp), (x1, y1), color=draw_color, thickness=brush_thickness)
-
-        # Calculate the width of the mode text
-        (mode_text_width, mode_text_height), baseline = cv2.getTextSize(current_mode, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)
-
-        # Adjust the right padding based on the text width
-        padding_right = max(base_padding_right, mode_text_width + 20)  # 20 is additional space for aesthetics
-        
-        mode_text_position = (frame_width - padding_right, frame_height - padding_bottom)  # Right bottom corner with a width of 200 for text
-        
-        # Display "SELECT Mode" on the screen
+# Stages between the camera and the drawing code, whose latency "auto" compensation cancels
+LATENCY_STAGES = ("capture", "flip", "detect", "resize", "header", "landmarks", "wait")
+
+WINDOW_NAME = "Play_with_Paint"
+
+
+def screen_size():
+    # Get screen dimensions using PyAutoGUI (imported here: it is slow to import and only needed once)
+    import pyautogui
+
+    return pyautogui.size()
+
+
+class PaintEngine:
+    def __init__(self, width=None, height=None, source=None, headless=None):
+        """
+        The painting app as an object: importing app.py has no side effects, and run() opens the window and the
+        camera right away while the hand model loads on a background thread (frames are shown without hand
+        detection until it is ready).
+
+        The settings at the top of this file apply; the arguments override the most common ones.
+
+        Args:
+        - width, height: Size of the rendered frames (default is None, which uses the screen size)
+        - source: Frame source description (default is None, which uses frame_source)
+        - headless: Run without a window (default is None, which uses the headless setting)
+        """
+        self.startup = IN.StartupProfile(origin_ns=STARTED_NS)
+        self.startup.add("imports", STARTED_NS, IMPORTED_NS)
+        self.width = width
+        self.height = height
+        self.source = frame_source if source is None else source
+        self.headless = headless if headless is not None else globals()["headless"]
+
+        # Rolling per-stage histograms (capture, flip, detect, ..., display) and the frame rate
+        self.instrumentation = IN.Instrumentation()
+
+        # Hand detection becomes available once the background loader is done
+        self.detector = None
+        self.detector_error = None
+        self.loader = None
+
+        # Detection quality settings, stepped by the quality governor when target_fps is set
+        self.inference_width = inference_width
+        self.draw_landmarks = True
+        self.governor = None
+        self.process_seconds = 0.0  # Duration of the last process_frame call
+
+        # Camera and screen-sized frames are written into preallocated buffers, so the loop allocates no new frames.
+        # Only in the sequential loop: pipelined stages drop stale frames instead of waiting for each other, so a
+        # producer can lap the consumer and would overwrite a frame still in use. There every frame is a new array.
+        self.buffers = None if pipelined_mode else BF.FramePool()
+
+        # Smooths the index finger tip (and predicts it ahead) before it is used for drawing
+        self.stroke_filter = FT.make_filter(brush_filter, **brush_filter_params)
+        if latency_compensation not in (None, "auto"):
+            self.stroke_filter.lead = latency_compensation
+
+        # Set the default brush color
+        self.draw_color = (81, 242, 56)  # Default color (leafy green)
+
+        # Tool state of the single hand, and with max_num_hands > 1 the brushes of all hands (created in start(),
+        # with the canvas)
+        self.painter = None
+        self.multi_hand = None
+
+        self.frame_count = 0
+        self.canvas_dirty = False  # Set by undo: the raster canvas is rebuilt from the strokes once, before the next composite
+        self.reported = False  # Whether the startup report was printed
+        self.pipeline = None
+        self.snapshot_writer = None
+        self.checkpointer = None
+        self.recorder = None
+        self.canvas_recorder = None
+        self.started = False
+
+    def start(self):
+        """
+        Opens the window, the camera and the canvas, and starts loading the hand model in the background.
+        """
+        # Load MediaPipe and build the hand model first, so it overlaps with everything below
+        self.loader = threading.Thread(target=self._load_detector, name="model-loader", daemon=True)
+        self.loader.start()
+
+        if self.width is None or self.height is None:
+            with self.startup.phase("screen size"):
+                self.width, self.height = screen_size()
+
+        # Where frames are shown: an OpenCV window, or nowhere when running headless
+        with self.startup.phase("window"):
+            self.display = FS.NullSink() if self.headless else cv2
+            # Create a resizable window
+            self.display.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+
+        # Load the toolbar header images and pre-resize them to the screen width, together with the slot lookup table
+        with self.startup.phase("toolbar"):
+            self.toolbar = TB.Toolbar().compile(self.width)
+            self.default_overlay = self.toolbar.headers[0]  # Initial header image (already resized to the screen width)
+
+        # Open the frame source (the webcam by default), asking for the screen size at 60 FPS
+        with self.startup.phase("camera"):
+            self.cap = FS.open_source(self.source, width=self.width, height=self.height, fps=60)
+
+        with self.startup.phase("canvas"):
+            # Create a blank canvas (black background) matching the screen size for drawing, along with its ink mask
+            self.compositor = PS.open_compositor(self.width, self.height, canvas_backend, canvas_file)
+            if self.compositor.resumed and not resume_session:
+                self.compositor.clear()
+            self.image_canvas = getattr(self.compositor, "canvas", None)  # The tiled backend has no single canvas array
+
+            # The same drawing as vector strokes, restored from the last saved session if there is one
+            self.stroke_log = SK.StrokeLog(self.width, self.height)
+            if resume_session and stroke_file and os.path.exists(stroke_file):
+                self.stroke_log = SK.StrokeLog.load(stroke_file).scaled(self.width, self.height)
+                if not self.compositor.resumed:  # A resumed canvas is at least as recent as the saved strokes
+                    self.compositor.load(self.stroke_log.render())
+
+            self.painter = PT.Painter(
+                self.width,
+                self.height,
+                draw_color=self.draw_color,
+                brush_thickness=brush_thickness,
+                eraser_thickness=eraser_thickness,
+                toolbar=self.toolbar,
+                compositor=self.compositor,
+                strokes=self.stroke_log,
+                stroke_filter=self.stroke_filter,
+            )
+            if max_num_hands > 1:
+                self.multi_hand = PT.MultiHandPainter(
+                    self.compositor,
+                    self.stroke_log,
+                    self.toolbar,
+                    draw_color=self.draw_color,
+                    brush_thickness=brush_thickness,
+                    eraser_thickness=eraser_thickness,
+                    make_filter=self._make_stroke_filter,
+                )
+
+        with self.startup.phase("background services"):
+            # Start the capture and inference threads when running pipelined
+            if pipelined_mode:
+                self.pipeline = PL.FramePipeline(self.read_frame, self.process_frame, queue_size=pipeline_queue_size).start()
+
+            # Write stats snapshots in the background
+            if stats_file:
+                self.snapshot_writer = IN.SnapshotWriter(self.instrumentation, stats_file, interval=stats_interval).start()
+
+            # Checkpoint the drawing in the background (the main loop never waits on disk)
+            if canvas_file or checkpoint_png:
+                self.checkpointer = PS.CanvasCheckpointer(
+                    self.compositor,
+                    interval=checkpoint_interval,
+                    canvas_path=canvas_file,
+                    png_path=checkpoint_png,
+                    stroke_log=self.stroke_log,
+                    stroke_path=stroke_file,
+                ).start()
+
+            # Start the recorders (the output one also keeps the instant replay buffer)
+            if record_file or replay_seconds:
+                self.recorder = RC.FrameRecorder(
+                    self.width, self.height, path=record_file, fps=record_fps, replay_seconds=replay_seconds
+                ).start()
+            if record_canvas_file:
+                self.canvas_recorder = RC.FrameRecorder(
+                    self.width, self.height, path=record_canvas_file, fps=record_fps
+                ).start()
+
+        self.started = True
+        return self
+
+    def _make_stroke_filter(self):
+        # A fingertip filter for one more brush, predicting as far ahead as the main one
+        stroke_filter = FT.make_filter(brush_filter, **brush_filter_params)
+        stroke_filter.lead = self.stroke_filter.lead
+        return stroke_filter
+
+    def _load_detector(self):
+        # Background thread: import MediaPipe, build the hand model and run it once, so the first real frame is fast
+        try:
+            with self.startup.phase("import mediapipe"):
+                import helpers.track_hands as TH  # Custom helper module for hand tracking
+
+            with self.startup.phase("build hand model"):
+                # Initialize hand tracking using the custom helper module
+                detector = TH.handDetector(
+                    max_num_hands=max_num_hands,
+                    min_detection_confidence=0.85,
+                    track_every=track_every,
+                    backend=hand_backend,
+                    backend_params=hand_backend_params,
+                )
+                backend = detector.hands  # Builds the model
+
+            with self.startup.phase("model warm-up"):
+                warm_width = inference_width or 640
+                backend.warm_up(np.zeros((warm_width * 9 // 16, warm_width, 3), np.uint8))
+
+            self.detector = detector
+        except Exception as exc:  # The app keeps running without hand detection
+            self.detector_error = exc
+            print("Hand model failed to load:", repr(exc))
+
+    def read_frame(self):
+        """
+        Capture stage: reads a frame from the webcam and mirrors it.
+        """
+        self.instrumentation.start()
+        # None until the first frame told the camera's frame size (and always None in pipelined mode)
+        buffer = self.buffers.get("capture") if self.buffers is not None else None
+        ret, frame = self.cap.read(buffer)
+        self.instrumentation.lap("capture")
+        if ret:
+            if self.buffers is not None and frame is not buffer:
+                self.buffers.keep("capture", frame)  # Read into from now on
+            # Flip the frame horizontally to create a mirror effect (in place)
+            cv2.flip(frame, 1, dst=frame)
+            self.instrumentation.lap("flip")
+        return ret, frame
+
+    def measured_latency(self):
+        """
+        Returns the p50 latency (seconds) from capture to drawing, summed over the timed stages, capped at
+        max_latency_compensation.
+        """
+        stages = self.instrumentation.snapshot()["stages"]
+        latency = sum(stages[name]["p50"] for name in LATENCY_STAGES if name in stages) / 1000
+        return min(latency, max_latency_compensation)
+
+    def process_frame(self, frame):
+        """
+        Inference stage: runs hand detection on the camera frame, then scales it to the screen and puts the toolbar on it.
+
+        Returns:
+        - (frame, landmark_list, my_fingers, hands) where my_fingers is empty if no hand was found (or the model is
+          still loading). With max_num_hands > 1, landmark_list and my_fingers stay empty and hands holds every hand:
+          (landmarks in screen coordinates, finger status, handedness); otherwise hands is None.
+        """
+        started = time.perf_counter()
+        # Laps are per thread: when pipelined, this runs on the inference thread, which would otherwise time its
+        # wait on the capture queue as part of "detect"
+        self.instrumentation.start()
+
+        # Detect hands on the camera frame (downscaled to inference_width), not on the upscaled screen-sized frame
+        detector = self.detector
+        if detector is not None:
+            detector.findHands(frame, draw=False, inference_width=self.inference_width)
+        self.instrumentation.lap("detect")
+
+        # Resize the frame to match screen dimensions (upscaling)
+        screen = self.buffers.get("screen", (self.height, self.width, 3)) if self.buffers is not None else None
+        frame = cv2.resize(frame, (self.width, self.height), dst=screen)
+        self.instrumentation.lap("resize")
+
+        # Apply the (pre-resized) header image to the frame
+        frame[0:self.toolbar.height, 0:self.width] = self.default_overlay
+        self.instrumentation.lap("header")
+
+        landmark_list, my_fingers, hands = [], [], None
+        if detector is not None:
+            # Draw the hand and map the normalized landmarks into screen coordinates
+            if self.draw_landmarks:
+                frame = detector.drawHands(frame)
+            if self.multi_hand is not None:
+                # Every hand at once (on this thread too, before the next detection replaces them)
+                hands = detector.findLandmarks(frame), detector.fingersUp(), detector.findHandedness()
+            else:
+                landmark_list = detector.findPosition(frame, draw=False)
+
+                # Get the status of each finger (up/down); this has to happen on the same thread as findPosition
+                my_fingers = detector.fingerStatus() if len(landmark_list) != 0 else []
+        self.instrumentation.lap("landmarks")
+        self.process_seconds = time.perf_counter() - started
+        return frame, landmark_list, my_fingers, hands
+
+    def step(self):
+        """
+        Renders and shows one frame, and handles the keys.
+
+        Returns:
+        - False when the app should stop (source ended, window closed, Esc or q pressed)
+        """
+        instrumentation = self.instrumentation
+        compositor = self.compositor
+        stroke_log = self.stroke_log
+        toolbar = self.toolbar
+
+        if self.pipeline is not None:
+            result = self.pipeline.get()  # Newest processed frame (stale ones were dropped by the pipeline)
+            if result is None:
+                return False  # Exit loop if the webcam feed is not available
+            instrumentation.lap("wait")  # Time the display loop spent waiting for the pipeline
+            frame_started = time.perf_counter()
+        else:
+            ret, frame = self.read_frame()  # Capture frame from webcam
+
+            if not ret:
+                return False  # Exit loop if the webcam feed is not available
+
+            frame_started = time.perf_counter()  # Work time starts after the wait for the camera
+            result = self.process_frame(frame)
+
+        frame, landmark_list, my_fingers, hands = result
+
+        # Get the current frame's dimensions after resizing
+        frame_height, frame_width, _ = frame.shape
+
+        # default frame dimensions (in pixels):
+        base_width = 640
+        base_height = 480
+
+        # default value of font scale
+        base_font_scale = 0.5
+
+        # calculate magnification factor for font size in proportion to the smaller dimension (height or width of the window/screen)
+        if frame_height < frame_width:
+            magnification_factor = frame_height/base_height
+        else:
+            magnification_factor = frame_width/base_width
+
+        font_scale = base_font_scale*magnification_factor
+
+        # Re-measure the pipeline latency every 30 frames and predict the brush that far ahead
+        self.frame_count += 1
+        if latency_compensation == "auto" and self.frame_count % 30 == 0:
+            self.stroke_filter.lead = self.measured_latency()
+            if self.multi_hand is not None:
+                for brush in self.multi_hand.brushes.values():
+                    brush.filter.lead = self.stroke_filter.lead
+
+        # Several hands: each one paints with its own brush, all segments drawn in one pass
+        if hands is not None:
+            self.multi_hand.update(frame, *hands)
+            self.default_overlay = self.multi_hand.default_overlay  # The header shows the last selected color
+
+        # One hand: its gestures pick the color and paint (helpers/painter.py); the mode text is drawn here, scaled
+        # to the screen
+        else:
+            current_mode = self.painter.update(frame, landmark_list, my_fingers, overlay=False)
+            self.default_overlay = self.painter.default_overlay
+
+            if len(landmark_list) != 0:
+                # Calculate the width of the mode text
+                (mode_text_width, mode_text_height), baseline = cv2.getTextSize(current_mode, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)
+
+                # Adjust the right padding based on the text width
+                padding_right = max(base_padding_right, mode_text_width + 20)  # 20 is additional space for aesthetics
+
+                mode_text_position = (frame_width - padding_right, frame_height - padding_bottom)  # Right bottom corner with a width of 200 for text
+
+                # Display "SELECT Mode" on the screen
+                cv2.putText(
+                    frame,
+                    current_mode,
+                    mode_text_position,
+                    fontFace=cv2.FONT_HERSHEY_DUPLEX,
+                    color=(0, 255, 255),
+                    thickness=2,
+                    fontScale=font_scale,
+                )
+
+        instrumentation.lap("draw")
+
+        # After an undo, rebuild the canvas from the remaining strokes (from the newest cached layer, not from scratch)
+        if self.canvas_dirty:
+            compositor.load(stroke_log.render())
+            if self.multi_hand is not None:
+                self.multi_hand.redraw()  # Strokes still being drawn are not in the log yet
+            self.canvas_dirty = False
+
+        # Put the drawing on top of the frame; only the inked area is touched (iv)
+        frame = compositor.composite(frame)
+        instrumentation.lap("composite")
+
+        # Calculate FPS (frames per second) over the last few hundred frames
+        instrumentation.tick()
+        fps = instrumentation.fps()
+
+        # Calculate dynamic positions for text
+        fps_text_position = (padding_left, frame_height - padding_bottom)  # Left bottom corner
+
+        # Display FPS on the screen
         cv2.putText(
             frame,
-            current_mode,
-            mode_text_position,
-            fontFace=cv2.FONT_HERSHEY_DUPLEX,
-            color=(0, 255, 255),
-            thickness=2,
+            "Render FPS:" + str(int(fps)),
+            fps_text_position,
+            fontFace=cv2.FONT_HERSHEY_SIMPLEX,
             fontScale=font_scale,
+            color=(0, 0, 255),
+            thickness=2,
+        )
+
+        # Until the background loader is done, say why no hand is detected
+        if self.detector is None:
+            cv2.putText(
+                frame,
+                "Loading hand model..." if self.detector_error is None else "Hand model unavailable",
+                (padding_left, toolbar.height + int(40 * magnification_factor)),
+                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                fontScale=font_scale,
+                color=(0, 255, 255),
+                thickness=2,
+            )
+
+        # In pipelined mode, also show the queue depths and how many stale frames each stage dropped
+        if self.pipeline is not None:
+            stats = self.pipeline.stats()
+            cv2.putText(
+                frame,
+                "Queue c:{capture_queue} i:{output_queue} Dropped c:{capture_dropped} i:{output_dropped}".format(**stats),
+                (padding_left, fps_text_position[1] - int(30 * magnification_factor)),
+                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                fontScale=font_scale,
+                color=(0, 0, 255),
+                thickness=2,
+            )
+
+        # Optionally show the per-stage latencies, slowest stage in red
+        if show_stage_overlay:
+            instrumentation.draw_overlay(frame, origin=(padding_left, 125 + int(30 * magnification_factor)), font_scale=font_scale)
+
+        # Hand the frame (and the bare canvas) to the recorders: a copy into their ring buffers, no encoding here
+        if self.recorder is not None:
+            self.recorder.write(frame)
+        if self.canvas_recorder is not None:
+            self.canvas_recorder.write(self.image_canvas if self.image_canvas is not None else compositor.to_array())
+        instrumentation.lap("record")
+
+        # Display the final frame with drawings and overlays
+        self.display.imshow(WINDOW_NAME, frame)
+        self._report_startup()
+
+        # Wait for 1 ms and check if 'Esc' or 'q' is pressed to exit the loop
+        key = self.display.waitKey(1) & 0xFF
+        instrumentation.lap("display")
+        if key == 27 or key == ord("q"):  # 'Esc' key or 'q' to quit
+            return False
+        if key == ord("z"):  # Undo the last stroke
+            self.canvas_dirty = stroke_log.undo() is not None or self.canvas_dirty
+        elif key == ord("s") and stroke_file:  # Save the strokes
+            stroke_log.save(stroke_file)
+        elif key == ord("e"):  # Export the drawing, re-rendered at export_size
+            cv2.imwrite(export_file, stroke_log.render(*export_size))
+        elif key == ord("r") and self.recorder is not None:  # Instant replay: dump the last replay_seconds of output
+            self.recorder.dump_replay(replay_file)
+
+        # Let the governor adjust detection quality to the time this frame took (in pipelined mode the slower of
+        # the display loop and the inference stage limits the frame rate)
+        if target_fps and self.detector is not None:
+            if self.governor is None:
+                self.governor = self._make_governor(self.detector)
+            work = time.perf_counter() - frame_started
+            if self.pipeline is not None:
+                work = max(work, self.process_seconds)
+            self.governor.update(work, hands=len(self.detector.landmarks))
+
+        # Check if the window was closed (using getWindowProperty)
+        # WARNING: Here, use cv2.getWindowProperty(...) only after cv2.waitkey(...) has been called (v)
+        if self.display.getWindowProperty(WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1:
+            return False
+        return True
+
+    def _make_governor(self, detector):
+        # Knobs in the order they are stepped down: the cheapest loss of quality first
+        hands = detector.max_num_hands
+        track = detector.track_every
+        width = self.inference_width
+        knobs = [
+            GV.Knob("draw_landmarks", [True, False], lambda value: setattr(self, "draw_landmarks", value)),
+            GV.Knob(
+                "max_num_hands",
+                [hands] + [n for n in (2, 1) if n < hands],
+                lambda value: detector.setOptions(max_num_hands=value),
+                allowed=lambda value: value >= self.governor.hands_in_use(),
+                greedy=True,
+            ),
+        ]
+        # Only the solutions backend has a model complexity; elsewhere the knob would just reload the model
+        if hand_backend == "solutions":
+            knobs.append(
+                GV.Knob(
+                    "model_complexity",
+                    [detector.modelComplex] + ([0] if detector.modelComplex > 0 else []),
+                    lambda value: detector.setOptions(modelComplexity=value),
+                )
+            )
+        knobs.append(
+            GV.Knob(
+                "inference_width",
+                [width] + [w for w in (480, 320) if width is None or w < width],
+                lambda value: setattr(self, "inference_width", value),
+            )
         )
-        
-        # Before drawing the next frame, update the coordinates from previous finger position to the latest.
-        # WARNING: Keep this indented out of this condition: "if my_fingers[1] and not my_fingers[2]:" (i)
-        xp, yp = x1, y1 
-
-    # Convert the drawing canvas to grayscale
-    img_gray = cv2.cvtColor(image_canvas, cv2.COLOR_BGR2GRAY)
-
-    # Apply thresholding to create a binary inverse image
-    _, imginv = cv2.threshold(img_gray, 50, 255, cv2.THRESH_BINARY_INV)
-    imginv = cv2.cvtColor(imginv, cv2.COLOR_GRAY2BGR)  # Convert back to 3-channel color
-
-    # Resize the inverted image to match the screen dimensions
-    imginv = cv2.resize(imginv, (screen_width, screen_height))
-
-    # Combine the frame and the inverse binary image using bitwise operations
-    frame2 = cv2.bitwise_and(frame, imginv) # (iv) -> (a), (b) 
-    frame = cv2.bitwise_or(frame2, image_canvas) # (iv) -> (c), (d)
-
-    # Calculate FPS (frames per second)
-    currentT = time.time()
-    fps = 1 / (currentT - previousT)
-    previousT = currentT
-    
-    # Calculate dynamic positions for text
-    fps_text_position = (padding_left, frame_height - padding_bottom)  # Left bottom corner
-
-    # Display FPS on the screen
-    cv2.putText(
-        frame,
-        "Render FPS:" + str(int(fps)),
-        fps_text_position,
-        fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-        fontScale=font_scale,
-        color=(0, 0, 255),
-        thickness=2,
-    )
-
-    # Display the final frame with drawings and overlays
-    cv2.imshow("Play_with_Paint", frame)
-
-    # Wait for 1 ms and check if 'Esc' or 'q' is pressed to exit the loop
-    key = cv2.waitKey(1) & 0xFF
-    if key == 27 or key == ord("q"):  # 'Esc' key or 'q' to quit
-        break
-
-    # Check if the window was closed (using getWindowProperty)
-    # WARNING: Here, use cv2.getWindowProperty(...) only after cv2.waitkey(...) has been called (v)
-    if cv2.getWindowProperty("Play_with_Paint", cv2.WND_PROP_VISIBLE) < 1:
-        running = False
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+        # An asynchronous backend is never tracked (see handDetector.findHands)
+        if not detector.asynchronous:
+            knobs.append(
+                GV.Knob(
+                    "track_every",
+                    [track] + [n for n in (2, 3) if n > track],
+                    lambda value: detector.setOptions(track_every=value),
+                )
+            )
+        return GV.QualityGovernor(target_fps, knobs)
+
+    def _report_startup(self):
+        # Milestones of the first shown frame and the first frame with hand detection, then the report (once)
+        if self.reported:
+            return
+        if self.frame_count == 1:
+            self.startup.mark("first frame")
+        if self.detector is not None or self.detector_error is not None:
+            self.startup.mark("first frame with detection" if self.detector is not None else "model failed")
+            self.reported = True
+            if show_startup_report:
+                print("Startup timing:\n" + self.startup.report())
+
+    def run(self):
+        """
+        Starts the app (if start() was not called yet) and runs the main loop until it is closed.
+        """
+        if not self.started:
+            self.start()
+        try:
+            # Main loop for real-time hand tracking and drawing
+            while self.step():
+                pass
+        finally:
+            self.close()
+
+    def close(self):
+        # Stop the capture/inference threads before releasing the webcam they read from
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            print("Pipeline stats:", self.pipeline.stats())
+
+        if self.governor is not None:
+            print("Quality governor:", self.governor.stats())
+
+        # Write the last stats snapshot
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.stop()
+
+        # Last checkpoint of the drawing
+        if self.checkpointer is not None:
+            self.checkpointer.stop()
+
+        # Finish the recordings (frames still in the ring buffers are written first)
+        for rec in (self.recorder, self.canvas_recorder):
+            if rec is not None:
+                rec.stop()
+                print("Recorder stats:", rec.stats())
+
+        # Release the webcam and close all OpenCV windows
+        self.cap.release()
+        self.display.destroyAllWindows()
+
+
+def main():
+    if frame_sources:
+        import helpers.multi_camera as MC  # Multi-camera runner (not imported otherwise: it pulls in MediaPipe)
+
+        runner = MC.MultiCameraRunner(
+            frame_sources,
+            priorities=stream_priorities,
+            policy=inference_policy,
+            workers=inference_workers,
+            inference_width=inference_width,
+            layout=multi_camera_layout,
+            headless=headless,
+        )
+        print("Multi-camera stats:", runner.run())
+        return
+    PaintEngine().run()
+
+
+if __name__ == "__main__":
+    main()
 
 # for NOTES (i) to (v) refer "notes.txt" file inside "resources" directory
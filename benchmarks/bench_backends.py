@@ -0,0 +1,106 @@
+"""
+Hand landmark backends compared (helpers/hand_backends.py): MediaPipe solutions, Tasks live stream and replay.
+
+The frames of a source are fed to handDetector.findHands at a camera-like frame rate, once per backend. The solutions
+run is the reference: its landmarks are also saved as the recording the replay backend serves. For every backend the
+report gives the time findHands blocks the render loop (p50/p95/p99), the frame rate the loop reached, the fraction of
+frames with a new result, and the mean index finger tip error against the reference (in pixels, over frames where
+both found a hand), as JSON, one object per backend.
+
+The tasks backend needs the HandLandmarker model bundle (see hand_backends.TASK_MODEL_PATH); without it, its line
+says it was skipped.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_backends --source recording.mp4 [--frames 300] [--fps 30] [--model-path ...]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from helpers import frame_sources as FS
+from helpers import hand_backends as HB
+from helpers import instrumentation as IN
+from helpers import track_hands as TH
+
+
+def load_frames(spec, limit):
+    frames = []
+    with FS.open_source(spec, width=1280, height=720) as source:
+        while len(frames) < limit:
+            ret, frame = source.read()
+            if not ret:
+                break
+            frames.append(frame)
+    return frames
+
+
+def run(frames, backend, backend_params, fps, inference_width):
+    detector = TH.handDetector(max_num_hands=1, backend=backend, backend_params=backend_params)
+    detector.hands.warm_up(np.zeros((360, 640, 3), np.uint8))
+    clock = IN.Instrumentation(window=len(frames))
+    results, tips, fresh = [], [], 0
+    interval = 1.0 / fps
+    started = time.perf_counter()
+    for frame in frames:
+        frame_started = time.perf_counter()
+        with clock.stage("findHands"):
+            detector.findHands(frame, draw=False, inference_width=inference_width)
+        fresh += detector.updated
+        results.append((detector.landmarks, detector.handedness, detector.scores))
+        hands = detector.findLandmarks(frame)
+        tips.append(hands[0, 8, :2] if len(hands) else None)
+        remaining = interval - (time.perf_counter() - frame_started)
+        if remaining > 0:
+            time.sleep(remaining)  # The rest of the frame (capture, drawing, display)
+    elapsed = time.perf_counter() - started
+    detector.hands.close()
+    summary = {"backend": backend, "loop_fps": round(len(frames) / elapsed, 1)}
+    summary["new_results"] = round(fresh / len(frames), 3)
+    summary.update({f"findHands_{key}": value for key, value in clock.snapshot()["stages"]["findHands"].items()})
+    return summary, results, tips
+
+
+def tip_error(reference, tips):
+    distances = [
+        float(np.linalg.norm(np.asarray(ref, np.float32) - np.asarray(tip, np.float32)))
+        for ref, tip in zip(reference, tips)
+        if ref is not None and tip is not None
+    ]
+    return round(float(np.mean(distances)), 2) if distances else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="synthetic", help="Video file, image folder or 'synthetic' (no hands)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate the frames are fed at")
+    parser.add_argument("--inference-width", type=int, default=640)
+    parser.add_argument("--model-path", default=HB.TASK_MODEL_PATH, help="HandLandmarker .task bundle")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    summary, reference_results, reference_tips = run(frames, "solutions", {}, args.fps, args.inference_width)
+    summary["tip_error_px"] = 0.0
+    print(json.dumps(summary))
+
+    if os.path.exists(args.model_path):
+        summary, _, tips = run(frames, "tasks", {"model_path": args.model_path}, args.fps, args.inference_width)
+        summary["tip_error_px"] = tip_error(reference_tips, tips)
+        print(json.dumps(summary))
+    else:
+        print(json.dumps({"backend": "tasks", "skipped": f"no model at {args.model_path}"}))
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "hands.npz")
+        HB.save_recording(path, reference_results)
+        summary, _, tips = run(frames, "replay", {"path": path}, args.fps, args.inference_width)
+        summary["tip_error_px"] = tip_error(reference_tips, tips)
+        print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
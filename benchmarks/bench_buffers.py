@@ -0,0 +1,139 @@
+"""
+Per-frame allocations of the render loop: a new array for every stage versus preallocated buffers (helpers/buffers.py).
+
+Both variants run the frame path of app.py on synthetic frames: capture, mirror, downscale for inference, RGB and
+grayscale conversion, upscale to the screen, toolbar header and canvas composite. The "allocating" variant returns
+a new array from every OpenCV call, as app.py used to; the "pooled" variant writes into FramePool buffers with dst=
+outputs and in-place operations, as app.py and handDetector.findHands do now. MediaPipe inference itself is left out:
+it is the same in both variants.
+
+The report gives, per variant and resolution, the p50/p95 time per frame and, measured in a second pass with
+tracemalloc, the number of arrays and the megabytes allocated per frame (after a few warm-up frames), as JSON.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_buffers [--frames 200] [--resolutions 1080p 4k] [--inference-width 640]
+"""
+import argparse
+import json
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from helpers import buffers as BF
+from helpers import compositor as CP
+from helpers import frame_sources as FS
+from helpers import instrumentation as IN
+from helpers import toolbar as TB
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+WARMUP_FRAMES = 5
+
+
+class FramePath:
+    def __init__(self, mode, width, height, inference_width):
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.inference_width = inference_width
+        self.inference_height = max(1, round(height * inference_width / width))
+        self.toolbar = TB.Toolbar().compile(width)
+        self.compositor = CP.CanvasCompositor(width, height)
+        for i in range(8):  # Some ink, so the composite has work to do
+            y = height // 3 + i * height // 20
+            self.compositor.line((width // 5, y), (4 * width // 5, y + height // 10), (81, 242, 56), 15)
+        self.pool = BF.FramePool()  # Camera and screen frames (app.py)
+        self.inference_pool = BF.FramePool(depth=2)  # Inference frames (handDetector)
+
+    def allocating(self, source):
+        ret, camera = source.read()
+        if not ret:
+            return None
+        flipped = cv2.flip(camera, 1)
+        small = cv2.resize(flipped, (self.inference_width, self.inference_height), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        screen = cv2.resize(flipped, (self.width, self.height))
+        screen[0:self.toolbar.height, 0:self.width] = self.toolbar.headers[0]
+        frame = self.compositor.composite(screen)
+        return camera, flipped, small, rgb, gray, frame  # Everything stays alive until the frame is done
+
+    def pooled(self, source):
+        buffer = self.pool.get("capture")
+        ret, camera = source.read(buffer)
+        if not ret:
+            return None
+        if camera is not buffer:
+            self.pool.keep("capture", camera)
+        cv2.flip(camera, 1, dst=camera)
+        small = self.inference_pool.get("small", (self.inference_height, self.inference_width, 3))
+        cv2.resize(camera, (self.inference_width, self.inference_height), dst=small, interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.inference_pool.get("rgb", small.shape))
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self.inference_pool.get("gray", small.shape[:2]))
+        screen = cv2.resize(camera, (self.width, self.height), dst=self.pool.get("screen", (self.height, self.width, 3)))
+        screen[0:self.toolbar.height, 0:self.width] = self.toolbar.headers[0]
+        frame = self.compositor.composite(screen)
+        return camera, small, rgb, gray, frame
+
+    def step(self, source):
+        return self.allocating(source) if self.mode == "allocating" else self.pooled(source)
+
+
+def time_frames(path, width, height, frames):
+    source = FS.SyntheticSource(width, height)
+    clock = IN.Instrumentation(window=frames)
+    for _ in range(WARMUP_FRAMES):
+        path.step(source)
+    for _ in range(frames):
+        with clock.stage("frame"):
+            path.step(source)
+    return clock.snapshot()["stages"]["frame"]
+
+
+def count_allocations(path, width, height, frames):
+    # Arrays (NumPy's tracemalloc domain) alive at the end of each frame that were not there at its start
+    source = FS.SyntheticSource(width, height)
+    for _ in range(WARMUP_FRAMES):
+        path.step(source)
+    numpy_only = [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)]
+    arrays = 0
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            before = tracemalloc.take_snapshot().filter_traces(numpy_only)
+            result = path.step(source)
+            after = tracemalloc.take_snapshot().filter_traces(numpy_only)
+            for stat in after.compare_to(before, "traceback"):
+                if stat.count_diff > 0:
+                    arrays += stat.count_diff
+                    allocated += stat.size_diff
+            del result
+    finally:
+        tracemalloc.stop()
+    return arrays / frames, allocated / frames / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--resolutions", nargs="+", default=["1080p", "4k"], choices=list(RESOLUTIONS))
+    parser.add_argument("--inference-width", type=int, default=640)
+    args = parser.parse_args()
+
+    for name in args.resolutions:
+        width, height = RESOLUTIONS[name]
+        for mode in ("allocating", "pooled"):
+            path = FramePath(mode, width, height, args.inference_width)
+            timing = time_frames(path, width, height, args.frames)
+            arrays, megabytes = count_allocations(path, width, height, min(args.frames, 50))
+            result = {"mode": mode, "resolution": f"{width}x{height}"}
+            result.update({"frame_p50_ms": timing["p50"], "frame_p95_ms": timing["p95"]})
+            result.update({"arrays_per_frame": round(arrays, 2), "mb_per_frame": round(megabytes, 2)})
+            result["mb_per_s_at_p50"] = round(megabytes * 1000 / timing["p50"], 1) if timing["p50"] else None
+            result["pool_mb"] = round((path.pool.nbytes() + path.inference_pool.nbytes()) / 1e6, 1)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
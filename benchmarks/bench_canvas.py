@@ -0,0 +1,102 @@
+"""
+Compares the dense and tiled canvas backends (helpers/compositor.py) as the amount of ink grows.
+
+For each resolution, the same random-walk strokes are drawn into both backends until the inked fraction of the
+screen reaches each coverage level (plus one case with a single diagonal line across the screen). The report gives
+the canvas memory, the number of allocated tiles and the p50/p95 time to composite the canvas onto a frame, as
+JSON, one object per backend, resolution and coverage level.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_canvas [--resolutions 1080p 4k] [--coverage 0 0.001 0.01 0.05 0.2 0.5]
+                                      [--repeat 50] [--tile-size 128]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from helpers import compositor as CP
+from helpers import instrumentation as IN
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+
+def random_walk(rng, width, height, thickness=15):
+    # Endless segments of a brush wandering over the screen, starting a new stroke now and then
+    point = rng.integers(0, (width, height))
+    while True:
+        if rng.random() < 0.02:
+            point = rng.integers(0, (width, height))
+        step = rng.integers(-60, 61, 2)
+        nxt = np.clip(point + step, 0, (width - 1, height - 1))
+        yield (int(point[0]), int(point[1])), (int(nxt[0]), int(nxt[1])), thickness
+        point = nxt
+
+
+def time_composite(compositor, frame, repeat):
+    clock = IN.Instrumentation(window=repeat)
+    for _ in range(repeat):
+        with clock.stage("composite"):
+            compositor.composite(frame)
+    return clock.snapshot()["stages"]["composite"]
+
+
+def measure(backends, width, height, frame, coverage, repeat):
+    dense = backends["dense"]
+    inked = float(dense.mask.mean())
+    results = []
+    for name, compositor in backends.items():
+        timing = time_composite(compositor, frame, repeat)
+        results.append({
+            "backend": name,
+            "resolution": f"{width}x{height}",
+            "coverage": coverage,
+            "inked_fraction": round(inked, 4),
+            "memory_mb": round(compositor.memory_bytes() / 2 ** 20, 2),
+            "tiles": len(compositor.tiles) if name == "tiled" else None,
+            "composite_p50_ms": timing["p50"],
+            "composite_p95_ms": timing["p95"],
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=["1080p", "4k"], choices=list(RESOLUTIONS))
+    parser.add_argument("--coverage", nargs="+", type=float, default=[0.0, 0.001, 0.01, 0.05, 0.2, 0.5])
+    parser.add_argument("--repeat", type=int, default=50, help="composites timed per measurement")
+    parser.add_argument("--tile-size", type=int, default=128)
+    args = parser.parse_args()
+
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+        # A single line from corner to corner: tiny ink area, but a screen-sized bounding box
+        backends = {
+            "dense": CP.CanvasCompositor(width, height),
+            "tiled": CP.TiledCanvasCompositor(width, height, tile_size=args.tile_size),
+        }
+        for compositor in backends.values():
+            compositor.line((0, height - 1), (width - 1, 0), color=(81, 242, 56), thickness=15)
+        for result in measure(backends, width, height, frame, "diagonal", args.repeat):
+            print(json.dumps(result))
+
+        backends = {
+            "dense": CP.CanvasCompositor(width, height),
+            "tiled": CP.TiledCanvasCompositor(width, height, tile_size=args.tile_size),
+        }
+        segments = random_walk(rng, width, height)
+        for coverage in sorted(args.coverage):
+            while backends["dense"].mask.mean() < coverage:
+                for _ in range(50):
+                    pt1, pt2, thickness = next(segments)
+                    for compositor in backends.values():
+                        compositor.line(pt1, pt2, color=(81, 242, 56), thickness=thickness)
+            for result in measure(backends, width, height, frame, coverage, args.repeat):
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Bandwidth and encode cost of streaming a drawing: full JPEG frames (VideoCamera.get_frame) versus canvas deltas
+(helpers/delta_stream.py).
+
+A scripted painting session (pen strokes in changing colors, pauses, the eraser, an undo) is drawn on a 1280x720
+canvas over synthetic video at a camera-like frame rate. Each frame is streamed both ways: the composited frame as a
+JPEG (quality 95, VideoCamera's default encoder), and as delta messages with and without the low-rate video layer.
+The report gives the bytes per frame, the bit rate and the encode time per frame, as JSON, one object per mode. The
+delta messages are also applied the way the browser viewer does, and the result is compared with the server's canvas.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_delta [--frames 300] [--fps 30] [--video-fps 2]
+"""
+import argparse
+import json
+import struct
+import time
+
+import cv2
+import numpy as np
+
+from helpers import compositor as CP
+from helpers import delta_stream as DS
+from helpers import encoder as EC
+from helpers import frame_sources as FS
+
+WIDTH, HEIGHT = 1280, 720
+COLORS = [(81, 242, 56), (255, 0, 255), (0, 255, 255), (0, 0, 255), (0, 0, 0)]
+
+
+def pen(frame_index):
+    """
+    Scripted brush: (point, color, thickness) for a frame of the session, or None while the pen is up.
+    """
+    stroke, step = divmod(frame_index, 60)
+    if step >= 45:
+        return None  # Pause between strokes
+    t = frame_index / 30.0
+    point = (int(WIDTH * (0.5 + 0.4 * np.sin(1.3 * t))), int(HEIGHT * (0.55 + 0.35 * np.sin(2.1 * t + stroke))))
+    color = COLORS[stroke % len(COLORS)]
+    return point, color, 100 if color == (0, 0, 0) else 15
+
+
+def replay_viewer(messages, canvas):
+    # Applies messages like resources/delta_viewer.html: keyframes replace the canvas, patches their rectangle
+    for data in messages:
+        kind = data[0]
+        a, b = struct.unpack_from("<HH", data, 5)
+        image = cv2.imdecode(np.frombuffer(data, np.uint8, offset=9), cv2.IMREAD_UNCHANGED)
+        if kind == DS.KEYFRAME:
+            canvas[:] = image
+        elif kind == DS.PATCH:
+            canvas[b:b + image.shape[0], a:a + image.shape[1]] = image
+
+
+def run(mode, frames, fps, video_fps):
+    source = FS.SyntheticSource(WIDTH, HEIGHT)
+    compositor = CP.CanvasCompositor(WIDTH, HEIGHT)
+    jpeg = EC.EncoderPool(workers=1)
+    delta = DS.CanvasDeltaEncoder(compositor, video_fps=video_fps)
+    viewer = np.zeros((HEIGHT, WIDTH, 4), np.uint8)
+    total_bytes, encode_ms = 0, []
+    previous = None
+    interval = 1.0 / fps
+    for index in range(frames):
+        frame_started = time.perf_counter()
+        _, frame = source.read()
+        rect, reset = None, False
+        brush = pen(index)
+        if brush is not None:
+            point, color, thickness = brush
+            rect = compositor.line(previous or point, point, color, thickness)
+            previous = point
+        else:
+            previous = None
+        if index == frames // 2:
+            compositor.clear()  # An undo of everything: the canvas is replaced
+            reset = True
+        compositor.composite(frame)
+
+        started = time.perf_counter()
+        if mode == "jpeg":
+            total_bytes += jpeg.encode(frame).size
+        else:
+            messages = [data for _, data in delta.poll(rect, reset, frame)]
+            total_bytes += sum(len(data) for data in messages)
+        encode_ms.append((time.perf_counter() - started) * 1000)
+        if mode != "jpeg":
+            replay_viewer(messages, viewer)
+
+        remaining = interval - (time.perf_counter() - frame_started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    result = {
+        "mode": mode,
+        "bytes_per_frame": round(total_bytes / frames),
+        "kbit_per_s": round(total_bytes * 8 / 1000 * fps / frames, 1),
+        "encode_ms_p50": round(float(np.percentile(encode_ms, 50)), 3),
+        "encode_ms_mean": round(float(np.mean(encode_ms)), 3),
+    }
+    if mode != "jpeg":
+        result.update(delta.stats())
+        result["viewer_matches_canvas"] = bool(np.array_equal(viewer, compositor.patch()))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--video-fps", type=float, default=2.0, help="Rate of the video layer in the delta+video mode")
+    args = parser.parse_args()
+
+    print(json.dumps(run("jpeg", args.frames, args.fps, 0)))
+    print(json.dumps(run("delta", args.frames, args.fps, 0)))
+    print(json.dumps(run("delta+video", args.frames, args.fps, args.video_fps)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Replays a finger-tip trajectory through the landmark filters and measures lag and jitter.
+
+By default the trajectory is synthetic: a figure eight with pauses, sampled at 30 FPS, where every observation is
+the true position from --latency ms earlier plus Gaussian jitter (the pipeline delay and the landmark noise). As the
+truth is known, the report gives the error against the current true position, the effective lag (the time shift
+that best aligns output and truth; negative means the output runs ahead) and the jitter while the finger is still.
+
+A recorded trajectory can be replayed instead with --replay points.npy, an (n, 3) array of (t seconds, x, y). There
+is no truth then, so lag is measured against the raw points and jitter is the RMS of the second difference.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_filters [--latency 60] [--noise 2.5] [--replay points.npy]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from helpers import filters as FT
+
+
+def synthetic_trajectory(seconds=12.0, fps=30.0, latency=0.06, noise=2.5, seed=0):
+    t = np.arange(0, seconds, 1 / fps)
+
+    def truth(times):
+        # Alternate 2 s of figure-eight motion with 1 s pauses
+        phase = np.minimum(np.mod(times, 3.0), 2.0) + 2.0 * np.floor(times / 3.0)
+        return np.stack([640 + 400 * np.sin(phase * 1.5), 360 + 200 * np.sin(phase * 3.0)], axis=1)
+
+    rng = np.random.default_rng(seed)
+    observed = truth(t - latency) + rng.normal(0, noise, (len(t), 2))
+    still = np.mod(t, 3.0) > 2.0 + latency + 0.1  # Well inside a pause, after the delayed motion has stopped
+    return t, observed, truth, still
+
+
+def best_shift(t, output, reference_fn, shifts):
+    errors = [np.sqrt(np.mean(np.sum((output - reference_fn(t - shift)) ** 2, axis=1))) for shift in shifts]
+    return shifts[int(np.argmin(errors))]
+
+
+def interpolator(t, points):
+    def at(times):
+        return np.stack([np.interp(times, t, points[:, 0]), np.interp(times, t, points[:, 1])], axis=1)
+    return at
+
+
+def replay(filter_, t, observed):
+    filter_.reset()
+    return np.array([filter_.update(point, ti) for ti, point in zip(t, observed)], np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=60.0, help="capture + inference latency in ms")
+    parser.add_argument("--noise", type=float, default=2.5, help="landmark jitter (pixels, standard deviation)")
+    parser.add_argument("--replay", help="recorded (t, x, y) trajectory as a .npy file")
+    args = parser.parse_args()
+
+    latency = args.latency / 1000
+    configs = [
+        ("none", {}),
+        ("one_euro", {}),
+        ("one_euro", {"lead": latency}),
+        ("kalman", {}),
+        ("kalman", {"lead": latency}),
+    ]
+    shifts = np.arange(-0.1, 0.25, 0.002)
+
+    if args.replay:
+        recorded = np.load(args.replay)
+        t, observed = recorded[:, 0], recorded[:, 1:3]
+        truth, still = interpolator(t, observed), None
+    else:
+        t, observed, truth, still = synthetic_trajectory(latency=latency, noise=args.noise)
+
+    for name, params in configs:
+        output = replay(FT.make_filter(name, **params), t, observed)
+        result = {"filter": name, **params, "lag_ms": round(1000 * best_shift(t, output, truth, shifts), 1)}
+        if args.replay:
+            result["jitter_px"] = round(float(np.sqrt(np.mean(np.sum(np.diff(output, 2, axis=0) ** 2, axis=1)))), 2)
+        else:
+            error = np.linalg.norm(output - truth(t), axis=1)
+            result["rms_error_px"] = round(float(np.sqrt(np.mean(error ** 2))), 2)
+            # Spread of the output around its mean within each pause (still segments are 3 s apart)
+            pauses = np.floor(t[still] / 3.0)
+            variances = [np.var(output[still][pauses == p], axis=0).sum() for p in np.unique(pauses)]
+            result["jitter_px"] = round(float(np.sqrt(np.mean(variances))), 2)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
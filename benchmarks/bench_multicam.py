@@ -0,0 +1,142 @@
+"""
+Several cameras on one machine (helpers/multi_camera.py): one app-style loop per camera versus one runner with
+shared, scheduled inference.
+
+Every stream plays its own looping video file at a camera-like frame rate. In the "separate_loops" mode, each stream
+gets the app.py treatment: a thread with its own handDetector, reading, detecting and painting one frame after the
+other. The "round_robin" and "priority" modes use MultiCameraRunner: captures on their own threads, inference on a
+shared InferencePool of --workers processes, the scheduler choosing the next stream (with --priorities for the
+priority mode). After a warm-up, frames are counted for a fixed time. The report gives the aggregate throughput
+(rendered frames per second over all streams) and, per stream, the frame rate and the capture-to-render latency
+(p50/p95 ms), as JSON, one object per mode.
+
+With video files, the separate loops simply play slower when they cannot keep up, and only read the frames they
+process. The runner reads every stream at --fps like live cameras deliver them, keeping only the newest frame.
+
+Without --videos, short synthetic clips are written to a temporary folder first (no hands in them, so every frame
+runs MediaPipe's full palm detection).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_multicam [--videos a.mp4 b.mp4] [--streams 3] [--priorities 2 1 1] [--seconds 10]
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+
+import cv2
+
+from benchmarks.bench_sessions import write_synthetic_videos
+from helpers import frame_sources as FS
+from helpers import instrumentation as IN
+from helpers import multi_camera as MC
+from helpers import painter as PT
+from helpers import track_hands as TH
+
+WIDTH, HEIGHT = 960, 540
+
+
+def separate_loops(videos, seconds, warmup, fps, inference_width):
+    # One independent loop per camera, like running app.py once per camera
+    stop = threading.Event()
+    counts = [0] * len(videos)
+    latencies = [IN.RollingHistogram() for _ in videos]
+
+    def loop(index):
+        source = FS.VideoFileSource(videos[index], loop=True)
+        detector = TH.handDetector(min_detection_confidence=0.85)
+        painter = PT.Painter(WIDTH, HEIGHT)
+        next_read = time.perf_counter()
+        while not stop.is_set():
+            ret, frame = source.read()
+            captured_ns = time.perf_counter_ns()
+            frame = cv2.flip(frame, 1)
+            detector.findHands(frame, draw=False, inference_width=inference_width)
+            landmark_list = detector.findPosition(frame, draw=False)
+            painter.update(frame, landmark_list, detector.fingerStatus() if landmark_list else [])
+            painter.composite(frame)
+            latencies[index].add(time.perf_counter_ns() - captured_ns)
+            counts[index] += 1
+            next_read = max(next_read + 1.0 / fps, time.perf_counter() - 1.0 / fps)
+            delay = next_read - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        source.release()
+
+    threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(len(videos))]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    before = list(counts)
+    time.sleep(seconds)
+    rates = [(count - b) / seconds for count, b in zip(counts, before)]
+    stop.set()
+    for thread in threads:
+        thread.join(5.0)
+    return rates, [histogram.summary() for histogram in latencies]
+
+
+def shared_pool(videos, seconds, warmup, fps, inference_width, policy, priorities, workers):
+    sources = [FS.VideoFileSource(path, loop=True) for path in videos]
+    runner = MC.MultiCameraRunner(
+        sources, priorities, policy, workers, WIDTH, HEIGHT, inference_width, fps=fps, headless=True
+    ).start()
+    try:
+        deadline = time.perf_counter() + warmup
+        while time.perf_counter() < deadline:
+            runner.step()
+        before = [stream.rendered for stream in runner.streams]
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            runner.step()
+        rates = [(stream.rendered - b) / seconds for stream, b in zip(runner.streams, before)]
+        return rates, [stream.latency.summary() for stream in runner.streams]
+    finally:
+        runner.close()
+
+
+def report(mode, rates, latencies, priorities):
+    return {
+        "mode": mode,
+        "throughput_fps": round(sum(rates), 2),
+        "streams": [
+            {
+                "priority": priority,
+                "fps": round(rate, 2),
+                "latency_p50_ms": latency and latency["p50"],
+                "latency_p95_ms": latency and latency["p95"],
+            }
+            for rate, latency, priority in zip(rates, latencies, priorities)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", nargs="+", help="video files to play (default: generated synthetic clips)")
+    parser.add_argument("--streams", type=int, default=3)
+    parser.add_argument("--priorities", nargs="+", type=float, default=[2, 1, 1])
+    parser.add_argument("--workers", type=int, help="default: one per stream, up to one per core")
+    parser.add_argument("--fps", type=float, default=30.0, help="Camera frame rate the videos are played at")
+    parser.add_argument("--inference-width", type=int, default=640)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        videos = args.videos or write_synthetic_videos(folder, args.streams, WIDTH, HEIGHT)
+        videos = [videos[i % len(videos)] for i in range(args.streams)]
+        priorities = [args.priorities[i] if i < len(args.priorities) else 1 for i in range(args.streams)]
+        timing = (args.seconds, args.warmup, args.fps, args.inference_width)
+
+        rates, latencies = separate_loops(videos, *timing)
+        print(json.dumps(report("separate_loops", rates, latencies, [None] * args.streams)))
+        for policy in MC.POLICIES:
+            rates, latencies = shared_pool(videos, *timing, policy, priorities, args.workers)
+            weights = priorities if policy == "priority" else [1] * len(rates)
+            print(json.dumps(report(policy, rates, latencies, weights)))
+
+
+if __name__ == "__main__":
+    main()
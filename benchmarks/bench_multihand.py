@@ -0,0 +1,104 @@
+"""
+Per-frame cost of multi-hand painting (helpers/painter.py MultiHandPainter) as hands are added, with all segments
+rasterized in one batched pass versus one line call per segment, and how stable the hand ids stay.
+
+Synthetic hands (1 to --max-hands) follow their own paths over a 1280x720 canvas, each painting in its own color with
+a pause every second. Like the detector, the hands come in a shuffled order every frame, and now and then a hand is
+missed for a frame. Each frame's update (tracking, gestures, rasterization) and composite are timed. The report gives
+the milliseconds per frame (p50 and mean), the cost relative to one hand and the number of times a hand changed id,
+as JSON, one object per hand count and mode.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_multihand [--frames 600] [--max-hands 4] [--backend dense]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from helpers import compositor as CP
+from helpers import painter as PT
+from helpers import strokes as SK
+from helpers import toolbar as TB
+
+WIDTH, HEIGHT = 1280, 720
+COLORS = [(81, 242, 56), (255, 0, 255), (0, 255, 255), (0, 0, 255)]
+PAINT = np.array([0, 1, 0, 0, 0], np.uint8)  # Only the index finger up
+REST = np.array([0, 0, 0, 0, 0], np.uint8)
+
+
+def hand(tip):
+    # Pixel landmarks of a hand pointing up with its index finger tip at tip
+    landmarks = np.zeros((21, 3), np.int32)
+    landmarks[:, 0] = tip[0]
+    landmarks[:, 1] = tip[1] + 120
+    landmarks[8, :2] = tip
+    return landmarks
+
+
+def detections(frame_index, count, rng, miss_rate):
+    # The hands the detector reports this frame: (true hand indices, landmarks, fingers, handedness), shuffled
+    t = frame_index / 30.0
+    found = [k for k in range(count) if rng.random() >= miss_rate]
+    rng.shuffle(found)
+    landmarks, fingers, labels = [], [], []
+    for k in found:
+        phase = 2 * np.pi * k / count
+        tip = (
+            int(WIDTH * (0.5 + 0.35 * np.sin(0.9 * t + phase))),
+            int(HEIGHT * (0.45 + 0.25 * np.sin(1.7 * t + 2 * phase))),
+        )
+        landmarks.append(hand(tip))
+        fingers.append(REST if frame_index % 30 >= 25 else PAINT)
+        labels.append("Left" if k % 2 else "Right")  # Paths cross: even and odd hands are the two hands of a person
+    landmarks = np.array(landmarks, np.int32).reshape(-1, 21, 3)
+    return found, landmarks, np.array(fingers, np.uint8).reshape(-1, 5), labels
+
+
+def run(count, batched, frames, backend, miss_rate=0.03):
+    compositor = CP.make_compositor(WIDTH, HEIGHT, backend)
+    painter = PT.MultiHandPainter(compositor, SK.StrokeLog(WIDTH, HEIGHT), TB.Toolbar().compile(WIDTH), batched=batched)
+    rng = np.random.default_rng(0)
+    frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    times, assigned, switches = [], {}, 0
+    for index in range(frames):
+        found, landmarks, fingers, labels = detections(index, count, rng, miss_rate)
+        frame[:] = 64
+        started = time.perf_counter()
+        brushes = painter.update(frame, landmarks, fingers, labels)
+        compositor.composite(frame)
+        times.append((time.perf_counter() - started) * 1000)
+        for k, brush in zip(found, brushes):
+            brush.color = COLORS[k % len(COLORS)]
+            if assigned.setdefault(k, brush.id) != brush.id:
+                switches += 1
+                assigned[k] = brush.id
+    return {
+        "hands": count,
+        "mode": "batched" if batched else "per_segment",
+        "ms_p50": round(float(np.percentile(times, 50)), 3),
+        "ms_mean": round(float(np.mean(times)), 3),
+        "id_switches": switches,
+        "strokes": len(painter.stroke_log),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--max-hands", type=int, default=4)
+    parser.add_argument("--backend", default="dense", help="Canvas backend: dense or tiled")
+    args = parser.parse_args()
+
+    for batched in (False, True):
+        baseline = None
+        for count in range(1, args.max_hands + 1):
+            result = run(count, batched, args.frames, args.backend)
+            baseline = baseline or result["ms_mean"]
+            result["relative_to_one_hand"] = round(result["ms_mean"] / baseline, 2)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
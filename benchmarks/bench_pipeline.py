@@ -0,0 +1,170 @@
+"""
+Headless benchmark of the two rendering pipelines: the app.py loop (PaintEngine.step) and VideoCamera.get_frame (web
+front-end).
+
+Frames come from a frame source (synthetic by default, or a video file / image folder) and go to a null sink, so no
+webcam or display is needed. Each pipeline runs at 720p, 1080p and 4K output; per-stage p50/p95/p99 latencies (ms)
+and the overall frame rate are printed as JSON, one object per pipeline and resolution, so results can be compared
+across commits.
+
+The app pipeline is app.py's own PaintEngine, headless, with the settings at the top of app.py (a saved drawing is
+not resumed). --set overrides any of them, e.g. --set pipelined_mode=True max_num_hands=2 brush_filter='"one_euro"'
+target_fps=30, so every path of the loop can be measured. The hand model is loaded before timing starts. Synthetic
+frames have no hands in them: with --replay-hands the model is replaced by a recorded hand drawing a figure eight,
+so the drawing and compositing stages get ink (the detect stage then only costs the replay).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline [--frames 200] [--source synthetic] [--resolutions 720p 1080p 4k]
+                                        [--pipelines app web] [--set NAME=VALUE ...] [--replay-hands]
+                                        [--output results.json]
+"""
+import argparse
+import ast
+import contextlib
+import json
+import math
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import app
+from helpers import frame_sources as FS
+from helpers import instrumentation as IN
+from helpers.web_helper import VideoCamera
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+
+def stroke_point(i):
+    # A finger tip moving along a figure eight (normalized coordinates), so the canvas keeps getting ink
+    t = i / 15.0
+    return 0.5 + 0.3 * math.sin(t), 0.55 + 0.25 * math.sin(2 * t)
+
+
+def replayed_hand(frames):
+    # Recorded landmarks of a hand painting (only the index finger up) along the figure eight
+    recording = []
+    for i in range(frames):
+        x, y = stroke_point(i)
+        landmarks = np.zeros((1, 21, 3), np.float32)
+        landmarks[0, :, :2] = x, y + 0.15  # Palm and folded fingers below the tip
+        landmarks[0, 8, :2] = x, y  # Index finger tip
+        recording.append((landmarks, ["Right"], [0.99]))
+    return recording
+
+
+def bench_app(source, width, height, frames, warmup=10):
+    """
+    Runs app.py's PaintEngine headless for warmup + frames frames; the stage breakdown comes from the engine's own
+    instrumentation.
+    """
+    # The engine's reports (startup timing, governor decisions, closing stats) would break the JSON lines on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        engine = app.PaintEngine(width, height, source=source, headless=True)
+        engine.start()
+        if isinstance(engine.cap, (FS.VideoFileSource, FS.ImageSequenceSource)):
+            engine.cap.loop = True
+        engine.loader.join()  # Time the loop with hand detection, not the frames shown while the model loads
+        try:
+            for _ in range(warmup):
+                engine.step()
+            engine.instrumentation = IN.Instrumentation(window=frames)
+            done = 0
+            started = time.perf_counter()
+            while done < frames and engine.step():
+                done += 1
+            elapsed = time.perf_counter() - started
+            return engine.instrumentation.snapshot()["stages"], done / elapsed
+        finally:
+            engine.close()
+
+
+def bench_web(source, width, height, frames, inference_width):
+    """
+    Runs VideoCamera.get_frame per frame; the stage breakdown comes from the camera's own instrumentation.
+    """
+    camera = VideoCamera(source=source, width=width, height=height, inference_width=inference_width)
+    camera.instrumentation = IN.Instrumentation(window=frames)
+    t_prev = time.time()
+    done = 0
+    started = time.perf_counter()
+    for _ in range(frames):
+        data, t_prev = camera.get_frame(t_prev=t_prev)
+        if data is None:
+            break
+        done += 1
+    elapsed = time.perf_counter() - started
+    camera.encoder.shutdown()
+    return camera.instrumentation.snapshot()["stages"], done / elapsed
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--source", default="synthetic", help='"synthetic", a video file or an image folder')
+    parser.add_argument("--camera", default="1280x720", help="size of synthetic camera frames")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--pipelines", nargs="+", default=["app", "web"], choices=["app", "web"])
+    parser.add_argument("--inference-width", type=int, default=640)
+    parser.add_argument("--set", nargs="+", default=[], metavar="NAME=VALUE", help="app.py settings (Python literals)")
+    parser.add_argument("--replay-hands", action="store_true", help="replay a painting hand instead of the model")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    camera_width, camera_height = (int(v) for v in args.camera.lower().split("x"))
+    settings = {"resume_session": False, "inference_width": args.inference_width}
+    if args.replay_hands:
+        settings.update(hand_backend="replay", hand_backend_params={"frames": replayed_hand(600)})
+    for assignment in args.set:
+        name, _, value = assignment.partition("=")
+        if not hasattr(app, name):
+            parser.error(f"app.py has no setting {name!r}")
+        settings[name] = ast.literal_eval(value)
+    for name, value in settings.items():
+        setattr(app, name, value)
+
+    commit = git_commit()
+    app_source = f"synthetic:{camera_width}x{camera_height}" if args.source == "synthetic" else args.source
+    results = []
+    for pipeline in args.pipelines:
+        for name in args.resolutions:
+            width, height = RESOLUTIONS[name]
+            if pipeline == "app":
+                stages, fps = bench_app(app_source, width, height, args.frames)
+            else:
+                source = FS.open_source(args.source, width=camera_width, height=camera_height)
+                if isinstance(source, (FS.VideoFileSource, FS.ImageSequenceSource)):
+                    source.loop = True
+                stages, fps = bench_web(source, width, height, args.frames, args.inference_width)
+                source.release()
+            result = {
+                "commit": commit,
+                "pipeline": pipeline,
+                "resolution": name,
+                "frames": args.frames,
+                "fps": round(fps, 1),
+                "stages": stages,
+            }
+            if pipeline == "app":
+                result["settings"] = {name: value for name, value in settings.items() if name != "hand_backend_params"}
+            results.append(result)
+            print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
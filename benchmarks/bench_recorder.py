@@ -0,0 +1,82 @@
+"""
+Cost of recording in the render loop: cv2.VideoWriter.write inline versus FrameRecorder (helpers/recorder.py).
+
+A loop renders synthetic frames at a target frame rate and records every one of them, first with an inline
+VideoWriter, then through the recorder's ring buffer. The report gives the p50/p95/p99 time the loop spent in the
+recording call, the frame rate the loop reached and the frames the recorder dropped, as JSON, one object per mode
+and resolution. It ends with an instant replay dump.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_recorder [--frames 300] [--fps 30] [--resolutions 720p 1080p]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+
+from helpers import frame_sources as FS
+from helpers import instrumentation as IN
+from helpers import recorder as RC
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+
+def run(mode, path, width, height, frames, fps):
+    source = FS.SyntheticSource(width, height, frames=frames)
+    clock = IN.Instrumentation(window=frames)
+    writer = recorder = None
+    if mode == "inline":
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    else:
+        recorder = RC.FrameRecorder(width, height, path=path, fps=fps, replay_seconds=5).start()
+    interval = 1.0 / fps
+    started = time.perf_counter()
+    while True:
+        frame_started = time.perf_counter()
+        ret, frame = source.read()
+        if not ret:
+            break
+        with clock.stage("record"):
+            if writer is not None:
+                writer.write(frame)
+            else:
+                recorder.write(frame)
+        clock.tick()
+        remaining = interval - (time.perf_counter() - frame_started)
+        if remaining > 0:
+            time.sleep(remaining)  # The rest of the frame budget (detection, display, ...)
+    elapsed = time.perf_counter() - started
+    result = {"mode": mode, "resolution": f"{width}x{height}", "loop_fps": round(frames / elapsed, 1)}
+    result.update(clock.snapshot()["stages"]["record"])
+    if recorder is not None:
+        replay_path = os.path.splitext(path)[0] + "_replay.mp4"
+        dump_started = time.perf_counter()
+        recorder.dump_replay(replay_path).join()
+        result["replay_dump_s"] = round(time.perf_counter() - dump_started, 2)
+        recorder.stop()
+        result.update(recorder.stats())
+    else:
+        writer.release()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--resolutions", nargs="+", default=["720p", "1080p"], choices=list(RESOLUTIONS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        for name in args.resolutions:
+            width, height = RESOLUTIONS[name]
+            for mode in ("inline", "recorder"):
+                path = os.path.join(folder, f"{mode}_{name}.mp4")
+                print(json.dumps(run(mode, path, width, height, args.frames, args.fps)))
+
+
+if __name__ == "__main__":
+    main()
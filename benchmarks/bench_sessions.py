@@ -0,0 +1,98 @@
+"""
+Throughput and fairness of the multi-session server (helpers/sessions.py) with video-file sources.
+
+Each run hosts N painting sessions, each reading its own looping video file, with hand inference on a pool of W
+worker processes. After a warm-up, frames are counted for a fixed time. The report gives the total frame rate, the
+rate of each session, Jain's fairness index over the sessions (1.0 means every session got the same rate) and the
+p50 inference time per worker, as JSON, one object per (workers, sessions) pair.
+
+Without --videos, short synthetic clips are written to a temporary folder first (no hands in them, so every frame
+runs MediaPipe's full palm detection).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_sessions [--videos a.mp4 b.mp4] [--workers 1 4] [--sessions 1 2 4 8] [--seconds 10]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+
+from helpers import frame_sources as FS
+from helpers import sessions as SS
+
+
+def write_synthetic_videos(folder, count, width, height, frames=150, fps=30):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"session{i}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        source = FS.SyntheticSource(width, height, frames=frames, seed=i)
+        while True:
+            ret, frame = source.read()
+            if not ret:
+                break
+            writer.write(frame)
+        writer.release()
+        paths.append(path)
+    return paths
+
+
+def jain_index(rates):
+    if not rates or not any(rates):
+        return None
+    return sum(rates) ** 2 / (len(rates) * sum(r * r for r in rates))
+
+
+def run(videos, workers, n_sessions, seconds, warmup, width, height, inference_width):
+    manager = SS.SessionManager(workers=workers, inference_width=inference_width)
+    try:
+        sessions = [
+            manager.add_session(FS.VideoFileSource(videos[i % len(videos)], loop=True), width, height)
+            for i in range(n_sessions)
+        ]
+        time.sleep(warmup)  # Model loading in the workers, first frames
+        before = [session.frames for session in sessions]
+        started = time.perf_counter()
+        time.sleep(seconds)
+        elapsed = time.perf_counter() - started
+        rates = [(session.frames - b) / elapsed for session, b in zip(sessions, before)]
+        pool = manager.pool.stats()
+    finally:
+        manager.stop()
+    return {
+        "workers": workers,
+        "sessions": n_sessions,
+        "total_fps": round(sum(rates), 2),
+        "session_fps": [round(rate, 2) for rate in rates],
+        "fairness": round(jain_index(rates), 3) if jain_index(rates) else None,
+        "infer_p50_ms": {name: s["p50"] for name, s in pool["inference"].items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", nargs="+", help="video files to play (default: generated synthetic clips)")
+    parser.add_argument("--workers", nargs="+", type=int, default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--size", default="1280x720", help="rendered frame size of each session")
+    parser.add_argument("--inference-width", type=int, default=640)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    with tempfile.TemporaryDirectory() as folder:
+        videos = args.videos or write_synthetic_videos(folder, max(args.sessions), width, height)
+        for workers in args.workers:
+            for n_sessions in args.sessions:
+                result = run(
+                    videos, workers, n_sessions, args.seconds, args.warmup, width, height, args.inference_width
+                )
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
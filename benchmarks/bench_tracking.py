@@ -0,0 +1,98 @@
+"""
+Accuracy versus speed of handDetector's detect-then-track mode on a recorded sequence.
+
+Every frame of the sequence is first run through full MediaPipe inference; those landmarks are the reference. The
+sequence is then replayed with track_every = N (full inference every N frames, optical flow in between), and the time
+per findHands call is compared with the landmark error against the reference.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_tracking --source recording.mp4 [--every 1 2 3 5 10] [--frames 300]
+
+The source can be a video file or an image folder (see helpers/frame_sources.py); it should show a moving hand.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from helpers import frame_sources as FS
+from helpers import track_hands as TH
+
+
+def load_frames(spec, limit):
+    frames = []
+    with FS.open_source(spec) as source:
+        while len(frames) < limit:
+            ret, frame = source.read()
+            if not ret:
+                break
+            frames.append(frame)
+    return frames
+
+
+def run(frames, track_every, inference_width):
+    detector = TH.handDetector(min_detection_confidence=0.85, track_every=track_every)
+    landmarks, times_ns, inferred = [], [], 0
+    for frame in frames:
+        started = time.perf_counter_ns()
+        detector.findHands(frame, draw=False, inference_width=inference_width)
+        times_ns.append(time.perf_counter_ns() - started)
+        landmarks.append(detector.findLandmarks(frame))  # Pixel coordinates of the source frame
+        inferred += detector.inferred
+    return landmarks, np.asarray(times_ns) / 1e6, inferred / len(frames)
+
+
+def errors(reference, tracked):
+    """
+    Per-landmark pixel error for every frame where both runs found a hand (each tracked hand is matched to the
+    reference hand with the nearest wrist), plus the fraction of frames where both agree on whether a hand is present.
+    """
+    all_errors, tip_errors, agree = [], [], 0
+    for ref, trk in zip(reference, tracked):
+        agree += (len(ref) > 0) == (len(trk) > 0)
+        if len(ref) == 0 or len(trk) == 0:
+            continue
+        for hand in trk:
+            match = ref[np.argmin(np.linalg.norm(ref[:, 0, :2] - hand[0, :2], axis=1))]
+            distance = np.linalg.norm((hand[:, :2] - match[:, :2]).astype(np.float32), axis=1)
+            all_errors.extend(distance)
+            tip_errors.append(distance[8])  # Index finger tip: the brush
+    return np.asarray(all_errors), np.asarray(tip_errors), agree / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", required=True, help="video file or image folder with a moving hand")
+    parser.add_argument("--every", type=int, nargs="+", default=[1, 2, 3, 5, 10])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--inference-width", type=int, default=640)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        parser.error(f"no frames could be read from {args.source}")
+    reference, reference_ms, _ = run(frames, 1, args.inference_width)
+
+    for track_every in args.every:
+        if track_every == 1:
+            tracked, times_ms, inferred = reference, reference_ms, 1.0
+        else:
+            tracked, times_ms, inferred = run(frames, track_every, args.inference_width)
+        all_errors, tip_errors, agreement = errors(reference, tracked)
+        print(json.dumps({
+            "track_every": track_every,
+            "frames": len(frames),
+            "inference_fraction": round(inferred, 3),
+            "mean_ms": round(float(times_ms.mean()), 3),
+            "p95_ms": round(float(np.percentile(times_ms, 95)), 3),
+            "speedup": round(float(reference_ms.mean() / times_ms.mean()), 2),
+            "presence_agreement": round(agreement, 3),
+            "mean_error_px": round(float(all_errors.mean()), 2) if len(all_errors) else None,
+            "p95_error_px": round(float(np.percentile(all_errors, 95)), 2) if len(all_errors) else None,
+            "index_tip_mean_error_px": round(float(tip_errors.mean()), 2) if len(tip_errors) else None,
+        }))
+
+
+if __name__ == "__main__":
+    main()
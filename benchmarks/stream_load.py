@@ -0,0 +1,132 @@
+"""
+Local load test for helpers/stream_server.py.
+
+Starts the MJPEG server on a free port with a synthetic 1280x720 producer (a moving gradient encoded with
+cv2.imencode, i.e. the same encode cost as VideoCamera.get_frame but without a webcam), connects N simulated viewers
+and reports the produced frame rate, the frame rate each viewer receives and the aggregate throughput.
+
+Usage (from the repository root):
+    python -m benchmarks.stream_load [--clients 1 10 50] [--seconds 5] [--slow 0] [--fps 30]
+                                     [--encoder-workers 2] [--target-ms 5]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import cv2
+import numpy as np
+
+from helpers.encoder import AdaptiveJpegController, EncoderPool
+from helpers.stream_server import StreamServer
+
+
+def synthetic_producer(width=1280, height=720, encode=True):
+    ramp = np.tile(np.arange(width, dtype=np.uint8), (height, 1))
+    frame = np.empty((height, width, 3), np.uint8)
+    count = 0
+
+    def produce_frame():
+        nonlocal count
+        count = (count + 1) % 256
+        np.add(ramp, count, out=frame[:, :, 0])  # Moving content, so every frame is encoded for real
+        frame[:, :, 1] = ramp[::-1]
+        frame[:, :, 2] = count
+        if not encode:
+            return frame.copy()  # The server's encoder pool encodes it
+        _, jpeg = cv2.imencode(".jpg", frame)
+        return jpeg.tobytes()
+
+    return produce_frame
+
+
+async def viewer(port, seconds, delay, counters):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /video_feed HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass  # Response headers
+    frames = 0
+    received = 0
+
+    async def read_part():
+        await reader.readline()  # --frame
+        await reader.readline()  # Content-Type
+        length = int((await reader.readline()).split(b":")[1])
+        await reader.readline()  # Blank line
+        await reader.readexactly(length + 2)  # JPEG + trailing CRLF
+        return length
+
+    deadline = time.perf_counter() + seconds
+    try:
+        while (remaining := deadline - time.perf_counter()) > 0:
+            try:
+                length = await asyncio.wait_for(read_part(), remaining)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                break
+            frames += 1
+            received += length
+            if delay:
+                await asyncio.sleep(delay)  # Simulates a viewer on a slow link
+    finally:
+        writer.close()
+    counters.append((frames, received))
+
+
+async def run(n_clients, seconds, slow, fps, encoder_workers, target_ms):
+    encoder = None
+    if encoder_workers:
+        controller = AdaptiveJpegController(target_frame_ms=target_ms) if target_ms else None
+        encoder = EncoderPool(workers=encoder_workers, controller=controller)
+    server = StreamServer(
+        synthetic_producer(encode=encoder is None), host="127.0.0.1", port=0, max_fps=fps, encoder=encoder
+    )
+    await server.start()
+    counters = []
+    started = time.perf_counter()
+    produced_before = server.frames_produced
+    await asyncio.gather(
+        *(viewer(server.port, seconds, 0.1 if i < slow else 0.0, counters) for i in range(n_clients))
+    )
+    elapsed = time.perf_counter() - started
+    produced = server.frames_produced - produced_before
+    await server.stop()
+    stats = server.stats()
+    if encoder is not None:
+        encoder.shutdown()
+
+    frames = [f for f, _ in counters]
+    return {
+        "clients": n_clients,
+        "slow_clients": slow,
+        "seconds": round(elapsed, 2),
+        "produced_fps": round(produced / elapsed, 1),
+        "client_fps_min": round(min(frames) / elapsed, 1),
+        "client_fps_mean": round(sum(frames) / len(frames) / elapsed, 1),
+        "aggregate_fps": round(sum(frames) / elapsed, 1),
+        "aggregate_mbit_s": round(sum(b for _, b in counters) * 8 / elapsed / 1e6, 1),
+        "encode_dropped": stats["encode_dropped"],
+        "quality": stats["quality"],
+        "scale": stats["scale"],
+        "encode_ms": stats["encode_ms"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--slow", type=int, default=0, help="number of viewers that read at 10 FPS")
+    parser.add_argument("--fps", type=float, default=None, help="cap on the producer rate (default: uncapped)")
+    parser.add_argument("--encoder-workers", type=int, default=0, help="encode on a pool of this many threads")
+    parser.add_argument("--target-ms", type=float, default=None, help="adaptive JPEG encode-time budget per frame")
+    args = parser.parse_args()
+
+    for n_clients in args.clients:
+        print(json.dumps(asyncio.run(run(
+            n_clients, args.seconds, min(args.slow, n_clients), args.fps, args.encoder_workers, args.target_ms
+        ))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Marks the repository root for pytest, so the tests import helpers and benchmarks like the scripts do
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class FramePool:
+    def __init__(self, depth=1):
+        """
+        Named, preallocated frame buffers, so a steady-state render loop allocates no new arrays: stages write into
+        the pool's buffers with OpenCV's dst= outputs and in-place NumPy operations.
+
+        Each name has a ring of `depth` buffers, handed out in turn. A buffer is written again `depth` calls to
+        get() later, whether or not its previous frame is still in use, so the pool is only safe where that is
+        known: a sequential loop (depth 1), or one thread keeping its last few frames (e.g. the previous frame for
+        optical flow). Frames handed between threads through dropping queues (helpers/pipeline.py) can be
+        overtaken by any number of newer ones, so no fixed depth protects them: don't use the pool for those.
+        Buffers are only (re)allocated when the requested shape or dtype changes.
+
+        Args:
+        - depth: Number of buffers per name
+        """
+        self.depth = max(1, int(depth))
+        self.rings = {}  # Name -> list of depth arrays (None until first allocated)
+        self.positions = {}  # Name -> index of the buffer get() returns next
+        self.allocations = 0  # Arrays allocated so far (stays constant in steady state)
+
+    def get(self, name, shape=None, dtype=np.uint8):
+        """
+        Returns the next buffer of the ring `name`.
+
+        Args:
+        - name: Name of the ring, e.g. "capture" or "screen"
+        - shape: Required shape; the buffer is (re)allocated if it is missing or of another shape or dtype. Without a
+          shape the buffer is returned as it is, or None if there is none yet (for functions that allocate their
+          output themselves when given None, like cv2.VideoCapture.read; see keep()).
+        - dtype: Required dtype
+        """
+        ring = self.rings.get(name)
+        if ring is None:
+            ring = self.rings[name] = [None] * self.depth
+        index = self.positions.get(name, 0)
+        self.positions[name] = (index + 1) % self.depth
+        buffer = ring[index]
+        if shape is not None and (buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype):
+            buffer = ring[index] = np.empty(shape, dtype)
+            self.allocations += 1
+        return buffer
+
+    def keep(self, name, array):
+        """
+        Puts an array allocated outside the pool in place of the buffer get(name) returned last, so it is reused
+        from then on (e.g. the frame a capture allocated because the pool had no buffer of its size yet).
+        """
+        ring = self.rings[name]
+        index = (self.positions[name] - 1) % self.depth
+        if ring[index] is not array:
+            ring[index] = array
+            self.allocations += 1
+
+    def nbytes(self):
+        return sum(buffer.nbytes for ring in self.rings.values() for buffer in ring if buffer is not None)
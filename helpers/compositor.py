@@ -0,0 +1,367 @@
+import os
+
+import cv2
+import numpy as np
+
+
+def segment_rect(pt1, pt2, thickness, width, height):
+    """
+    Returns the bounding box (x0, y0, x1, y1) of a cv2.line segment clipped to the canvas, or None if it is off-canvas.
+    """
+    pad = thickness // 2 + 2  # Half the line width plus a pixel of slack for the rounded line caps
+    x0 = max(min(pt1[0], pt2[0]) - pad, 0)
+    y0 = max(min(pt1[1], pt2[1]) - pad, 0)
+    x1 = min(max(pt1[0], pt2[0]) + pad + 1, width)
+    y1 = min(max(pt1[1], pt2[1]) + pad + 1, height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+def union_rect(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+class CanvasCompositor:
+    def __init__(self, width, height, threshold=50, path=None):
+        """
+        Keeps the drawing canvas together with its ink mask, and updates the mask only where strokes land.
+
+        Compositing gives the same result as the grayscale/threshold/bitwise_and/bitwise_or steps described in
+        mechanism.md: inked canvas pixels replace frame pixels, everything else shows the frame. The difference is
+        that the mask is kept between frames, and only the bounding box of the ink is touched, so the per-frame cost
+        follows the stroke area instead of the screen resolution.
+
+        Args:
+        - width, height: Size of the canvas (and of the frames it is composited onto)
+        - threshold: Gray level above which a canvas pixel counts as ink (default is 50)
+        - path: Optional .npy file the canvas is memory-mapped to. Strokes then land in the OS page cache as they are
+          drawn, so they survive a crash of the process; an existing file of the same size is resumed.
+        """
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.path = path
+        self.resumed = False  # Whether the canvas was restored from an existing file
+        self.version = 0  # Incremented on every change, so checkpointing can skip an unchanged canvas
+        self.mask = np.zeros((height, width), bool)  # True where the canvas holds ink
+        self.ink_rect = None  # Bounding box (x0, y0, x1, y1) of all ink on the canvas, None if the canvas is empty
+        if path is None:
+            self.canvas = np.zeros((height, width, 3), np.uint8)  # Colored strokes on a black background
+        else:
+            self.canvas = self._open_memmap(path)
+            if self.resumed:
+                self._rebuild_mask()
+
+    def _open_memmap(self, path):
+        shape = (self.height, self.width, 3)
+        if os.path.exists(path):
+            try:
+                canvas = np.lib.format.open_memmap(path, mode="r+")
+                if canvas.shape == shape and canvas.dtype == np.uint8:
+                    self.resumed = True
+                    return canvas
+                del canvas
+            except ValueError:
+                pass  # Not a .npy file: start over
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+
+    def _rebuild_mask(self):
+        # Recompute the ink mask and bounding box over the whole canvas
+        self._update_mask((0, 0, self.width, self.height))
+        bx, by, bw, bh = cv2.boundingRect(self.mask.view(np.uint8))
+        self.ink_rect = None if bw == 0 else (bx, by, bx + bw, by + bh)
+
+    def _update_mask(self, rect):
+        # Recompute the ink mask inside rect only
+        x0, y0, x1, y1 = rect
+        img_gray = cv2.cvtColor(self.canvas[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        np.greater(img_gray, self.threshold, out=self.mask[y0:y1, x0:x1])
+
+    def _shrink_ink_rect(self):
+        # After erasing, fit the ink bounding box to what is left (only scans the old bounding box)
+        if self.ink_rect is None:
+            return
+        x0, y0, x1, y1 = self.ink_rect
+        bx, by, bw, bh = cv2.boundingRect(self.mask[y0:y1, x0:x1].view(np.uint8))
+        self.ink_rect = None if bw == 0 else (x0 + bx, y0 + by, x0 + bx + bw, y0 + by + bh)
+
+    def line(self, pt1, pt2, color, thickness):
+        """
+        Draws a line segment on the canvas and updates the ink mask inside its bounding box.
+
+        A black color erases, exactly like drawing black on the plain canvas array did.
+
+        Returns:
+        - The dirty rectangle (x0, y0, x1, y1) touched by the segment, or None if it missed the canvas
+        """
+        cv2.line(self.canvas, pt1, pt2, color=color, thickness=thickness)
+        rect = segment_rect(pt1, pt2, thickness, self.width, self.height)
+        if rect is None:
+            return None
+        self.version += 1
+        self._update_mask(rect)
+        if any(color):
+            self.ink_rect = union_rect(self.ink_rect, rect)
+        else:
+            self._shrink_ink_rect()
+        return rect
+
+    def lines(self, segments, color, thickness):
+        """
+        Draws several segments of one color and thickness in a single cv2.polylines pass (pixel-identical to
+        drawing them one by one with line), then updates the ink mask inside each segment's bounding box.
+
+        Args:
+        - segments: List of (pt1, pt2) point pairs
+
+        Returns:
+        - The union of the dirty rectangles, or None if every segment missed the canvas
+        """
+        if not segments:
+            return None
+        cv2.polylines(self.canvas, [np.array(segment, np.int32) for segment in segments], False, color, thickness)
+        rect = None
+        for pt1, pt2 in segments:
+            segment = segment_rect(pt1, pt2, thickness, self.width, self.height)
+            if segment is not None:
+                self._update_mask(segment)
+                rect = union_rect(rect, segment)
+        if rect is None:
+            return None
+        self.version += 1
+        if any(color):
+            self.ink_rect = union_rect(self.ink_rect, rect)
+        else:
+            self._shrink_ink_rect()
+        return rect
+
+    def load(self, canvas):
+        """
+        Replaces the whole canvas (e.g. with one rebuilt from a stroke log) and recomputes the ink mask and bounding
+        box. The canvas array is updated in place, so references to it stay valid.
+        """
+        np.copyto(self.canvas, canvas)
+        self.version += 1
+        self._rebuild_mask()
+
+    def clear(self):
+        self.version += 1
+        self.canvas[:] = 0
+        self.mask[:] = False
+        self.ink_rect = None
+
+    def composite(self, frame):
+        """
+        Blends the inked canvas pixels onto the frame in place.
+
+        Args:
+        - frame: BGR frame of the same size as the canvas
+
+        Returns:
+        - frame: The same frame, with the drawing on top
+        """
+        if self.ink_rect is None:
+            return frame  # Nothing drawn: nothing to blend
+        x0, y0, x1, y1 = self.ink_rect
+        # cv2.copyTo writes into the frame view in place, and is much faster than np.copyto(..., where=mask)
+        cv2.copyTo(self.canvas[y0:y1, x0:x1], self.mask[y0:y1, x0:x1].view(np.uint8), frame[y0:y1, x0:x1])
+        return frame
+
+    def to_array(self):
+        """
+        Returns a copy of the canvas as one BGR array.
+        """
+        return self.canvas.copy()
+
+    def patch(self, rect=None):
+        """
+        Returns a copy of a canvas rectangle as BGRA, with the ink mask as alpha (opaque ink, transparent elsewhere),
+        e.g. to send it to a viewer that composites it over its own video.
+
+        Args:
+        - rect: (x0, y0, x1, y1) rectangle (default is None, the whole canvas)
+        """
+        x0, y0, x1, y1 = rect or (0, 0, self.width, self.height)
+        out = np.empty((y1 - y0, x1 - x0, 4), np.uint8)
+        out[:, :, :3] = self.canvas[y0:y1, x0:x1]
+        np.multiply(self.mask[y0:y1, x0:x1], 255, out=out[:, :, 3], casting="unsafe")
+        return out
+
+    def memory_bytes(self):
+        return self.canvas.nbytes + self.mask.nbytes
+
+    def flush(self):
+        # Writes a memory-mapped canvas back to its file (no-op for an in-memory canvas)
+        if isinstance(self.canvas, np.memmap):
+            self.canvas.flush()
+
+
+class TiledCanvasCompositor:
+    def __init__(self, width, height, threshold=50, tile_size=128):
+        """
+        Drop-in alternative to CanvasCompositor that stores the canvas as square tiles, allocated only where ink
+        lands and freed again when the eraser leaves them empty. The result is pixel-identical to CanvasCompositor's.
+
+        Memory and compositing cost follow the number of inked tiles instead of the screen size (or, for
+        CanvasCompositor, the bounding box of the ink, which a single diagonal stroke stretches over the whole screen).
+
+        Args:
+        - width, height: Size of the canvas (and of the frames it is composited onto)
+        - threshold: Gray level above which a canvas pixel counts as ink (default is 50)
+        - tile_size: Side of a tile in pixels (default is 128)
+        """
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.tile_size = tile_size
+        self.tiles = {}  # (tile row, tile column) -> [canvas tile, ink mask tile]
+        self.version = 0  # Incremented on every change, so checkpointing can skip an unchanged canvas
+        self.resumed = False  # Whether the canvas was restored from a checkpoint (see helpers/persistence.py)
+
+    def _tile_bounds(self, ty, tx):
+        # Canvas rectangle (x0, y0, x1, y1) covered by a tile (edge tiles are cut at the canvas border)
+        t = self.tile_size
+        return tx * t, ty * t, min((tx + 1) * t, self.width), min((ty + 1) * t, self.height)
+
+    def line(self, pt1, pt2, color, thickness):
+        """
+        Draws a line segment into every tile it touches, allocating tiles for ink and freeing tiles the eraser
+        empties. A black color erases, as with CanvasCompositor.
+
+        Returns:
+        - The dirty rectangle (x0, y0, x1, y1) touched by the segment, or None if it missed the canvas
+        """
+        rect = segment_rect(pt1, pt2, thickness, self.width, self.height)
+        if rect is None:
+            return None
+        erasing = not any(color)
+        self.version += 1
+
+        # Rasterize the segment once into a coverage patch covering its rectangle. cv2 shifts a line's pixels when it
+        # clips it, so the patch must not clip at tile borders, but must clip exactly where the full canvas would: the
+        # rectangle ends at the canvas border where the segment crosses it, and leaves slack everywhere else.
+        x0, y0, x1, y1 = rect
+        coverage = np.zeros((y1 - y0, x1 - x0), np.uint8)
+        cv2.line(coverage, (pt1[0] - x0, pt1[1] - y0), (pt2[0] - x0, pt2[1] - y0), color=255, thickness=thickness)
+        color = np.array(color, np.uint8)
+
+        t = self.tile_size
+        for ty in range(y0 // t, (y1 - 1) // t + 1):
+            for tx in range(x0 // t, (x1 - 1) // t + 1):
+                # Part of the segment's rectangle inside this tile, in canvas coordinates
+                bx0, by0, bx1, by1 = self._tile_bounds(ty, tx)
+                cx0, cy0, cx1, cy1 = max(x0, bx0), max(y0, by0), min(x1, bx1), min(y1, by1)
+                covered = coverage[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+                tile = self.tiles.get((ty, tx))
+                if tile is None:
+                    if erasing or not covered.any():
+                        continue  # Nothing to erase on a blank tile, or the line only passes near it
+                    tile = self.tiles[(ty, tx)] = [
+                        np.zeros((by1 - by0, bx1 - bx0, 3), np.uint8),
+                        np.zeros((by1 - by0, bx1 - bx0), bool),
+                    ]
+                canvas, mask = tile
+                region = canvas[cy0 - by0:cy1 - by0, cx0 - bx0:cx1 - bx0]
+                np.copyto(region, color, where=covered[:, :, None] > 0)
+                img_gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+                np.greater(img_gray, self.threshold, out=mask[cy0 - by0:cy1 - by0, cx0 - bx0:cx1 - bx0])
+                if erasing and not mask.any():
+                    del self.tiles[(ty, tx)]  # Erased clean: give the memory back
+        return rect
+
+    def lines(self, segments, color, thickness):
+        """
+        Draws several segments of one color and thickness (see CanvasCompositor.lines). Each segment is rasterized
+        into its own tiles, as with line.
+        """
+        rect = None
+        for pt1, pt2 in segments:
+            rect = union_rect(rect, self.line(pt1, pt2, color, thickness))
+        return rect
+
+    def clear(self):
+        self.version += 1
+        self.tiles = {}
+
+    def load(self, canvas):
+        """
+        Replaces the whole canvas with a dense BGR array, keeping only the tiles that hold ink.
+        """
+        self.version += 1
+        self.tiles = {}
+        t = self.tile_size
+        mask = cv2.cvtColor(canvas, cv2.COLOR_BGR2GRAY) > self.threshold
+        for ty in range((self.height + t - 1) // t):
+            for tx in range((self.width + t - 1) // t):
+                x0, y0, x1, y1 = self._tile_bounds(ty, tx)
+                if mask[y0:y1, x0:x1].any():
+                    self.tiles[(ty, tx)] = [canvas[y0:y1, x0:x1].copy(), mask[y0:y1, x0:x1].copy()]
+
+    def composite(self, frame):
+        """
+        Blends the inked canvas pixels onto the frame in place, visiting only the allocated tiles.
+
+        Args:
+        - frame: BGR frame of the same size as the canvas
+
+        Returns:
+        - frame: The same frame, with the drawing on top
+        """
+        t = self.tile_size
+        for (ty, tx), (canvas, mask) in self.tiles.items():
+            y0, x0 = ty * t, tx * t
+            h, w = mask.shape
+            cv2.copyTo(canvas, mask.view(np.uint8), frame[y0:y0 + h, x0:x0 + w])
+        return frame
+
+    def to_array(self):
+        """
+        Returns the canvas assembled into one BGR array (blank where no tile is allocated).
+        """
+        out = np.zeros((self.height, self.width, 3), np.uint8)
+        for (ty, tx), (canvas, _) in list(self.tiles.items()):  # A copy: a checkpoint thread may call this mid-stroke
+            x0, y0, x1, y1 = self._tile_bounds(ty, tx)
+            out[y0:y1, x0:x1] = canvas
+        return out
+
+    def patch(self, rect=None):
+        """
+        Returns a copy of a canvas rectangle as BGRA, with the ink mask as alpha, assembled from the tiles it
+        overlaps (see CanvasCompositor.patch).
+        """
+        x0, y0, x1, y1 = rect or (0, 0, self.width, self.height)
+        out = np.zeros((y1 - y0, x1 - x0, 4), np.uint8)
+        t = self.tile_size
+        for ty in range(y0 // t, (y1 - 1) // t + 1):
+            for tx in range(x0 // t, (x1 - 1) // t + 1):
+                tile = self.tiles.get((ty, tx))
+                if tile is None:
+                    continue
+                canvas, mask = tile
+                bx0, by0, bx1, by1 = self._tile_bounds(ty, tx)
+                cx0, cy0, cx1, cy1 = max(x0, bx0), max(y0, by0), min(x1, bx1), min(y1, by1)
+                target = out[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+                target[:, :, :3] = canvas[cy0 - by0:cy1 - by0, cx0 - bx0:cx1 - bx0]
+                np.multiply(mask[cy0 - by0:cy1 - by0, cx0 - bx0:cx1 - bx0], 255, out=target[:, :, 3], casting="unsafe")
+        return out
+
+    def memory_bytes(self):
+        return sum(canvas.nbytes + mask.nbytes for canvas, mask in self.tiles.values())
+
+
+COMPOSITORS = {
+    "dense": CanvasCompositor,
+    "tiled": TiledCanvasCompositor,
+}
+
+
+def make_compositor(width, height, backend="dense", **params):
+    """
+    Creates a canvas compositor by backend name ("dense" or "tiled"); params go to its constructor.
+    """
+    return COMPOSITORS[backend](width, height, **params)
@@ -0,0 +1,380 @@
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+import threading
+import time
+
+import cv2
+
+# Message types (first byte of every binary WebSocket message; integers are little-endian):
+# - KEYFRAME: u32 sequence, u16 width, u16 height, PNG of the whole canvas (BGRA, ink mask as alpha)
+# - PATCH: u32 sequence, u16 x, u16 y, PNG of a changed canvas rectangle (BGRA); it replaces those pixels
+# - VIDEO: u32 sequence, u16 width, u16 height (of the canvas), low-rate JPEG of the video, to be scaled to it
+KEYFRAME = 1
+PATCH = 2
+VIDEO = 3
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"  # RFC 6455, section 1.3
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIEWER_PATH = os.path.join(ROOT, "resources", "delta_viewer.html")  # Page served at /
+
+
+class CanvasDeltaEncoder:
+    def __init__(self, compositor, keyframe_interval=10.0, video_fps=2.0, video_width=320, video_quality=60):
+        """
+        Turns canvas changes into compact binary messages: a PNG patch of the rectangle strokes touched in a frame,
+        a PNG keyframe of the whole canvas now and then (and whenever the canvas is replaced, e.g. by undo), and
+        optionally a small, low-rate JPEG of the video for viewers that composite the canvas over it themselves.
+
+        Args:
+        - compositor: CanvasCompositor or TiledCanvasCompositor being drawn on
+        - keyframe_interval: Seconds between keyframes (lets viewers resynchronize)
+        - video_fps: Rate of the video layer (0 = no video)
+        - video_width: Width of the video layer (aspect ratio kept)
+        - video_quality: JPEG quality of the video layer
+        """
+        self.compositor = compositor
+        self.keyframe_interval = keyframe_interval
+        self.video_fps = video_fps
+        self.video_width = video_width
+        self.video_quality = video_quality
+        self.seq = 0
+        self.last_keyframe = None  # time.perf_counter() of the last keyframe
+        self.last_video = None
+        self.bytes = {KEYFRAME: 0, PATCH: 0, VIDEO: 0}  # Bytes produced per message type
+        self.counts = {KEYFRAME: 0, PATCH: 0, VIDEO: 0}
+
+    def _message(self, kind, header, data):
+        self.seq += 1
+        message = struct.pack("<BI", kind, self.seq) + header + data
+        self.bytes[kind] += len(message)
+        self.counts[kind] += 1
+        return message
+
+    def keyframe(self):
+        self.last_keyframe = time.perf_counter()
+        _, png = cv2.imencode(".png", self.compositor.patch(), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        header = struct.pack("<HH", self.compositor.width, self.compositor.height)
+        return self._message(KEYFRAME, header, png.tobytes())
+
+    def patch(self, rect):
+        x0, y0, _, _ = rect
+        _, png = cv2.imencode(".png", self.compositor.patch(rect), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        return self._message(PATCH, struct.pack("<HH", x0, y0), png.tobytes())
+
+    def video(self, frame):
+        self.last_video = time.perf_counter()
+        height = max(1, round(frame.shape[0] * self.video_width / frame.shape[1]))
+        small = cv2.resize(frame, (self.video_width, height), interpolation=cv2.INTER_AREA)
+        _, jpeg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.video_quality])
+        header = struct.pack("<HH", self.compositor.width, self.compositor.height)
+        return self._message(VIDEO, header, jpeg.tobytes())
+
+    def poll(self, rect=None, reset=False, frame=None):
+        """
+        Returns the messages for one frame.
+
+        Args:
+        - rect: Canvas rectangle changed since the last call (None if nothing changed)
+        - reset: The whole canvas was replaced
+        - frame: Current video frame (optional; used at video_fps)
+
+        Returns:
+        - List of (message type, bytes), in the order viewers must apply them
+        """
+        messages = []
+        now = time.perf_counter()
+        if reset or self.last_keyframe is None or now - self.last_keyframe >= self.keyframe_interval:
+            messages.append((KEYFRAME, self.keyframe()))
+        elif rect is not None:
+            messages.append((PATCH, self.patch(rect)))
+        if frame is not None and self.video_fps and (
+            self.last_video is None or now - self.last_video >= 1.0 / self.video_fps
+        ):
+            messages.append((VIDEO, self.video(frame)))
+        return messages
+
+    def stats(self):
+        return {
+            "keyframes": self.counts[KEYFRAME],
+            "patches": self.counts[PATCH],
+            "video_frames": self.counts[VIDEO],
+            "keyframe_bytes": self.bytes[KEYFRAME],
+            "patch_bytes": self.bytes[PATCH],
+            "video_bytes": self.bytes[VIDEO],
+        }
+
+
+def websocket_frame(payload, opcode=0x2):
+    # One unmasked, unfragmented server-to-client frame (RFC 6455, section 5.2); 0x2 = binary
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """
+    Reads one client-to-server frame (clients always mask their payload).
+
+    Returns:
+    - (opcode, payload)
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+class DeltaClient:
+    def __init__(self, peer):
+        # One viewer: messages wait in its queue until its socket takes them
+        self.peer = peer
+        self.queue = asyncio.Queue()
+        self.queued_bytes = 0
+        self.ready = False  # Got a keyframe since it joined (or last fell behind); patches before that are useless
+        self.sent = 0
+        self.bytes_sent = 0
+        self.resyncs = 0  # Times the backlog was dropped and the viewer restarted from a keyframe
+        self.video_skipped = 0
+
+
+class DeltaStreamServer:
+    def __init__(
+        self, produce_frame, encoder, host="0.0.0.0", port=5001, max_fps=30, max_backlog=2_000_000, viewer_path=None,
+    ):
+        """
+        WebSocket server streaming a drawing as canvas deltas (see CanvasDeltaEncoder) instead of full JPEG frames.
+        Viewers open the page at / (resources/delta_viewer.html), which connects to /ws and composites the canvas
+        over the optional low-rate video itself.
+
+        Patches only make sense applied in order, so unlike StreamServer a viewer's messages are queued rather than
+        replaced. A viewer whose backlog grows beyond max_backlog bytes has it dropped and restarts from the next
+        keyframe; video frames are skipped for a viewer that still has messages waiting.
+
+        Args:
+        - produce_frame: Callable run on the producer thread, returning (frame, changed rect, canvas reset) for the
+          next frame, or None when the source has ended (e.g. VideoCamera.render_frame + take_canvas_changes)
+        - encoder: CanvasDeltaEncoder of the canvas the producer draws on (only used on the producer thread)
+        - host, port: Address the HTTP server listens on
+        - max_fps: Cap on the producer rate
+        - max_backlog: Bytes a viewer may have queued before it is resynchronized
+        - viewer_path: HTML page served at / (default is resources/delta_viewer.html)
+        """
+        self.produce_frame = produce_frame
+        self.encoder = encoder
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.max_backlog = max_backlog
+        self.viewer_path = viewer_path or VIEWER_PATH
+        self.clients = set()
+        self.frames_produced = 0
+        self.encode_ms = 0.0  # Time spent encoding messages, over all frames
+        self.keyframe_requested = threading.Event()  # A viewer joined or fell behind and needs a keyframe
+        self.loop = None
+        self.server = None
+        self.producer_thread = None
+        self.stop_event = threading.Event()
+
+    # --- producer (runs on its own thread) ---
+
+    def _producer_loop(self):
+        min_interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            produced = self.produce_frame()
+            if produced is None:
+                break
+            frame, rect, reset = produced
+            self.frames_produced += 1
+            encode_started = time.perf_counter()
+            if self.keyframe_requested.is_set():
+                self.keyframe_requested.clear()
+                reset = True
+            messages = self.encoder.poll(rect, reset, frame)
+            self.encode_ms += (time.perf_counter() - encode_started) * 1000
+            if messages:
+                self.loop.call_soon_threadsafe(self._publish, messages)
+            remaining = min_interval - (time.perf_counter() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _publish(self, messages):
+        # Runs on the event loop
+        for client in self.clients:
+            for kind, data in messages:
+                if kind == KEYFRAME:
+                    # Supersedes everything still queued for this viewer
+                    while not client.queue.empty():
+                        client.queue.get_nowait()
+                    client.queued_bytes = 0
+                    client.ready = True
+                elif not client.ready:
+                    continue
+                elif kind == VIDEO and client.queued_bytes > 0:
+                    client.video_skipped += 1
+                    continue
+                if kind != KEYFRAME and client.queued_bytes + len(data) > self.max_backlog:
+                    # Too far behind: drop the backlog and start over from the next keyframe
+                    while not client.queue.empty():
+                        client.queue.get_nowait()
+                    client.queued_bytes = 0
+                    client.ready = False
+                    client.resyncs += 1
+                    self.keyframe_requested.set()
+                    break
+                client.queue.put_nowait(data)
+                client.queued_bytes += len(data)
+
+    # --- HTTP / WebSocket side (runs on the event loop) ---
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except ConnectionError:
+            writer.close()
+            return
+
+        parts = request_line.split()
+        path = parts[1] if len(parts) >= 2 else b""
+        if path == b"/ws" and headers.get("upgrade", "").lower() == "websocket":
+            await self._serve_websocket(reader, writer, headers)
+        elif path in (b"/", b"/index.html"):
+            with open(self.viewer_path, "rb") as f:
+                page = f.read()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                b"Content-Length: " + str(len(page)).encode() + b"\r\nConnection: close\r\n\r\n" + page
+            )
+            await writer.drain()
+            writer.close()
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            writer.close()
+
+    async def _serve_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "").encode()
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        client = DeltaClient(writer.get_extra_info("peername"))
+        self.clients.add(client)
+        self.keyframe_requested.set()  # The new viewer starts from a keyframe
+        receiver = asyncio.ensure_future(self._receive(reader, writer))
+        try:
+            while not receiver.done():
+                getter = asyncio.ensure_future(client.queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                data = getter.result()
+                client.queued_bytes -= len(data)
+                writer.write(websocket_frame(data))
+                await writer.drain()  # Per-client backpressure: only this coroutine waits for a slow socket
+                client.sent += 1
+                client.bytes_sent += len(data)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            receiver.cancel()
+            writer.close()
+
+    async def _receive(self, reader, writer):
+        # Answers pings and the closing handshake; viewers send nothing else
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:  # Close
+                    writer.write(websocket_frame(payload[:2], opcode=0x8))
+                    return
+                if opcode == 0x9:  # Ping
+                    writer.write(websocket_frame(payload, opcode=0xA))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # Resolves port=0 to the actual port
+        self.stop_event.clear()
+        self.producer_thread = threading.Thread(target=self._producer_loop, name="delta-producer", daemon=True)
+        self.producer_thread.start()
+        return self
+
+    async def stop(self):
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.producer_thread is not None:
+            await asyncio.to_thread(self.producer_thread.join, 1.0)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def stats(self):
+        frames = max(self.frames_produced, 1)
+        stats = {"frames_produced": self.frames_produced, "encode_ms_per_frame": round(self.encode_ms / frames, 3)}
+        stats.update(self.encoder.stats())
+        stats["clients"] = [
+            {
+                "peer": client.peer,
+                "sent": client.sent,
+                "bytes_sent": client.bytes_sent,
+                "resyncs": client.resyncs,
+                "video_skipped": client.video_skipped,
+            }
+            for client in self.clients
+        ]
+        return stats
+
+
+def main():
+    from helpers.web_helper import VideoCamera
+
+    camera = VideoCamera()
+    encoder = CanvasDeltaEncoder(camera.compositor)
+
+    def produce_frame():
+        frame, _ = camera.render_frame()
+        if frame is None:
+            return None
+        rect, reset = camera.take_canvas_changes()
+        return frame, rect, reset
+
+    server = DeltaStreamServer(produce_frame, encoder, port=5001)
+    print("Streaming canvas deltas on http://localhost:5001/")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import collections
+import concurrent.futures
+import itertools
+import threading
+import time
+
+import cv2
+
+# Result of one encode: the JPEG bytes plus the settings and cost that produced them
+EncodedFrame = collections.namedtuple("EncodedFrame", ["index", "data", "quality", "scale", "size", "encode_ms"])
+
+
+class AdaptiveJpegController:
+    def __init__(
+        self,
+        target_frame_ms=None,           # Encode-time budget per frame (in milliseconds)
+        target_bytes_per_s=None,        # Bandwidth budget for the stream (in bytes per second)
+        fps=30,                         # Frame rate used to turn the bandwidth budget into a per-frame size budget
+        quality=80,                     # Starting JPEG quality
+        min_quality=40,                 # Quality is never lowered below this
+        max_quality=95,                 # Quality is never raised above this
+        min_scale=0.5,                  # Output scale is never lowered below this (1.0 = full resolution)
+        quality_step=5,                 # Quality change per adjustment
+        scale_step=0.125,               # Output scale change per adjustment
+        smoothing=0.2,                  # Weight of the newest sample in the moving averages
+    ):
+        """
+        Picks the JPEG quality and output scale for the next frame so that encode time and/or encoded size stay
+        within budget. Quality goes down first; once it is at min_quality, the output scale goes down. When there is
+        plenty of headroom, scale is restored first and then quality.
+        """
+        self.target_frame_ms = target_frame_ms
+        self.target_frame_bytes = target_bytes_per_s / fps if target_bytes_per_s else None
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.scale = 1.0
+        self.min_scale = min_scale
+        self.quality_step = quality_step
+        self.scale_step = scale_step
+        self.smoothing = smoothing
+        self.avg_encode_ms = None
+        self.avg_size = None
+        self.lock = threading.Lock()
+
+    def settings(self):
+        """
+        Returns:
+        - (quality, scale) to use for the next frame
+        """
+        with self.lock:
+            return self.quality, self.scale
+
+    def _load(self):
+        # Fraction of the budget in use (the worse of time and size); None if there is no budget
+        loads = []
+        if self.target_frame_ms:
+            loads.append(self.avg_encode_ms / self.target_frame_ms)
+        if self.target_frame_bytes:
+            loads.append(self.avg_size / self.target_frame_bytes)
+        return max(loads) if loads else None
+
+    def update(self, encode_ms, size):
+        """
+        Feeds the cost of the last encode back into the controller.
+        """
+        with self.lock:
+            if self.avg_encode_ms is None:
+                self.avg_encode_ms, self.avg_size = encode_ms, size
+            else:
+                self.avg_encode_ms += self.smoothing * (encode_ms - self.avg_encode_ms)
+                self.avg_size += self.smoothing * (size - self.avg_size)
+
+            load = self._load()
+            if load is None:
+                return
+            if load > 1.0:
+                # Over budget: cheaper quality first, then a smaller picture
+                if self.quality > self.min_quality:
+                    self.quality = max(self.min_quality, self.quality - self.quality_step)
+                elif self.scale > self.min_scale:
+                    self.scale = max(self.min_scale, self.scale - self.scale_step)
+            elif load < 0.7:
+                # Plenty of headroom: restore resolution first, then quality
+                if self.scale < 1.0:
+                    self.scale = min(1.0, self.scale + self.scale_step)
+                elif self.quality < self.max_quality:
+                    self.quality = min(self.max_quality, self.quality + self.quality_step)
+
+
+class EncoderPool:
+    def __init__(self, workers=2, controller=None, quality=95):
+        """
+        Encodes frames as JPEG on a pool of worker threads (cv2.imencode releases the GIL), so encoding overlaps the
+        capture and compositing of the next frame.
+
+        Args:
+        - workers: Number of encoder threads
+        - controller: Optional AdaptiveJpegController choosing quality/scale per frame
+        - quality: Fixed JPEG quality when no controller is given (default is 95, OpenCV's own default)
+        """
+        self.workers = workers
+        self.controller = controller
+        self.quality = quality
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encoder")
+        self.counter = itertools.count()
+        self.last = None  # Most recent EncodedFrame
+
+    def encode(self, frame, index=None):
+        """
+        Encodes a frame on the calling thread with the controller's current settings.
+
+        Returns:
+        - EncodedFrame with the bytes, chosen quality and scale, encoded size and encode latency
+        """
+        quality, scale = self.controller.settings() if self.controller else (self.quality, 1.0)
+        started = time.perf_counter()
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        encode_ms = (time.perf_counter() - started) * 1000
+        data = jpeg.tobytes()
+        if self.controller:
+            self.controller.update(encode_ms, len(data))
+        encoded = EncodedFrame(next(self.counter) if index is None else index, data, quality, scale, len(data), encode_ms)
+        self.last = encoded
+        return encoded
+
+    def submit(self, frame):
+        """
+        Queues a frame for encoding on the pool. The frame must not be modified until the returned future is done.
+
+        Returns:
+        - concurrent.futures.Future resolving to an EncodedFrame (index gives the submission order)
+        """
+        return self.executor.submit(self.encode, frame, next(self.counter))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,143 @@
+import math
+
+import numpy as np
+
+
+class PassThroughFilter:
+    """
+    No filtering: returns the raw point (the behavior before filters existed).
+    """
+
+    def __init__(self, lead=0.0):
+        self.lead = lead
+
+    def update(self, point, t):
+        return point
+
+    def reset(self):
+        pass
+
+
+def _smoothing_factor(cutoff, dt):
+    # Exponential smoothing factor of a first-order low-pass filter with the given cutoff frequency (Hz)
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0, lead=0.0):
+        """
+        One Euro filter (Casiez et al.): a low-pass filter whose cutoff rises with speed, so a still finger is
+        steady and a fast one has little lag.
+
+        Args:
+        - min_cutoff: Cutoff frequency (Hz) at rest; lower = less jitter, more lag when slow
+        - beta: How fast the cutoff rises with speed; higher = less lag when moving fast
+        - d_cutoff: Cutoff frequency (Hz) used to smooth the speed estimate
+        - lead: Seconds to extrapolate ahead with the filtered velocity (compensates pipeline latency)
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.lead = lead
+        self.reset()
+
+    def reset(self):
+        self.x = None  # Filtered position
+        self.dx = None  # Filtered velocity (units per second)
+        self.t = None
+
+    def update(self, point, t):
+        """
+        Args:
+        - point: Raw (x, y) position
+        - t: Timestamp of the measurement, in seconds
+
+        Returns:
+        - Filtered (and, with lead > 0, extrapolated) position as an (x, y) tuple of ints
+        """
+        x = np.asarray(point, np.float64)
+        if self.x is None or t <= self.t:
+            self.x, self.dx, self.t = x, np.zeros_like(x), t
+            return tuple(int(round(v)) for v in x)
+        dt = t - self.t
+        self.t = t
+
+        a_d = _smoothing_factor(self.d_cutoff, dt)
+        self.dx = a_d * (x - self.x) / dt + (1 - a_d) * self.dx
+
+        cutoff = self.min_cutoff + self.beta * float(np.linalg.norm(self.dx))
+        a = _smoothing_factor(cutoff, dt)
+        self.x = a * x + (1 - a) * self.x
+
+        predicted = self.x + self.dx * self.lead
+        return tuple(int(round(v)) for v in predicted)
+
+
+class KalmanPredictor:
+    def __init__(self, process_noise=1e6, measurement_noise=16.0, lead=0.0):
+        """
+        Constant-velocity Kalman filter per axis, with short-horizon prediction.
+
+        Args:
+        - process_noise: Acceleration noise (pixels/s^2)^2 scale; higher = follows direction changes faster
+        - measurement_noise: Variance of the landmark jitter (pixels^2)
+        - lead: Seconds to predict ahead (compensates pipeline latency)
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.lead = lead
+        self.reset()
+
+    def reset(self):
+        self.state = None  # [[x, vx], [y, vy]]: one 2-element state per axis
+        self.covariance = None  # One 2x2 covariance per axis
+        self.t = None
+
+    def update(self, point, t):
+        """
+        Args:
+        - point: Raw (x, y) position
+        - t: Timestamp of the measurement, in seconds
+
+        Returns:
+        - Estimated position lead seconds after t, as an (x, y) tuple of ints
+        """
+        z = np.asarray(point, np.float64)
+        if self.state is None or t <= self.t:
+            self.state = np.stack([z, np.zeros_like(z)], axis=1)
+            self.covariance = np.tile(np.diag([self.measurement_noise, 1e4]), (len(z), 1, 1))
+            self.t = t
+            return tuple(int(round(v)) for v in z)
+        dt = t - self.t
+        self.t = t
+
+        # Predict
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        Q = self.process_noise * np.array([[dt ** 4 / 4, dt ** 3 / 2], [dt ** 3 / 2, dt ** 2]])
+        self.state = self.state @ F.T
+        self.covariance = F @ self.covariance @ F.T + Q
+
+        # Correct with the measured position (H = [1, 0])
+        innovation = z - self.state[:, 0]
+        s = self.covariance[:, 0, 0] + self.measurement_noise
+        gain = self.covariance[:, :, 0] / s[:, None]
+        self.state += gain * innovation[:, None]
+        self.covariance -= gain[:, :, None] * self.covariance[:, None, 0, :]
+
+        predicted = self.state[:, 0] + self.state[:, 1] * self.lead
+        return tuple(int(round(v)) for v in predicted)
+
+
+FILTERS = {
+    "none": PassThroughFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanPredictor,
+}
+
+
+def make_filter(name="none", **params):
+    """
+    Creates a landmark filter by name ("none", "one_euro" or "kalman"); params go to its constructor.
+    """
+    return FILTERS[name](**params)
@@ -0,0 +1,194 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """
+    Minimal cv2.VideoCapture-like interface (read/isOpened/release), so any source can stand in for the webcam.
+    """
+
+    def read(self, image=None):
+        """
+        Args:
+        - image: Optional preallocated frame the source may read into (like cv2.VideoCapture.read's image argument),
+          so a steady-state loop allocates nothing; sources that cannot reuse it return a new frame
+
+        Returns:
+        - (ret, frame): ret is False once the source has no more frames
+        """
+        raise NotImplementedError
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class WebcamSource(FrameSource):
+    def __init__(self, index=0, width=None, height=None, fps=None, api=cv2.CAP_DSHOW):
+        """
+        Live camera, opened the same way app.py always did (DirectShow backend by default).
+        """
+        self.cap = cv2.VideoCapture(index, api)
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, loop=False):
+        """
+        Recorded video file; with loop=True it restarts from the first frame instead of ending.
+        """
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+
+    def read(self, image=None):
+        ret, frame = self.cap.read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSequenceSource(FrameSource):
+    def __init__(self, pattern, loop=False):
+        """
+        Numbered still images, given as a folder or a glob pattern (files are read in sorted order).
+        """
+        if os.path.isdir(pattern):
+            self.files = sorted(
+                os.path.join(pattern, name) for name in os.listdir(pattern) if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            self.files = sorted(glob.glob(pattern))
+        self.loop = loop
+        self.position = 0
+
+    def read(self, image=None):
+        if self.position >= len(self.files):
+            if not self.loop or not self.files:
+                return False, None
+            self.position = 0
+        frame = cv2.imread(self.files[self.position])
+        self.position += 1
+        return frame is not None, frame
+
+    def isOpened(self):
+        return bool(self.files)
+
+
+class SyntheticSource(FrameSource):
+    def __init__(self, width=1280, height=720, frames=None, seed=0):
+        """
+        Generated frames (a textured background with a moving bright blob), for benchmarks without a camera.
+
+        Args:
+        - width, height: Frame size
+        - frames: Number of frames before the source ends (default is None, endless)
+        - seed: Seed of the background texture
+        """
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.count = 0
+        rng = np.random.default_rng(seed)
+        # Low-resolution noise scaled up, so the frame looks like a (blurry) scene rather than pure noise
+        noise = rng.integers(0, 256, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+        self.background = cv2.resize(noise, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    def read(self, image=None):
+        if self.frames is not None and self.count >= self.frames:
+            return False, None
+        if image is not None and image.shape == self.background.shape:
+            frame = image
+            np.copyto(frame, self.background)
+        else:
+            frame = self.background.copy()  # A fresh array per frame, like cv2.VideoCapture.read
+        t = self.count / 30.0
+        center = (
+            int(self.width * (0.5 + 0.35 * np.sin(t))),
+            int(self.height * (0.5 + 0.35 * np.cos(0.7 * t))),
+        )
+        cv2.circle(frame, center, max(4, self.height // 12), (200, 180, 160), thickness=-1)
+        self.count += 1
+        return True, frame
+
+
+class NullSink:
+    """
+    Stands in for cv2.imshow/waitKey/getWindowProperty when running without a display: frames are only counted.
+    """
+
+    def __init__(self):
+        self.frames = 0
+
+    def namedWindow(self, name, flags=0):
+        pass
+
+    def imshow(self, name, frame):
+        self.frames += 1
+
+    def waitKey(self, delay=0):
+        return -1  # No key pressed
+
+    def getWindowProperty(self, name, prop):
+        return 1  # The (virtual) window is always open
+
+    def destroyAllWindows(self):
+        pass
+
+
+def open_source(spec, width=None, height=None, fps=None):
+    """
+    Opens a frame source from a short description:
+
+    - "webcam" or "webcam:<index>": live camera
+    - "synthetic" or "synthetic:<width>x<height>": generated frames
+    - a folder or a glob pattern with images: image sequence
+    - anything else: video file
+
+    Args:
+    - width, height, fps: Requested camera settings (also the default size of synthetic frames)
+    """
+    kind, _, arg = str(spec).partition(":")
+    if kind == "webcam":
+        return WebcamSource(int(arg or 0), width, height, fps)
+    if kind == "synthetic":
+        if arg:
+            width, height = (int(v) for v in arg.lower().split("x"))
+        return SyntheticSource(width or 1280, height or 720)
+    if os.path.isdir(spec) or any(ch in spec for ch in "*?["):
+        return ImageSequenceSource(spec)
+    return VideoFileSource(spec)
@@ -0,0 +1,181 @@
+import collections
+import time
+
+import numpy as np
+
+
+class Knob:
+    def __init__(self, name, values, apply, allowed=None, greedy=False):
+        """
+        One quality setting the governor can step.
+
+        Args:
+        - name: Name used in the decision log
+        - values: Settings from best quality to cheapest; the first one is the current setting
+        - apply: Called with the new value whenever the knob moves
+        - allowed: Optional callable(value) -> bool; values it rejects are not stepped down to
+        - greedy: Step down straight to the cheapest allowed value instead of one value at a time
+        """
+        self.name = name
+        self.values = list(values)
+        self.apply = apply
+        self.allowed = allowed
+        self.greedy = greedy
+        self.index = 0
+
+    @property
+    def value(self):
+        return self.values[self.index]
+
+    def lower_index(self):
+        # Index the knob would step down to, or None if it cannot go lower
+        candidates = [
+            index for index in range(self.index + 1, len(self.values))
+            if self.allowed is None or self.allowed(self.values[index])
+        ]
+        if not candidates:
+            return None
+        return candidates[-1] if self.greedy else candidates[0]
+
+    def raise_index(self):
+        return self.index - 1 if self.index > 0 else None
+
+
+class QualityGovernor:
+    def __init__(
+        self,
+        target_fps,
+        knobs,
+        window=30,
+        low_load=0.7,
+        high_load=1.0,
+        settle_frames=10,
+        raise_after=90,
+        hands_window=90,
+        log=print,
+    ):
+        """
+        Holds a target frame rate by stepping quality knobs down when frames take too long, and back up when there
+        is headroom.
+
+        The load is the mean work time per frame (time not spent waiting for the camera) over the last `window`
+        frames, divided by the frame budget 1 / target_fps. Above high_load the first knob that can go lower is
+        stepped down; below low_load for raise_after frames in a row the last lowered knob is stepped back up. The
+        gap between the two thresholds, the settle_frames skipped after every change (a rebuilt model makes the
+        next frames slow) and the wait before raising keep the governor from flip-flopping. A knob that has to be
+        lowered again right after being raised doubles the wait before the next raise (up to 16x).
+
+        Every decision is appended to self.decisions and passed to log.
+
+        Args:
+        - target_fps: Frame rate to hold
+        - knobs: Knob objects, in the order they are stepped down (raised in the reverse order)
+        - window: Frames averaged for the load
+        - low_load, high_load: Load thresholds for raising and lowering quality
+        - settle_frames: Frames ignored after each change
+        - raise_after: Frames of low load needed before raising quality
+        - hands_window: Frames over which the number of hands in use is counted (see hands_in_use)
+        - log: Callable taking one line of text per decision (None: only self.decisions)
+        """
+        self.target_fps = target_fps
+        self.budget = 1.0 / target_fps
+        self.knobs = list(knobs)
+        self.window = window
+        self.low_load = low_load
+        self.high_load = high_load
+        self.settle_frames = settle_frames
+        self.raise_after = raise_after
+        self.backoff = 1  # Multiplier of raise_after, doubled whenever a raise had to be undone
+        self.log = log
+        self.samples = collections.deque(maxlen=window)
+        self.hands = collections.deque(maxlen=hands_window)
+        self.frames = 0
+        self.settling = settle_frames
+        self.calm = 0  # Consecutive evaluated frames below low_load
+        self.last_raise = None  # (knob name, frame) of the last raise
+        self.load = None
+        self.decisions = []
+
+    def hands_in_use(self):
+        # Most hands seen in one frame recently (at least 1), the lowest max_num_hands that loses nothing
+        return max(max(self.hands, default=1), 1)
+
+    def update(self, work_seconds, hands=None):
+        """
+        Feeds the work time of one frame and, if the load calls for it, moves one knob.
+
+        Args:
+        - work_seconds: Time the frame took, not counting the wait for the camera
+        - hands: Number of hands found in the frame (optional, see hands_in_use)
+
+        Returns:
+        - The decision dictionary if a knob moved, otherwise None
+        """
+        self.frames += 1
+        if hands is not None:
+            self.hands.append(hands)
+        if self.settling > 0:
+            self.settling -= 1
+            return None
+        self.samples.append(work_seconds)
+        if len(self.samples) < self.window:
+            return None
+        self.load = float(np.mean(self.samples)) / self.budget
+
+        if self.load > self.high_load:
+            self.calm = 0
+            for knob in self.knobs:
+                index = knob.lower_index()
+                if index is not None:
+                    if self.last_raise is not None and self.last_raise[0] == knob.name and \
+                            self.frames - self.last_raise[1] <= 2 * (self.settle_frames + self.window):
+                        self.backoff = min(self.backoff * 2, 16)  # The raise did not hold
+                    return self._move(knob, index, "lower")
+        elif self.load < self.low_load:
+            self.calm += 1
+            if self.calm >= self.raise_after * self.backoff:
+                for knob in reversed(self.knobs):
+                    index = knob.raise_index()
+                    if index is not None:
+                        self.last_raise = (knob.name, self.frames)
+                        return self._move(knob, index, "raise")
+        else:
+            self.calm = 0
+        return None
+
+    def _move(self, knob, index, action):
+        old = knob.value
+        knob.index = index
+        knob.apply(knob.value)
+        decision = {
+            "time": time.time(),
+            "frame": self.frames,
+            "action": action,
+            "knob": knob.name,
+            "from": old,
+            "to": knob.value,
+            "work_ms": round(float(np.mean(self.samples)) * 1000, 2),
+            "budget_ms": round(self.budget * 1000, 2),
+        }
+        self.decisions.append(decision)
+        if self.log is not None:
+            self.log(
+                "Quality governor: {action} {knob} {from} -> {to} "
+                "(frame work {work_ms} ms, budget {budget_ms} ms)".format(**decision)
+            )
+        # Measure the new setting from scratch
+        self.samples.clear()
+        self.settling = self.settle_frames
+        self.calm = 0
+        return decision
+
+    def settings(self):
+        return {knob.name: knob.value for knob in self.knobs}
+
+    def stats(self):
+        return {
+            "target_fps": self.target_fps,
+            "load": None if self.load is None else round(self.load, 3),
+            "settings": self.settings(),
+            "decisions": len(self.decisions),
+        }
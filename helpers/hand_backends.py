@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+
+import mediapipe as mp
+import numpy as np
+
+# Default model of the Tasks backend (not shipped with the mediapipe package), downloadable from
+# https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task
+TASK_MODEL_PATH = os.path.join("resources", "hand_landmarker.task")
+
+NO_HANDS = (np.empty((0, 21, 3), np.float32), [], [])
+
+
+class HandBackend:
+    """
+    Interface of the hand landmark models behind handDetector.
+
+    process() takes one RGB frame and returns the newest (landmarks, handedness, scores) result: landmarks is an
+    (n_hands, 21, 3) float32 array of normalized (x, y, z), handedness the "Left"/"Right" label of each hand and scores
+    the confidence of each label. It returns None when there is no new result yet (asynchronous backends); the
+    detector then keeps the previous landmarks.
+    """
+
+    asynchronous = False  # True when results belong to earlier frames than the one just given to process()
+
+    def process(self, rgb, timestamp_ms):
+        raise NotImplementedError
+
+    def warm_up(self, rgb):
+        # Runs the model once, so the first real frame does not pay for initialization
+        self.process(rgb, 0)
+
+    def close(self):
+        pass
+
+
+class SolutionsBackend(HandBackend):
+    def __init__(
+        self, image_mode=False, max_num_hands=1, model_complexity=1, min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    ):
+        """
+        The legacy mp.solutions.hands.Hands graph, run synchronously: process() returns the result for the frame it
+        was given.
+        """
+        self.hands = mp.solutions.hands.Hands(
+            static_image_mode=image_mode,
+            max_num_hands=max_num_hands,
+            model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+
+    def process(self, rgb, timestamp_ms):
+        results = self.hands.process(rgb)
+        # Copy MediaPipe's per-landmark objects into one array, once per frame, for all hands
+        if not results.multi_hand_landmarks:
+            return NO_HANDS
+        landmarks = np.array(
+            [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in results.multi_hand_landmarks], np.float32
+        )
+        handedness = [hand.classification[0].label for hand in results.multi_handedness]
+        scores = [hand.classification[0].score for hand in results.multi_handedness]
+        return landmarks, handedness, scores
+
+    def close(self):
+        self.hands.close()
+
+
+class TasksLiveStreamBackend(HandBackend):
+    asynchronous = True
+
+    def __init__(
+        self, image_mode=False, max_num_hands=1, model_complexity=1, min_detection_confidence=0.5,
+        min_tracking_confidence=0.5, model_path=TASK_MODEL_PATH,
+    ):
+        """
+        MediaPipe Tasks HandLandmarker in LIVE_STREAM mode: process() hands the frame to detect_async and returns at
+        once with the newest result delivered by the callback, so inference runs on MediaPipe's own thread while the
+        next frame is captured. Results are therefore a frame or so late, and frames that arrive while the model is
+        busy are skipped by MediaPipe.
+
+        image_mode and model_complexity have no equivalent here (the .task bundle fixes the model).
+
+        Args:
+        - model_path: HandLandmarker .task bundle (see TASK_MODEL_PATH)
+        """
+        from mediapipe.tasks import python as mp_tasks
+        from mediapipe.tasks.python import vision
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"HandLandmarker model not found at {model_path!r}; download hand_landmarker.task (see TASK_MODEL_PATH)"
+            )
+        options = vision.HandLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=max_num_hands,
+            min_hand_detection_confidence=min_detection_confidence,
+            min_hand_presence_confidence=min_tracking_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result,
+        )
+        self.landmarker = vision.HandLandmarker.create_from_options(options)
+        self.lock = threading.Lock()
+        self.result = None  # Newest result not handed out yet
+        self.result_timestamp_ms = None  # Timestamp of the frame the newest result belongs to
+        self.last_timestamp_ms = -1  # detect_async needs strictly increasing timestamps
+        self.submitted = 0
+        self.completed = 0
+
+    def _on_result(self, result, image, timestamp_ms):
+        # Called on MediaPipe's thread
+        if result.hand_landmarks:
+            landmarks = np.array(
+                [[(lm.x, lm.y, lm.z) for lm in hand] for hand in result.hand_landmarks], np.float32
+            )
+            handedness = [hand[0].category_name for hand in result.handedness]
+            scores = [hand[0].score for hand in result.handedness]
+            converted = (landmarks, handedness, scores)
+        else:
+            converted = NO_HANDS
+        with self.lock:
+            self.result = converted
+            self.result_timestamp_ms = timestamp_ms
+            self.completed += 1
+
+    def process(self, rgb, timestamp_ms):
+        timestamp_ms = max(int(timestamp_ms), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        # mp.Image copies the pixels, so the caller may reuse its buffer right away
+        self.landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), timestamp_ms)
+        self.submitted += 1
+        with self.lock:
+            result, self.result = self.result, None
+        return result
+
+    def warm_up(self, rgb, timeout=5.0):
+        # Waits for the first result, so the model is loaded before real frames arrive
+        self.process(rgb, 0)
+        deadline = time.perf_counter() + timeout
+        while self.completed == 0 and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        with self.lock:
+            self.result = None
+
+    def close(self):
+        self.landmarker.close()
+
+
+def save_recording(path, frames):
+    """
+    Saves per-frame hand landmarks (e.g. collected from another backend) for ReplayBackend.
+
+    Args:
+    - path: .npz file
+    - frames: Sequence of (landmarks, handedness, scores) results, one per frame
+    """
+    counts = np.array([len(landmarks) for landmarks, _, _ in frames], np.int32)
+    landmarks = [np.asarray(landmarks, np.float32).reshape(-1, 21, 3) for landmarks, _, _ in frames]
+    with open(path, "wb") as f:  # Through a file object, so np.savez does not append ".npz" to the name
+        np.savez_compressed(
+            f,
+            counts=counts,
+            landmarks=np.concatenate(landmarks) if landmarks else NO_HANDS[0],
+            handedness=np.array([label for _, labels, _ in frames for label in labels], "U5"),
+            scores=np.array([score for _, _, scores in frames for score in scores], np.float32),
+        )
+
+
+def load_recording(path):
+    """
+    Returns:
+    - List of (landmarks, handedness, scores) results, one per frame, as saved by save_recording
+    """
+    with np.load(path) as data:
+        counts, landmarks = data["counts"], data["landmarks"]
+        handedness, scores = data["handedness"].tolist(), data["scores"].tolist()
+    frames = []
+    start = 0
+    for count in counts.tolist():
+        end = start + count
+        frames.append((landmarks[start:end], handedness[start:end], scores[start:end]))
+        start = end
+    return frames
+
+
+class ReplayBackend(HandBackend):
+    def __init__(
+        self, image_mode=False, max_num_hands=1, model_complexity=1, min_detection_confidence=0.5,
+        min_tracking_confidence=0.5, path=None, frames=None, loop=True,
+    ):
+        """
+        Serves recorded landmarks instead of running a model, one recorded frame per process() call whatever the
+        image, for tests and benchmarks that need repeatable hands without a camera or model. Hands beyond
+        max_num_hands are left out.
+
+        Args:
+        - path: Recording saved by save_recording
+        - frames: The recording as a list of results instead of a file
+        - loop: Start over after the last frame (otherwise no hands are returned from then on)
+        """
+        self.frames = frames if frames is not None else load_recording(path)
+        self.max_num_hands = max_num_hands
+        self.loop = loop
+        self.position = 0
+
+    def process(self, rgb, timestamp_ms):
+        if self.position >= len(self.frames):
+            if not self.loop or not self.frames:
+                return NO_HANDS
+            self.position = 0
+        landmarks, handedness, scores = self.frames[self.position]
+        self.position += 1
+        n = self.max_num_hands
+        return landmarks[:n].copy(), list(handedness[:n]), list(scores[:n])  # A copy: the recording stays as it was
+
+    def warm_up(self, rgb):
+        pass  # Nothing to load, and the recording should start at its first frame
+
+
+BACKENDS = {
+    "solutions": SolutionsBackend,
+    "tasks": TasksLiveStreamBackend,
+    "replay": ReplayBackend,
+}
+
+
+def make_backend(name="solutions", **params):
+    """
+    Creates a hand landmark backend by name ("solutions", "tasks" or "replay"); params go to its constructor.
+    """
+    return BACKENDS[name](**params)
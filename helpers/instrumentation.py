@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class RollingHistogram:
+    def __init__(self, capacity=300):
+        """
+        Keeps the last `capacity` samples (in nanoseconds) in a preallocated ring, for rolling percentiles.
+        """
+        self.samples = np.zeros(capacity, np.int64)
+        self.capacity = capacity
+        self.count = 0  # Total number of samples ever added
+
+    def add(self, ns):
+        self.samples[self.count % self.capacity] = ns
+        self.count += 1
+
+    def values(self):
+        return self.samples[:min(self.count, self.capacity)].copy()
+
+    def summary(self):
+        """
+        Returns:
+        - Dictionary with p50/p95/p99/mean in milliseconds and the total sample count (None if there are no samples)
+        """
+        values = self.values()
+        if len(values) == 0:
+            return None
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) / 1e6
+        return {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(values.mean()) / 1e6, 3),
+            "count": self.count,
+        }
+
+
+class _StageTimer:
+    # Context manager returned by Instrumentation.stage()
+    __slots__ = ("instrumentation", "name", "started")
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation.record(self.name, time.perf_counter_ns() - self.started)
+
+
+class Instrumentation:
+    def __init__(self, window=300, enabled=True):
+        """
+        Lightweight per-stage timing with nanosecond timers and rolling histograms.
+
+        Two ways to time a stage:
+        - lap style for flat loops: start() at the top of the loop, then lap("stage") after each stage
+          (the lap clock is per thread, so pipelined stages on other threads can use it too)
+        - with instrumentation.stage("name"): ...
+
+        Args:
+        - window: Number of recent samples kept per stage
+        - enabled: When False every call is a cheap no-op
+        """
+        self.window = window
+        self.enabled = enabled
+        self.histograms = {}
+        self.order = []  # Stage names in first-seen order, for stable reports
+        self.frame_interval = RollingHistogram(window)
+        self.last_tick = None
+        self.local = threading.local()
+        self.lock = threading.Lock()  # Only taken the first time a stage name is seen
+
+    def record(self, name, ns):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = RollingHistogram(self.window)
+                    self.order.append(name)
+        histogram.add(ns)
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    def start(self):
+        self.local.last = time.perf_counter_ns()
+
+    def lap(self, name):
+        now = time.perf_counter_ns()
+        last = getattr(self.local, "last", None)
+        if last is not None:
+            self.record(name, now - last)
+        self.local.last = now
+
+    def tick(self):
+        """
+        Marks the end of a frame; the intervals between ticks give the frame rate.
+        """
+        now = time.perf_counter_ns()
+        if self.last_tick is not None:
+            self.frame_interval.add(now - self.last_tick)
+        self.last_tick = now
+
+    def fps(self):
+        # Frame rate over the rolling window (0 until two frames have been seen, never a division by zero)
+        values = self.frame_interval.values()
+        if len(values) == 0 or values.sum() == 0:
+            return 0.0
+        return len(values) * 1e9 / float(values.sum())
+
+    def snapshot(self):
+        """
+        Returns:
+        - Dictionary with the frame rate and the p50/p95/p99/mean latency (ms) of every stage
+        """
+        stages = {}
+        for name in list(self.order):
+            summary = self.histograms[name].summary()
+            if summary is not None:
+                stages[name] = summary
+        return {"fps": round(self.fps(), 2), "stages": stages}
+
+    def draw_overlay(self, frame, origin=(15, 160), font_scale=0.5, color=(255, 255, 255)):
+        """
+        Draws one line per stage ("detect  p50 12.1 ms  p95 15.3 ms") on the frame, worst p95 highlighted in red.
+        """
+        stages = self.snapshot()["stages"]
+        if not stages:
+            return frame
+        worst = max(stages, key=lambda name: stages[name]["p95"])
+        (_, line_height), baseline = cv2.getTextSize("Ag", cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)
+        x, y = origin
+        for name, summary in stages.items():
+            text = f"{name:<10} p50 {summary['p50']:6.2f} ms  p95 {summary['p95']:6.2f} ms"
+            cv2.putText(
+                frame,
+                text,
+                (x, y),
+                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                fontScale=font_scale,
+                color=(0, 0, 255) if name == worst else color,
+                thickness=1,
+            )
+            y += line_height + baseline + 4
+        return frame
+
+
+class _PhaseTimer:
+    # Context manager returned by StartupProfile.phase()
+    __slots__ = ("profile", "name", "started")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.add(self.name, self.started, time.perf_counter_ns())
+
+
+class StartupProfile:
+    def __init__(self, origin_ns=None):
+        """
+        Startup timing: when each phase started (relative to origin_ns, e.g. taken before the first import) and how
+        long it took, on whichever thread it ran.
+
+        Args:
+        - origin_ns: time.perf_counter_ns() value the report counts from (default is now)
+        """
+        self.origin_ns = origin_ns if origin_ns is not None else time.perf_counter_ns()
+        self.phases = []  # (name, start ns, end ns, thread name)
+        self.lock = threading.Lock()
+
+    def phase(self, name):
+        return _PhaseTimer(self, name)
+
+    def add(self, name, start_ns, end_ns):
+        with self.lock:
+            self.phases.append((name, start_ns, end_ns, threading.current_thread().name))
+
+    def mark(self, name):
+        # A milestone without duration (e.g. "first frame")
+        now = time.perf_counter_ns()
+        self.add(name, now, now)
+
+    def summary(self):
+        """
+        Returns:
+        - List of {"phase", "start_ms", "duration_ms", "thread"} dictionaries, in start order
+        """
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        return [
+            {
+                "phase": name,
+                "start_ms": round((start - self.origin_ns) / 1e6, 1),
+                "duration_ms": round((end - start) / 1e6, 1),
+                "thread": thread,
+            }
+            for name, start, end, thread in phases
+        ]
+
+    def report(self):
+        lines = [f"{'start ms':>9} {'took ms':>9}  {'thread':<16} phase"]
+        for phase in self.summary():
+            lines.append(
+                f"{phase['start_ms']:>9.1f} {phase['duration_ms']:>9.1f}  {phase['thread']:<16} {phase['phase']}"
+            )
+        return "\n".join(lines)
+
+
+class SnapshotWriter:
+    def __init__(self, instrumentation, path, interval=5.0):
+        """
+        Periodically writes instrumentation snapshots from a background thread, so the main loop never waits on disk.
+
+        The format follows the file extension:
+        - .prom / .txt: Prometheus text exposition format (rewritten atomically, e.g. for node_exporter's textfile
+          collector)
+        - anything else: CSV, one row per stage per snapshot (appended)
+
+        Args:
+        - instrumentation: Instrumentation instance to read from
+        - path: Output file
+        - interval: Seconds between snapshots
+        """
+        self.instrumentation = instrumentation
+        self.path = path
+        self.interval = interval
+        self.prometheus = path.endswith((".prom", ".txt"))
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        snapshot = self.instrumentation.snapshot()
+        if self.prometheus:
+            self._write_prometheus(snapshot)
+        else:
+            self._write_csv(snapshot)
+
+    def _write_csv(self, snapshot):
+        timestamp = round(time.time(), 3)
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a") as f:
+            if new_file:
+                f.write("timestamp,stage,p50_ms,p95_ms,p99_ms,mean_ms,count,fps\n")
+            for name, s in snapshot["stages"].items():
+                f.write(f"{timestamp},{name},{s['p50']},{s['p95']},{s['p99']},{s['mean']},{s['count']},{snapshot['fps']}\n")
+
+    def _write_prometheus(self, snapshot):
+        lines = [
+            "# HELP airpalette_fps Rendered frames per second over the rolling window.",
+            "# TYPE airpalette_fps gauge",
+            f"airpalette_fps {snapshot['fps']}",
+            "# HELP airpalette_stage_latency_seconds Per-stage latency over the rolling window.",
+            "# TYPE airpalette_stage_latency_seconds gauge",
+        ]
+        for name, s in snapshot["stages"].items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f'airpalette_stage_latency_seconds{{stage="{name}",quantile="{quantile}"}} {s[key] / 1e3}')
+        lines += [
+            "# HELP airpalette_stage_samples_total Number of timed runs of each stage.",
+            "# TYPE airpalette_stage_samples_total counter",
+        ]
+        for name, s in snapshot["stages"].items():
+            lines.append(f'airpalette_stage_samples_total{{stage="{name}"}} {s["count"]}')
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)  # Readers never see a half-written file
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(1.0)
+        self.write()  # Final snapshot
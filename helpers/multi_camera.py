@@ -0,0 +1,526 @@
+import argparse
+import math
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from helpers import frame_sources as FS  # Webcam / video file / image sequence / synthetic frame sources
+from helpers import instrumentation as IN  # Per-stage timing
+from helpers import painter as PT  # Tool state and canvas of one painter
+from helpers import pipeline as PL  # Latest-frame queues (stale frames are dropped, never queued up)
+from helpers import sessions as SS  # Pool of inference worker processes
+from helpers import toolbar as TB  # Toolbar layout shared with app.py
+from helpers import track_hands as TH  # Hand tracking
+
+POLICIES = ("round_robin", "priority")
+
+WINDOW_NAME = "Play_with_Paint - cameras"
+
+
+class CameraStream:
+    def __init__(
+        self, stream_id, source, name=None, width=960, height=540, inference_width=640, priority=1, fps=None,
+        toolbar=None,
+    ):
+        """
+        One camera of a multi-camera installation: a capture thread that keeps the newest frame of its source, and
+        a painter that draws on each frame once its hand inference is back. Frames are only mirrored and resized
+        when the scheduler takes them (see prepare), so the many frames that are dropped cost nothing but the read.
+
+        Args:
+        - stream_id: Key of the stream in the inference pool
+        - source: Frame source (helpers/frame_sources.py)
+        - name: Label shown on the output (default is "cam<stream_id>")
+        - width, height: Size of the rendered frames
+        - inference_width: Width of the frames sent for inference
+        - priority: Share of inference the stream gets under the "priority" policy (2 = twice as often as 1)
+        - fps: Rate frames are read at (default is None: a video file plays at its own frame rate, like the camera
+          it stands in for, and other sources as fast as they deliver frames, which a live camera paces by itself)
+        - toolbar: Optional compiled Toolbar shared with other streams of the same width
+        """
+        self.stream_id = stream_id
+        self.source = source
+        self.name = name or f"cam{stream_id}"
+        self.width = width
+        self.height = height
+        self.inference_width = inference_width
+        self.priority = priority
+        if fps is None and isinstance(source, FS.VideoFileSource):
+            fps = source.cap.get(cv2.CAP_PROP_FPS) or None
+        self.fps = fps
+        self.slot = PL.LatestQueue(1)  # Newest captured frame, waiting for the scheduler
+        self.painter = PT.Painter(width, height, toolbar=toolbar)
+        self.detector = TH.handDetector()  # Only maps the pool's landmarks to frames, never loads the model
+        self.latency = IN.RollingHistogram()  # Capture to rendered frame
+        self.instrumentation = IN.Instrumentation()  # "queued", "infer" and "render" stages, ticked per rendered frame
+        self.worker = None  # Pool worker that holds the stream's detector (the scheduler moves it when needed)
+        self.moves = 0  # Times the stream moved to another worker
+        self.captured = 0
+        self.rendered = 0
+        self.errors = 0
+        self.ended = False
+        self.latest = None  # Newest rendered frame
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self, on_frame):
+        """
+        Starts capturing; on_frame is called after every captured frame (and once when the source ends).
+        """
+        self.thread = threading.Thread(target=self._capture, args=(on_frame,), name=f"capture-{self.name}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _capture(self, on_frame):
+        interval = 1.0 / self.fps if self.fps else 0.0
+        next_read = time.perf_counter()
+        while not self.stop_event.is_set():
+            ret, frame = self.source.read()
+            if not ret:
+                break
+            self.captured += 1
+            self.slot.put((time.perf_counter_ns(), frame))
+            on_frame()
+            if interval:
+                next_read = max(next_read + interval, time.perf_counter() - interval)
+                delay = next_read - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        self.ended = True
+        on_frame()
+
+    def prepare(self, frame):
+        """
+        Mirrors a captured frame and scales it to the stream's size.
+
+        Returns:
+        - (frame, small): the frame to paint on, and the copy downscaled to inference_width (only the small frame
+          crosses the process boundary)
+        """
+        frame = cv2.flip(frame, 1)
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height))
+        small = frame
+        if self.inference_width and self.inference_width < self.width:
+            inference_height = max(1, round(self.height * self.inference_width / self.width))
+            small = cv2.resize(frame, (self.inference_width, inference_height), interpolation=cv2.INTER_AREA)
+        return frame, small
+
+    def render(self, captured_ns, frame, result):
+        """
+        Applies the gestures of an inferred frame and composites the canvas onto it (on the caller's thread).
+        """
+        self.detector.setLandmarks(*result)
+        frame = self.detector.drawHands(frame)
+        landmark_list = self.detector.findPosition(frame, draw=False)
+        my_fingers = self.detector.fingerStatus() if len(landmark_list) != 0 else []
+        self.painter.update(frame, landmark_list, my_fingers)
+        frame = self.painter.composite(frame)
+        self.latency.add(time.perf_counter_ns() - captured_ns)
+        self.instrumentation.tick()
+        self.latest = frame
+        self.rendered += 1
+        return frame
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(5.0)
+        self.source.release()
+
+    def stats(self):
+        return {
+            "stream": self.name,
+            "priority": self.priority,
+            "captured": self.captured,
+            "rendered": self.rendered,
+            "dropped": self.slot.dropped,
+            "errors": self.errors,
+            "moves": self.moves,
+            "fps": round(self.instrumentation.fps(), 2),
+            "latency": self.latency.summary(),
+            "stages": self.instrumentation.snapshot()["stages"],
+        }
+
+
+class InferenceScheduler:
+    def __init__(self, pool, streams, policy="round_robin", steal_after=0.1):
+        """
+        Decides which stream's newest frame each inference worker runs next, for streams sharing an InferencePool.
+
+        Every stream stays on the worker the pool pinned it to, which keeps its detector and MediaPipe's tracking
+        state. A worker gets one frame at a time, so the choice is made when it becomes free, among its streams
+        that have a frame waiting; frames that became stale meanwhile were already dropped by the stream.
+
+        - "round_robin": the waiting streams take turns
+        - "priority": stride scheduling, each stream gets a share of its worker proportional to its priority.
+          A low-priority stream is served less often, but never starved.
+
+        The policy only matters for streams that share a worker: a stream alone on its worker gets all of it.
+        Moving a stream rebuilds its detector on the new worker, which costs several inferences, so a stream only
+        moves when a frame of it has waited steal_after seconds on its busy worker and another worker is idle.
+        The move is kept (the stream is pinned to its new worker) and counted in the stream's stats.
+
+        Args:
+        - pool: Started InferencePool (the streams are registered with it here)
+        - streams: CameraStreams
+        - policy: "round_robin" or "priority"
+        - steal_after: Seconds a stream's frames wait on its busy worker before an idle worker takes the stream over
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy {policy!r}, expected one of {POLICIES}")
+        self.pool = pool
+        self.streams = list(streams)
+        self.policy = policy
+        self.passes = {}  # Stream id -> virtual time of its next turn
+        for stream in self.streams:
+            stream.worker = pool.register(stream.stream_id)
+            self.passes[stream.stream_id] = 0.0
+        self.steal_after = steal_after
+        self.busy = [False] * pool.workers
+        self.clocks = [0.0] * pool.workers  # Virtual time of each worker (pass of the stream it served last)
+        self.inflight = set()  # Ids of the streams with a frame at a worker (one at a time, so results stay in order)
+        self.waiting_since = {}  # Stream id -> when its waiting frames (the newest of which is in the slot) arrived
+        self.results = queue.Queue()  # (stream, captured_ns, frame, result or None) in completion order
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._dispatch, name="inference-scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def wake(self):
+        # Called by the capture threads and on every finished inference
+        with self.condition:
+            self.condition.notify()
+
+    def _pick(self, worker, ready):
+        # Round robin is stride scheduling with equal priorities: every turn moves a stream to the back
+        weight = (lambda stream: stream.priority) if self.policy == "priority" else (lambda stream: 1)
+        # A stream that had no frame waiting does not bank turns: it rejoins at the worker's current virtual time
+        for stream in ready:
+            self.passes[stream.stream_id] = max(self.passes[stream.stream_id], self.clocks[worker])
+        stream = min(ready, key=lambda stream: (self.passes[stream.stream_id], stream.stream_id))
+        self.clocks[worker] = self.passes[stream.stream_id]
+        self.passes[stream.stream_id] += 1.0 / max(weight(stream), 1e-6)
+        return stream
+
+    def _dispatch(self):
+        while True:
+            with self.condition:
+                job = None
+                while not self.stopped and job is None:
+                    job = self._next()
+                    if job is None:
+                        self.condition.wait(0.1)
+                if self.stopped:
+                    return
+            self._submit(*job)  # Outside the lock: the capture threads and finished inferences only wait for _next
+
+    def _next(self):
+        # The next (stream, worker, item) to run, or None when no worker is free or no frame is waiting
+        now = time.perf_counter()
+        waiting = [
+            stream for stream in self.streams if stream.stream_id not in self.inflight and stream.slot.qsize()
+        ]
+        for stream in waiting:
+            self.waiting_since.setdefault(stream.stream_id, now)
+        for worker, busy in enumerate(self.busy):
+            if busy:
+                continue
+            ready = [stream for stream in waiting if stream.worker == worker]
+            if not ready:
+                # Nothing of its own to do: take over a stream that its busy worker has kept waiting
+                ready = [
+                    stream for stream in waiting
+                    if self.busy[stream.worker] and now - self.waiting_since[stream.stream_id] >= self.steal_after
+                ]
+            if not ready:
+                continue
+            stream = self._pick(worker, ready)
+            item = stream.slot.get(timeout=0)
+            if item is None:
+                continue
+            del self.waiting_since[stream.stream_id]
+            self.busy[worker] = True
+            self.inflight.add(stream.stream_id)
+            if stream.worker != worker:
+                self.pool.move(stream.stream_id, worker)
+                stream.worker = worker
+                stream.moves += 1
+            return stream, worker, item
+        return None
+
+    def _submit(self, stream, worker, item):
+        captured_ns, frame = item
+        frame, small = stream.prepare(frame)
+        submitted_ns = time.perf_counter_ns()
+        stream.instrumentation.record("queued", submitted_ns - captured_ns)
+
+        def done(future):
+            stream.instrumentation.record("infer", time.perf_counter_ns() - submitted_ns)
+            try:
+                result = future.result()
+            except Exception:  # Counted, the stream goes on with its next frame
+                stream.errors += 1
+                result = None
+            self.results.put((stream, captured_ns, frame, result))
+            with self.condition:
+                self.busy[worker] = False
+                self.inflight.discard(stream.stream_id)
+                self.condition.notify()
+
+        self.pool.submit(stream.stream_id, small).add_done_callback(done)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(1.0)
+        for stream in self.streams:
+            self.pool.unregister(stream.stream_id, rebalance=False)  # All of them leave: nothing to rebalance
+
+
+def tile(frames, width, height, columns=None, labels=()):
+    """
+    Arranges frames in a grid on one output frame (each scaled to fit its cell, keeping the aspect ratio).
+
+    Args:
+    - frames: BGR frames (None leaves the cell black)
+    - width, height: Size of the output frame
+    - columns: Number of columns (default is None, the smallest square grid)
+    - labels: Optional text drawn in the corner of each cell
+
+    Returns:
+    - The BGR output frame
+    """
+    columns = columns or max(1, math.ceil(math.sqrt(len(frames))))
+    rows = max(1, math.ceil(len(frames) / columns))
+    cell_w, cell_h = width // columns, height // rows
+    out = np.zeros((height, width, 3), np.uint8)
+    for index, frame in enumerate(frames):
+        y, x = divmod(index, columns)
+        x0, y0 = x * cell_w, y * cell_h
+        if frame is not None:
+            scale = min(cell_w / frame.shape[1], cell_h / frame.shape[0])
+            w, h = max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale))
+            cv2.resize(frame, (w, h), dst=out[y0:y0 + h, x0:x0 + w], interpolation=cv2.INTER_AREA)
+        if index < len(labels):
+            cv2.putText(
+                out,
+                labels[index],
+                (x0 + 10, y0 + cell_h - 12),
+                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                fontScale=0.6,
+                color=(0, 255, 255),
+                thickness=2,
+            )
+    return out
+
+
+class MultiCameraRunner:
+    def __init__(
+        self,
+        sources,
+        priorities=None,
+        policy="round_robin",
+        workers=None,
+        width=960,
+        height=540,
+        inference_width=640,
+        fps=None,
+        layout="tiled",
+        output_size=(1280, 720),
+        headless=False,
+        **detector_params,
+    ):
+        """
+        Runs several cameras (or video files standing in for them) on one machine: every source is captured on
+        its own thread, hand inference for all of them runs on one shared InferencePool, scheduled by an
+        InferenceScheduler, and the painted frames are shown tiled in one window or in a window per stream.
+
+        Args:
+        - sources: Frame source descriptions (see frame_sources.open_source) or FrameSource objects
+        - priorities: Optional priority of each source, for the "priority" policy (default is 1 for all)
+        - policy: "round_robin" or "priority" (see InferenceScheduler)
+        - workers: Number of inference worker processes (default is one per source, up to the number of CPU cores)
+        - width, height: Size each stream is rendered at
+        - inference_width: Width of the frames sent for inference
+        - fps: Read rate for video files (see CameraStream)
+        - layout: "tiled" (one window) or "windows" (one window per stream)
+        - output_size: Size of the tiled output
+        - headless: Run without windows (frames go to a null sink)
+        - detector_params: Arguments for the workers' handDetectors (default min_detection_confidence is 0.85)
+        """
+        if layout not in ("tiled", "windows"):
+            raise ValueError(f"Unknown layout {layout!r}, expected 'tiled' or 'windows'")
+        detector_params.setdefault("min_detection_confidence", 0.85)
+        priorities = list(priorities or [])
+        toolbar = TB.Toolbar().compile(width)
+        self.streams = []
+        for index, source in enumerate(sources):
+            name = None
+            if isinstance(source, str):
+                name = source
+                source = FS.open_source(source, width=width, height=height)
+            priority = priorities[index] if index < len(priorities) else 1
+            self.streams.append(
+                CameraStream(index, source, name, width, height, inference_width, priority, fps, toolbar=toolbar)
+            )
+        self.policy = policy
+        self.workers = workers or min(len(self.streams), os.cpu_count() or 1)
+        self.detector_params = detector_params
+        self.layout = layout
+        self.output_size = output_size
+        self.display = FS.NullSink() if headless else cv2
+        self.pool = None
+        self.scheduler = None
+        self.instrumentation = IN.Instrumentation()  # Rate of shown output frames
+        self.started_at = None
+        self.output = None  # Newest tiled output frame
+
+    def start(self):
+        self.pool = SS.InferencePool(self.workers, **self.detector_params).start()
+        self.scheduler = InferenceScheduler(self.pool, self.streams, self.policy).start()
+        if self.layout == "tiled":
+            self.display.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+        else:
+            for stream in self.streams:
+                self.display.namedWindow(stream.name, cv2.WINDOW_NORMAL)
+        self.started_at = time.perf_counter()
+        for stream in self.streams:
+            stream.start(self.scheduler.wake)
+        return self
+
+    def step(self, timeout=0.1):
+        """
+        Renders every inference result that came back and shows the output.
+
+        Returns:
+        - False when the runner should stop (every source ended, or Esc or q pressed)
+        """
+        rendered = 0
+        try:
+            item = self.scheduler.results.get(timeout=timeout)
+            while True:
+                stream, captured_ns, frame, result = item
+                if result is not None:
+                    with stream.instrumentation.stage("render"):
+                        stream.render(captured_ns, frame, result)
+                    rendered += 1
+                item = self.scheduler.results.get_nowait()
+        except queue.Empty:
+            pass
+
+        if rendered:
+            if self.layout == "tiled":
+                labels = [self._label(stream) for stream in self.streams]
+                self.output = tile([stream.latest for stream in self.streams], *self.output_size, labels=labels)
+                self.display.imshow(WINDOW_NAME, self.output)
+            else:
+                for stream in self.streams:
+                    if stream.latest is not None:
+                        self.display.imshow(stream.name, stream.latest)
+            self.instrumentation.tick()
+
+        key = self.display.waitKey(1) & 0xFF
+        if key == 27 or key == ord("q"):
+            return False
+        # Done once every source has ended and its last frames were shown
+        return not (all(stream.ended and not stream.slot.qsize() for stream in self.streams)
+                    and not any(self.scheduler.busy) and self.scheduler.results.empty())
+
+    @staticmethod
+    def _label(stream):
+        latency = stream.latency.summary()
+        text = f"{stream.name}  {stream.instrumentation.fps():.1f} fps"
+        return text + (f"  {latency['p50']:.0f} ms" if latency else "")
+
+    def run(self, seconds=None):
+        """
+        Starts the runner (if start() was not called yet) and renders until it is stopped, every source ended or
+        seconds elapsed.
+
+        Returns:
+        - The stats() at the end
+        """
+        if self.pool is None:
+            self.start()
+        try:
+            while self.step():
+                if seconds is not None and time.perf_counter() - self.started_at >= seconds:
+                    break
+            return self.stats()
+        finally:
+            self.close()
+
+    def stats(self):
+        """
+        Returns:
+        - Dictionary with the aggregate throughput (rendered frames per second over all streams), the per-stream
+          stats (rendered/captured/dropped frames, frame rate, capture-to-render latency in ms, per-stage times)
+          and the pool's per-worker inference times
+        """
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        rendered = sum(stream.rendered for stream in self.streams)
+        return {
+            "policy": self.policy,
+            "seconds": round(elapsed, 2),
+            "throughput_fps": round(rendered / elapsed, 2) if elapsed else 0.0,
+            "output_fps": round(self.instrumentation.fps(), 2),
+            "streams": [stream.stats() for stream in self.streams],
+            "pool": self.pool.stats() if self.pool is not None else None,
+        }
+
+    def close(self):
+        for stream in self.streams:
+            stream.stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.pool is not None:
+            self.pool.stop()
+        self.display.destroyAllWindows()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paint on several cameras (or video files) at once.")
+    parser.add_argument("sources", nargs="+", help="e.g. webcam:0 webcam:1 lobby.mp4")
+    parser.add_argument("--policy", choices=POLICIES, default="round_robin")
+    parser.add_argument("--priorities", nargs="+", type=float, help="one per source, for --policy priority")
+    parser.add_argument(
+        "--workers", type=int, help="inference worker processes (default: one per source, up to one per core)"
+    )
+    parser.add_argument("--layout", choices=("tiled", "windows"), default="tiled")
+    parser.add_argument("--fps", type=float, help="read rate for video files")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--seconds", type=float)
+    args = parser.parse_args()
+
+    runner = MultiCameraRunner(
+        args.sources,
+        priorities=args.priorities,
+        policy=args.policy,
+        workers=args.workers,
+        fps=args.fps,
+        layout=args.layout,
+        headless=args.headless,
+    )
+    stats = runner.run(args.seconds)
+    print("Throughput: {throughput_fps} frames/s over {seconds} s".format(**stats))
+    for stream in stats["streams"]:
+        latency = stream["latency"] or {}
+        print(
+            f"{stream['stream']}: {stream['fps']} fps, latency p50 {latency.get('p50')} ms "
+            f"p95 {latency.get('p95')} ms, {stream['rendered']}/{stream['captured']} frames rendered"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+import time
+
+import cv2
+import numpy as np
+
+from helpers import compositor as CP  # Incremental canvas compositing
+from helpers import strokes as SK  # Vector stroke log
+from helpers import toolbar as TB  # Toolbar layout shared with app.py
+
+
+class Painter:
+    def __init__(
+        self,
+        width=1280,
+        height=720,
+        draw_color=(81, 242, 56),
+        brush_thickness=15,
+        eraser_thickness=100,
+        canvas_backend="dense",
+        toolbar=None,
+        compositor=None,
+        strokes=None,
+        stroke_filter=None,
+    ):
+        """
+        Tool state and canvas of one painter: the selected color and header, the previous brush point, the canvas
+        and the stroke log. This is the single-hand SELECT/PAINT gesture logic used by app.py, VideoCamera, the
+        sessions and the camera streams, so any number of painters can share one process.
+
+        Args:
+        - width, height: Size of the frames (and canvas) the painter draws on
+        - draw_color: Initial brush color (BGR)
+        - brush_thickness, eraser_thickness: Line thicknesses in pixels
+        - canvas_backend: "dense" or "tiled" (see helpers/compositor.py), for a canvas of the painter's own
+        - toolbar: Optional compiled Toolbar to share between painters of the same width
+        - compositor, strokes: Optional canvas and StrokeLog to draw on (default is new ones of the painter's own)
+        - stroke_filter: Optional filter for the index finger tip (see helpers/filters.py)
+        """
+        self.width = width
+        self.height = height
+        self.draw_color = draw_color
+        self.brush_thickness = brush_thickness
+        self.eraser_thickness = eraser_thickness
+        self.toolbar = toolbar or TB.Toolbar().compile(width)
+        self.default_overlay = self.toolbar.headers[0]
+        self.filter = stroke_filter
+        self.xp = 0  # Previous brush point
+        self.yp = 0
+        self.mode = "DEFAULT Mode"
+        self.compositor = compositor if compositor is not None else CP.make_compositor(width, height, canvas_backend)
+        self.strokes = strokes if strokes is not None else SK.StrokeLog(width, height)
+        self.changed_rect = None  # Canvas rectangle changed by the last update (None if nothing was drawn)
+
+    def update(self, frame, landmark_list, my_fingers, t=None, overlay=True):
+        """
+        Applies the gestures of one frame: picks a color in SELECT mode, draws on the canvas in PAINT mode. Any other
+        frame (including one without a hand) ends the stroke, and the next one starts where the finger is then.
+
+        Args:
+        - frame: Display frame (brush feedback, and with overlay the header and mode text, are drawn on it)
+        - landmark_list: [ID, x, y] landmarks of the hand in frame coordinates (empty if no hand)
+        - my_fingers: Finger status list from fingerStatus (empty if no hand)
+        - t: Timestamp for the fingertip filter (default is None, which uses time.perf_counter())
+        - overlay: Draw the toolbar header and the mode text (False leaves them to the caller)
+
+        Returns:
+        - The current mode ("DEFAULT Mode", "SELECT Mode" or "PAINT Mode")
+        """
+        self.mode = "DEFAULT Mode"
+        self.changed_rect = None
+        if len(landmark_list) != 0:
+            x1, y1 = landmark_list[8][1:]  # Index finger tip
+            if self.filter is not None:
+                x1, y1 = self.filter.update((x1, y1), time.perf_counter() if t is None else t)
+            x2, y2 = landmark_list[12][1:]  # Middle finger tip
+
+            # SELECT mode: index and middle fingers up
+            if my_fingers[1] and my_fingers[2]:
+                self.mode = "SELECT Mode"
+                slot = self.toolbar.hit(x1, y1)
+                if slot >= 0:
+                    self.default_overlay = self.toolbar.headers[slot]
+                    self.draw_color = self.toolbar.colors[slot]
+                cv2.line(frame, (x1, y1), (x2, y2), color=self.draw_color, thickness=3)
+
+            # PAINT mode: only the index finger up
+            if my_fingers[1] and not my_fingers[2]:
+                self.mode = "PAINT Mode"
+                cv2.circle(frame, (x1, y1), 15, self.draw_color, thickness=-1)
+                if self.xp == 0 and self.yp == 0:
+                    self.xp, self.yp = x1, y1
+                thickness = self.eraser_thickness if self.draw_color == (0, 0, 0) else self.brush_thickness
+                if self.strokes.current is None:
+                    self.strokes.begin((self.xp, self.yp), self.draw_color, thickness)
+                self.strokes.add((x1, y1))
+                cv2.line(frame, (self.xp, self.yp), (x1, y1), color=self.draw_color, thickness=thickness)
+                self.changed_rect = self.compositor.line(
+                    (self.xp, self.yp), (x1, y1), color=self.draw_color, thickness=thickness
+                )
+                self.xp, self.yp = x1, y1
+        elif self.filter is not None:
+            self.filter.reset()  # The hand is gone: don't smooth or predict across the gap
+
+        if self.mode != "PAINT Mode":
+            self.strokes.end(self.compositor)
+            self.xp, self.yp = 0, 0
+
+        if not overlay:
+            return self.mode
+        frame[0:self.toolbar.height, 0:self.width] = self.default_overlay
+        if self.mode != "DEFAULT Mode":
+            cv2.putText(
+                frame,
+                self.mode,
+                (self.width - 380, self.height - 40),
+                fontFace=cv2.FONT_HERSHEY_DUPLEX,
+                color=(0, 255, 255),
+                thickness=2,
+                fontScale=0.9,
+            )
+        return self.mode
+
+    def undo(self):
+        # Removes the last stroke and rebuilds the canvas from the remaining ones
+        if self.strokes.undo() is not None:
+            self.compositor.load(self.strokes.render())
+
+    def composite(self, frame):
+        return self.compositor.composite(frame)
+
+
+PALM = [0, 5, 9, 13, 17]  # Wrist and finger base landmarks: their mean follows the hand, not the moving fingertips
+
+
+class HandTracker:
+    def __init__(self, max_distance=200, max_missing=5, handedness_penalty=0.5):
+        """
+        Gives detected hands stable ids across frames. The detector lists hands in no particular order, so each
+        hand is matched to the nearest track (its last palm center moved on by its last velocity), closest pairs
+        first. A hand nobody matches starts a new id; a track unmatched for more than max_missing frames is
+        dropped.
+
+        Args:
+        - max_distance: Farthest a hand can be from a track's predicted position and still match it, in pixels
+        - max_missing: Frames a track survives without a hand (detection blips, a hand briefly out of view)
+        - handedness_penalty: Fraction of max_distance added to a pair whose "Left"/"Right" labels differ, so
+          crossing hands keep their ids
+        """
+        self.max_distance = max_distance
+        self.max_missing = max_missing
+        self.handedness_penalty = handedness_penalty
+        self.tracks = {}  # id -> [center, velocity, label, frames missing]
+        self.next_id = 1
+
+    def update(self, centers, labels=()):
+        """
+        Args:
+        - centers: (n, 2) palm centers of the hands detected in this frame
+        - labels: Optional handedness label of each hand
+
+        Returns:
+        - (ids, lost): the id of each hand, in the order of centers, and the ids of the tracks dropped this frame
+        """
+        centers = np.asarray(centers, np.float32).reshape(-1, 2)
+        ids = [None] * len(centers)
+        track_ids = list(self.tracks)
+        if track_ids and len(centers):
+            predicted = np.array(
+                [center + velocity * (missing + 1) for center, velocity, _, missing in map(self.tracks.get, track_ids)],
+                np.float32,
+            )
+            distance = np.linalg.norm(centers[:, None, :] - predicted[None, :, :], axis=-1)
+            cost = distance.copy()
+            for j, tid in enumerate(track_ids):
+                for i, label in enumerate(labels):
+                    if self.tracks[tid][2] is not None and label != self.tracks[tid][2]:
+                        cost[i, j] += self.handedness_penalty * self.max_distance
+            # Greedy assignment, cheapest pair first (a handful of hands does not need the Hungarian algorithm)
+            for flat in np.argsort(cost, axis=None):
+                i, j = divmod(int(flat), len(track_ids))
+                # Sorted by cost, not distance: a too-far pair can come before a near one with a handedness penalty
+                if distance[i, j] > self.max_distance or ids[i] is not None or track_ids[j] in ids:
+                    continue
+                ids[i] = track_ids[j]
+
+        for i, center in enumerate(centers):
+            label = labels[i] if i < len(labels) else None
+            if ids[i] is None:
+                ids[i] = self.next_id
+                self.next_id += 1
+                self.tracks[ids[i]] = [center, np.zeros(2, np.float32), label, 0]
+            else:
+                track = self.tracks[ids[i]]
+                track[1] = (center - track[0]) / (track[3] + 1)
+                track[0], track[2], track[3] = center, label, 0
+
+        lost = []
+        for tid in track_ids:
+            if tid not in ids:
+                track = self.tracks[tid]
+                track[3] += 1
+                if track[3] > self.max_missing:
+                    del self.tracks[tid]
+                    lost.append(tid)
+        return ids, lost
+
+    def reset(self):
+        self.tracks = {}
+
+
+class Brush:
+    def __init__(self, hand_id, color, header, stroke_filter=None):
+        """
+        Tool state of one hand: color (black is the eraser), the toolbar header it selected, the previous brush
+        point, the mode and the stroke being drawn.
+        """
+        self.id = hand_id
+        self.color = color
+        self.header = header
+        self.filter = stroke_filter  # Optional filter for the index finger tip (see helpers/filters.py)
+        self.xp = 0  # Previous brush point
+        self.yp = 0
+        self.mode = "DEFAULT Mode"
+        self.stroke = None  # Stroke being drawn, committed to the stroke log when it ends
+        self.extent = None  # Canvas rectangle the segments of the stroke cover (None before its first segment)
+
+    @property
+    def tool(self):
+        return "brush" if any(self.color) else "eraser"
+
+    def lift(self):
+        # The hand stopped painting (or disappeared): the next segment starts a new stroke
+        self.xp, self.yp = 0, 0
+        if self.filter is not None:
+            self.filter.reset()
+        self.stroke = self.extent = None
+
+
+def _overlaps(a, b):
+    return a is not None and b is not None and a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class MultiHandPainter:
+    def __init__(
+        self,
+        compositor,
+        stroke_log,
+        toolbar,
+        draw_color=(81, 242, 56),
+        brush_thickness=15,
+        eraser_thickness=100,
+        make_filter=None,
+        tracker=None,
+        batched=True,
+    ):
+        """
+        Every detected hand is an independent brush with its own color, previous point and SELECT/PAINT mode, all
+        painting on one canvas and stroke log. Hands keep their brush across frames through a HandTracker.
+
+        The segments of all hands are rasterized together once per frame: one compositor.lines call per color
+        and thickness instead of one line call per hand, so adding hands adds little per-frame cost.
+
+        The stroke log is kept in the order the canvas was drawn in, so rebuilding the canvas from it (undo, resume)
+        gives the live canvas back even where the strokes of several hands overlap. Strokes in progress are
+        committed together, each split at its current point, whenever one of them ends or a segment lands on a
+        stroke that would otherwise be replayed after it.
+
+        Args:
+        - compositor, stroke_log: Canvas and StrokeLog the brushes draw on (shared with the rest of the app)
+        - toolbar: Compiled Toolbar for color selection
+        - draw_color: Color of a new hand's brush (BGR)
+        - brush_thickness, eraser_thickness: Line thicknesses in pixels
+        - make_filter: Optional callable returning a new fingertip filter for each brush
+        - tracker: Optional HandTracker (default is one with its default settings)
+        - batched: Rasterize all segments in one pass per color (False draws each segment on its own, for comparison)
+        """
+        self.compositor = compositor
+        self.stroke_log = stroke_log
+        self.toolbar = toolbar
+        self.draw_color = draw_color
+        self.brush_thickness = brush_thickness
+        self.eraser_thickness = eraser_thickness
+        self.make_filter = make_filter
+        self.tracker = tracker or HandTracker()
+        self.batched = batched
+        self.brushes = {}  # Hand id -> Brush
+        self.order = []  # Brushes with segments not yet in the stroke log, in the order they will be committed
+        self.pending = []  # Strokes split off this frame, committed at its end
+        self.default_overlay = toolbar.headers[0]  # Header of the last color any hand selected
+        self.changed_rect = None  # Union of the canvas rectangles changed by the last update
+
+    def _brush(self, hand_id):
+        brush = self.brushes.get(hand_id)
+        if brush is None:
+            stroke_filter = self.make_filter() if self.make_filter is not None else None
+            brush = self.brushes[hand_id] = Brush(hand_id, self.draw_color, self.toolbar.headers[0], stroke_filter)
+        return brush
+
+    def update(self, frame, hands, fingers, handedness=(), t=None):
+        """
+        Applies the gestures of every hand for one frame and draws the new segments on the canvas.
+
+        Args:
+        - frame: Display frame (each hand's cursor and "#id mode" label are drawn on it)
+        - hands: (n_hands, 21, 3) landmarks in frame coordinates (findLandmarks(frame))
+        - fingers: (n_hands, 5) finger status (fingersUp())
+        - handedness: Optional "Left"/"Right" label of each hand (findHandedness())
+        - t: Timestamp for the fingertip filters (default is None, which uses time.perf_counter())
+
+        Returns:
+        - List of the brushes of the hands in this frame, in the order of hands
+        """
+        t = time.perf_counter() if t is None else t
+        hands = np.asarray(hands).reshape(-1, 21, 3)
+        ids, lost = self.tracker.update(hands[:, PALM, :2].mean(axis=1), handedness)
+        for hand_id in lost:
+            self._lift(self.brushes.pop(hand_id))
+
+        batches = {}  # (color, thickness) -> segments, in the order the hands drew them
+        active = []
+        for i, hand_id in enumerate(ids):
+            brush = self._brush(hand_id)
+            active.append(brush)
+            x1, y1 = int(hands[i, 8, 0]), int(hands[i, 8, 1])  # Index finger tip
+            if brush.filter is not None:
+                x1, y1 = brush.filter.update((x1, y1), t)
+            x2, y2 = int(hands[i, 12, 0]), int(hands[i, 12, 1])  # Middle finger tip
+
+            brush.mode = "DEFAULT Mode"
+            # SELECT mode: index and middle fingers up
+            if fingers[i][1] and fingers[i][2]:
+                brush.mode = "SELECT Mode"
+                brush.xp, brush.yp = 0, 0
+                slot = self.toolbar.hit(x1, y1)
+                if slot >= 0:
+                    brush.color = self.toolbar.colors[slot]
+                    brush.header = self.default_overlay = self.toolbar.headers[slot]
+                cv2.line(frame, (x1, y1), (x2, y2), color=brush.color, thickness=3)
+
+            # PAINT mode: only the index finger up
+            if fingers[i][1] and not fingers[i][2]:
+                brush.mode = "PAINT Mode"
+                if brush.xp == 0 and brush.yp == 0:
+                    brush.xp, brush.yp = x1, y1
+                thickness = self.eraser_thickness if brush.tool == "eraser" else self.brush_thickness
+                batches.setdefault((brush.color, thickness), []).append((brush, (brush.xp, brush.yp), (x1, y1)))
+                brush.xp, brush.yp = x1, y1
+            else:
+                self._lift(brush)
+
+            cv2.circle(frame, (x1, y1), 15, brush.color, thickness=-1 if brush.mode == "PAINT Mode" else 2)
+            cv2.putText(
+                frame,
+                f"#{brush.id} {brush.mode.split()[0]}",
+                (x1 + 20, y1 - 20),
+                fontFace=cv2.FONT_HERSHEY_DUPLEX,
+                color=(0, 255, 255),
+                thickness=1,
+                fontScale=0.6,
+            )
+
+        # Hands missing from this frame (but still tracked) stop painting, like a single hand that disappears
+        for hand_id, brush in self.brushes.items():
+            if hand_id not in ids:
+                brush.mode = "DEFAULT Mode"
+                self._lift(brush)
+
+        # One rasterization pass for all hands, recording the segments in the order they are drawn
+        rect = None
+        for (color, thickness), segments in batches.items():
+            for brush, pt1, pt2 in segments:
+                self._record(brush, pt1, pt2, color, thickness)
+            if self.batched:
+                rect = CP.union_rect(rect, self.compositor.lines([s[1:] for s in segments], color, thickness))
+            else:
+                for _, pt1, pt2 in segments:
+                    rect = CP.union_rect(rect, self.compositor.line(pt1, pt2, color, thickness))
+        self.changed_rect = rect
+
+        # Strokes split off go to the log; the canvas is only checkpointed when it shows exactly the logged strokes
+        pending, self.pending = self.pending, []
+        for i, stroke in enumerate(pending):
+            last = i == len(pending) - 1 and not self.order
+            self.stroke_log.commit(stroke, self.compositor if last else None)
+        return active
+
+    def _record(self, brush, pt1, pt2, color, thickness):
+        # Adds a segment, in drawing order, to its brush's stroke
+        radius = thickness // 2 + 2
+        box = (
+            min(pt1[0], pt2[0]) - radius, min(pt1[1], pt2[1]) - radius,
+            max(pt1[0], pt2[0]) + radius + 1, max(pt1[1], pt2[1]) + radius + 1,
+        )
+        if brush in self.order:
+            # Drawn over a stroke that is replayed after this one: the log would put it underneath, so split here
+            if any(_overlaps(box, other.extent) for other in self.order[self.order.index(brush) + 1:]):
+                self._flush()
+        if brush.stroke is None:
+            brush.stroke = SK.Stroke(color, thickness, brush.tool)
+            brush.stroke.add(pt1)
+        brush.stroke.add(pt2)
+        brush.extent = CP.union_rect(brush.extent, box)
+        if brush not in self.order:
+            self.order.append(brush)
+
+    def _flush(self):
+        # Queues every stroke in progress for the log, in order; their brushes go on from their last point
+        for brush in self.order:
+            stroke = brush.stroke
+            self.pending.append(stroke)
+            brush.stroke = SK.Stroke(stroke.color, stroke.thickness, stroke.tool)
+            brush.stroke.add(stroke.polyline()[-1])
+            brush.extent = None
+        self.order = []
+
+    def _lift(self, brush):
+        # A stroke ends: the strokes in progress are committed with it, so none of them is replayed out of order
+        if brush in self.order:
+            self._flush()
+        brush.lift()
+
+    def redraw(self):
+        """
+        Draws the strokes still in progress onto the canvas again, e.g. after it was rebuilt from the stroke log
+        (which only holds finished strokes).
+        """
+        for brush in self.order:
+            if brush.stroke is not None:
+                points = brush.stroke.polyline().tolist()
+                segments = list(zip(points[:-1], points[1:]))
+                self.compositor.lines(segments, brush.stroke.color, brush.stroke.thickness)
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from helpers import compositor as CP  # Canvas backends
+
+
+def _replace_atomically(path, write):
+    # Writes through a temporary file, so a crash mid-write never leaves a truncated file behind
+    root, ext = os.path.splitext(path)
+    tmp_path = root + ".tmp" + ext  # cv2.imwrite picks the format from the extension
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_canvas(path, width, height):
+    """
+    Returns:
+    - The canvas saved in a .npy checkpoint, or None if there is none of this size
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        canvas = np.load(path)
+    except (OSError, ValueError):
+        return None
+    return canvas if canvas.shape == (height, width, 3) and canvas.dtype == np.uint8 else None
+
+
+def open_compositor(width, height, backend="dense", path=None):
+    """
+    Creates a canvas compositor persisted to path (.npy), resuming the canvas saved there if there is one: the dense
+    backend memory-maps the file, the tiled backend loads the last checkpoint (written by CanvasCheckpointer).
+
+    compositor.resumed tells whether a saved canvas was picked up.
+    """
+    if path is None:
+        return CP.make_compositor(width, height, backend)
+    if backend == "dense":
+        return CP.CanvasCompositor(width, height, path=path)
+    compositor = CP.make_compositor(width, height, backend)
+    canvas = load_canvas(path, width, height)
+    if canvas is not None:
+        compositor.load(canvas)
+        compositor.resumed = True
+    return compositor
+
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _write_npy(path, array):
+    with open(path, "wb") as f:  # Through a file object, so np.save does not append ".npy" to the name
+        np.save(f, array)
+
+
+class CanvasCheckpointer:
+    def __init__(self, compositor, interval=10.0, canvas_path=None, png_path=None, stroke_log=None, stroke_path=None):
+        """
+        Periodically persists the drawing from a background thread, so the render loop never waits on disk.
+
+        On every checkpoint where the canvas changed:
+        - a memory-mapped canvas (CanvasCompositor(path=...)) is flushed to its file; any other canvas is written to
+          canvas_path as .npy (load it back with load_canvas)
+        - the canvas is exported to png_path
+        - the stroke log is saved to stroke_path
+        Files are replaced atomically.
+
+        Args:
+        - compositor: CanvasCompositor or TiledCanvasCompositor to persist
+        - interval: Seconds between checkpoints
+        - canvas_path, png_path, stroke_log, stroke_path: What to write (each one optional)
+        """
+        self.compositor = compositor
+        self.interval = interval
+        self.canvas_path = canvas_path
+        self.png_path = png_path
+        self.stroke_log = stroke_log
+        self.stroke_path = stroke_path
+        self.saved_version = 0  # Version of the canvas at the last checkpoint (0: as created or resumed)
+        self.checkpoints = 0
+        self.last_ms = None  # Duration of the last checkpoint
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="canvas-checkpointer", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.checkpoint()
+
+    def checkpoint(self, force=False):
+        """
+        Saves the drawing if it changed since the last checkpoint (or always, with force=True).
+
+        Returns:
+        - True if something was written
+        """
+        version = self.compositor.version
+        if version == self.saved_version and not force:
+            return False
+        started = time.perf_counter()
+        memmapped = isinstance(getattr(self.compositor, "canvas", None), np.memmap)
+        if memmapped:
+            self.compositor.flush()
+        if (self.canvas_path and not memmapped) or self.png_path:
+            # A copy, taken while the render loop may still draw: a segment drawn meanwhile is at worst half in it,
+            # and complete in the next checkpoint
+            canvas = self.compositor.to_array()
+            if self.canvas_path and not memmapped:
+                _replace_atomically(self.canvas_path, lambda path: _write_npy(path, canvas))
+            if self.png_path:
+                _replace_atomically(self.png_path, lambda path: cv2.imwrite(path, canvas))
+        if self.stroke_log is not None and self.stroke_path:
+            data = self.stroke_log.to_bytes()
+            _replace_atomically(self.stroke_path, lambda path: _write_bytes(path, data))
+        self.saved_version = version
+        self.checkpoints += 1
+        self.last_ms = (time.perf_counter() - started) * 1000
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(5.0)
+        self.checkpoint()  # Final checkpoint
@@ -0,0 +1,138 @@
+import collections
+import threading
+
+
+class LatestQueue:
+    def __init__(self, maxsize=1):
+        """
+        A small bounded queue that never blocks the producer: when it is full, the oldest item is dropped.
+
+        Args:
+        - maxsize: Maximum number of items kept in the queue (default is 1, i.e. only the newest frame survives)
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.items = collections.deque()
+        self.dropped = 0  # Number of stale items thrown away because a newer one arrived
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item):
+        """
+        Adds an item, dropping the oldest queued item first if the queue is full.
+
+        Returns:
+        - True if the item was queued, False if the queue was already closed
+        """
+        with self.condition:
+            if self.closed:
+                return False
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()  # Stale frame: nobody will ever want to see it now
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Waits for the next item.
+
+        Args:
+        - timeout: Seconds to wait before giving up (default is None, wait forever)
+
+        Returns:
+        - The oldest queued item, or None on timeout or when the queue is closed and empty
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            if self.items:
+                return self.items.popleft()
+            return None
+
+    def qsize(self):
+        with self.condition:
+            return len(self.items)
+
+    def close(self):
+        # Wake up every waiting consumer; queued items can still be drained with get()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FramePipeline:
+    def __init__(self, read_frame, process_frame, queue_size=1):
+        """
+        Runs capture and hand inference on their own threads so that they overlap with compose/display.
+
+        The stages are joined by LatestQueue instances, so when a stage falls behind, stale frames are dropped
+        instead of piling up: the consumer always gets the newest result and the landmark latency stays bounded.
+
+        Args:
+        - read_frame: Callable returning (ret, frame), e.g. a wrapper around cap.read()
+        - process_frame: Callable taking a frame and returning the inference result handed to the consumer
+        - queue_size: Capacity of each inter-stage queue (default is 1)
+        """
+        self.read_frame = read_frame
+        self.process_frame = process_frame
+        self.capture_queue = LatestQueue(queue_size)  # capture -> inference
+        self.output_queue = LatestQueue(queue_size)   # inference -> compose/display
+        self.captured = 0  # Frames read from the source
+        self.processed = 0  # Frames that went through inference
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def _capture_loop(self):
+        while not self.stop_event.is_set():
+            ret, frame = self.read_frame()
+            if not ret:
+                break  # End of the feed: let the inference stage drain and finish
+            self.captured += 1
+            self.capture_queue.put(frame)
+        self.capture_queue.close()
+
+    def _inference_loop(self):
+        while not self.stop_event.is_set():
+            frame = self.capture_queue.get()
+            if frame is None:
+                break  # Capture stage closed its queue
+            result = self.process_frame(frame)
+            self.processed += 1
+            self.output_queue.put(result)
+        self.output_queue.close()
+
+    def get(self, timeout=None):
+        """
+        Returns the newest processed result, or None once the feed has ended (or on timeout).
+        """
+        return self.output_queue.get(timeout)
+
+    def stats(self):
+        """
+        Returns a dictionary with the current queue depths and the number of frames dropped by each stage.
+        """
+        return {
+            "captured": self.captured,
+            "processed": self.processed,
+            "capture_queue": self.capture_queue.qsize(),
+            "output_queue": self.output_queue.qsize(),
+            "capture_dropped": self.capture_queue.dropped,
+            "output_dropped": self.output_queue.dropped,
+        }
+
+    def stop(self, timeout=1.0):
+        self.stop_event.set()
+        self.capture_queue.close()
+        self.output_queue.close()
+        for thread in self.threads:
+            thread.join(timeout)
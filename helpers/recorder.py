@@ -0,0 +1,154 @@
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameRecorder:
+    def __init__(
+        self, width, height, path=None, fps=30.0, capacity=32, fourcc="mp4v", replay_seconds=0, replay_quality=80
+    ):
+        """
+        Records frames to a video file without slowing down the render loop.
+
+        write() only copies the frame into a preallocated ring buffer; a background thread does the encoding. When
+        the encoder falls behind and the ring is full, new frames are dropped (and counted) instead of blocking.
+
+        With replay_seconds > 0 the recorder also keeps the last replay_seconds of frames, JPEG-compressed in memory,
+        and dump_replay() writes them to a video file on demand ("instant replay"), whether or not a file is being
+        recorded.
+
+        Args:
+        - width, height: Frame size of the recording (frames of another size are resized into the ring)
+        - path: Video file to record to (default is None, only the replay buffer is kept)
+        - fps: Frame rate written into the video file
+        - capacity: Number of frames the ring buffer holds
+        - fourcc: Codec of the video files
+        - replay_seconds: Length of the instant replay buffer (0 = no replay buffer)
+        - replay_quality: JPEG quality of the frames in the replay buffer
+        """
+        self.width = width
+        self.height = height
+        self.path = path
+        self.fps = fps
+        self.capacity = capacity
+        self.fourcc = fourcc
+        self.replay_seconds = replay_seconds
+        self.replay_quality = replay_quality
+        self.ring = np.empty((capacity, height, width, 3), np.uint8)
+        self.timestamps = np.zeros(capacity)
+        self.head = 0  # Frames written into the ring so far
+        self.tail = 0  # Frames taken out of the ring by the encoder so far
+        self.written = 0  # Frames written to the video file
+        self.dropped = 0  # Frames dropped because the ring was full
+        self.condition = threading.Condition()
+        self.stopping = False
+        # Instant replay: (timestamp, JPEG bytes) of the most recent frames
+        self.replay = collections.deque(maxlen=max(1, int(round(replay_seconds * fps * 2))))
+        self.replay_lock = threading.Lock()
+        self.writer = None
+        self.thread = None
+
+    def start(self):
+        if self.path:
+            self.writer = cv2.VideoWriter(
+                self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (self.width, self.height)
+            )
+        self.thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self.thread.start()
+        return self
+
+    def write(self, frame):
+        """
+        Queues a frame for recording; never blocks on the encoder.
+
+        Returns:
+        - False if the frame was dropped because the ring buffer was full
+        """
+        with self.condition:
+            if self.head - self.tail >= self.capacity:
+                self.dropped += 1
+                return False
+            slot = self.head % self.capacity
+        # The encoder never reads this slot before head moves past it, so the copy can run outside the lock
+        if frame.shape[0] != self.height or frame.shape[1] != self.width:
+            cv2.resize(frame, (self.width, self.height), dst=self.ring[slot])
+        else:
+            np.copyto(self.ring[slot], frame)
+        self.timestamps[slot] = time.perf_counter()
+        with self.condition:
+            self.head += 1
+            self.condition.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.tail == self.head and not self.stopping:
+                    self.condition.wait()
+                if self.tail == self.head:
+                    break  # Stopping, and every queued frame is written
+                slot = self.tail % self.capacity
+            frame = self.ring[slot]
+            if self.writer is not None:
+                self.writer.write(frame)
+                self.written += 1
+            if self.replay_seconds > 0:
+                ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.replay_quality])
+                if ok:
+                    self._keep_for_replay(self.timestamps[slot], jpeg)
+            with self.condition:
+                self.tail += 1
+
+    def _keep_for_replay(self, timestamp, jpeg):
+        with self.replay_lock:
+            self.replay.append((timestamp, jpeg))
+            # The deque bounds memory; the timestamps bound the replay to replay_seconds at any frame rate
+            while self.replay and self.replay[0][0] < timestamp - self.replay_seconds:
+                self.replay.popleft()
+
+    def dump_replay(self, path):
+        """
+        Writes the last replay_seconds of frames to a video file, on its own thread.
+
+        The file's frame rate is the rate the frames actually arrived at, so the replay plays in real time.
+
+        Returns:
+        - The writing thread (join it to wait for the file), or None if the replay buffer is empty
+        """
+        with self.replay_lock:
+            frames = list(self.replay)
+        if not frames:
+            return None
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else self.fps
+
+        def write():
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), fps, (self.width, self.height))
+            for _, jpeg in frames:
+                writer.write(cv2.imdecode(jpeg, cv2.IMREAD_COLOR))
+            writer.release()
+
+        thread = threading.Thread(target=write, name="replay-dump", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        return {
+            "queued": self.head - self.tail,
+            "written": self.written,
+            "dropped": self.dropped,
+            "replay_frames": len(self.replay),
+        }
+
+    def stop(self):
+        # Writes the frames still in the ring, then closes the video file
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        if self.writer is not None:
+            self.writer.release()
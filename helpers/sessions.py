@@ -0,0 +1,367 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+import cv2
+
+from helpers import instrumentation as IN  # Per-stage timing
+from helpers import painter as PT  # Tool state and canvas of one painter
+from helpers import toolbar as TB  # Toolbar layout shared with app.py
+from helpers import track_hands as TH  # Hand tracking
+
+
+def _worker_main(worker, tasks, results, detector_params):
+    """
+    Inference worker process: one handDetector per session (MediaPipe's video mode keeps tracking state between the
+    frames of a stream), created on the session's first frame.
+    """
+    detectors = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        kind, session_id, seq, frame = task
+        if kind == "drop":
+            detector = detectors.pop(session_id, None)
+            if detector is not None:
+                detector.close()  # Frees the native graph now, not whenever the garbage collector gets to it
+            continue
+        detector = detectors.get(session_id)
+        if detector is None:
+            detector = detectors[session_id] = TH.handDetector(**detector_params)
+        started = time.perf_counter_ns()
+        try:
+            detector.findHands(frame, draw=False)
+            result = (detector.landmarks, detector.handedness, detector.scores)
+            error = None
+        except Exception as exc:  # Reported to the session instead of killing the worker
+            result, error = None, repr(exc)
+        results.put((worker, session_id, seq, result, error, time.perf_counter_ns() - started))
+    for detector in detectors.values():
+        detector.close()
+
+
+class InferencePool:
+    def __init__(self, workers=None, **detector_params):
+        """
+        Process pool of handDetector workers, so hand inference for many sessions runs on all cores.
+
+        Every session is pinned to one worker (the one with the fewest sessions when it registers), because the
+        detector keeps tracking state between the frames of a stream. When a session unregisters, sessions move from
+        the busiest workers to the idlest until their session counts differ by at most one. Frames are served in
+        arrival order, and a session waits for its result before submitting its next frame, so each session has at
+        most one frame queued and a fast source cannot starve the others. Sessions on the same worker share it equally; a worker
+        with fewer sessions gives each of them a larger share.
+
+        Args:
+        - workers: Number of worker processes (default is the number of CPU cores)
+        - detector_params: Arguments for each handDetector (e.g. min_detection_confidence, track_every)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.detector_params = detector_params
+        context = multiprocessing.get_context("spawn")  # No fork of a process that already runs threads
+        self.tasks = [context.Queue() for _ in range(self.workers)]
+        self.results = context.Queue()
+        self.processes = [
+            context.Process(
+                target=_worker_main,
+                args=(worker, self.tasks[worker], self.results, detector_params),
+                name=f"inference-{worker}",
+                daemon=True,
+            )
+            for worker in range(self.workers)
+        ]
+        self.assignment = {}  # Session id -> worker index
+        self.pending = {}  # (session id, sequence number) -> Future
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.instrumentation = IN.Instrumentation()  # Inference time per worker ("worker0", "worker1", ...)
+        self.collector = None
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        self.collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self.collector.start()
+        return self
+
+    def _collect(self):
+        # Hands every result to the Future of the frame it belongs to
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            worker, session_id, seq, result, error, ns = item
+            self.instrumentation.record(f"worker{worker}", ns)
+            with self.lock:
+                future = self.pending.pop((session_id, seq), None)
+            if future is None or not future.set_running_or_notify_cancel():  # Unknown, or given up on (timed out)
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _load(self):
+        # Number of sessions on each worker (the caller holds the lock)
+        load = [0] * self.workers
+        for worker in self.assignment.values():
+            load[worker] += 1
+        return load
+
+    def register(self, session_id):
+        with self.lock:
+            load = self._load()
+            self.assignment[session_id] = load.index(min(load))
+            return self.assignment[session_id]
+
+    def move(self, session_id, worker):
+        """
+        Pins a session to another worker. Its detector on the old worker is dropped, so the session starts over
+        with a fresh one (a full palm detection) on the new worker, and again if it ever moves back.
+        """
+        with self.lock:
+            previous = self.assignment.get(session_id)
+            self.assignment[session_id] = worker
+            if previous is not None and previous != worker:
+                self.tasks[previous].put(("drop", session_id, None, None))
+
+    def unregister(self, session_id, rebalance=True):
+        """
+        Removes a session and drops its detector. With rebalance, the newest sessions of the busiest workers then
+        move to the idlest ones (see move) until the workers' session counts differ by at most one.
+
+        Args:
+        - rebalance: False when every session is leaving anyway (default is True)
+        """
+        with self.lock:
+            worker = self.assignment.pop(session_id, None)
+            if worker is not None:
+                self.tasks[worker].put(("drop", session_id, None, None))
+            while rebalance:
+                load = self._load()
+                busiest, idlest = load.index(max(load)), load.index(min(load))
+                if load[busiest] - load[idlest] <= 1:
+                    break
+                moved = [session for session, assigned in self.assignment.items() if assigned == busiest][-1]
+                self.assignment[moved] = idlest
+                self.tasks[busiest].put(("drop", moved, None, None))
+
+    def submit(self, session_id, frame):
+        """
+        Queues one (already downscaled) BGR frame for inference on the session's worker.
+
+        Returns:
+        - Future resolving to (landmarks, handedness, scores), as stored by handDetector.findHands
+        """
+        future = Future()
+        with self.lock:
+            worker = self.assignment[session_id]
+            self.seq += 1
+            seq = self.seq
+            self.pending[(session_id, seq)] = future
+            # Queued under the lock, so a frame never reaches a worker after the drop of the session's detector there
+            self.tasks[worker].put(("infer", session_id, seq, frame))
+        return future
+
+    def stats(self):
+        with self.lock:
+            sessions = self._load()
+        return {
+            "workers": self.workers,
+            "sessions_per_worker": sessions,
+            "inference": self.instrumentation.snapshot()["stages"],  # Per-worker inference latency
+        }
+
+    def stop(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(5.0)
+            if process.is_alive():
+                process.terminate()
+        for tasks in self.tasks:
+            tasks.cancel_join_thread()  # Frames submitted after the workers quit are never read: do not wait at exit
+        self.results.put(None)
+        if self.collector is not None:
+            self.collector.join(1.0)
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+
+
+class PaintSession:
+    def __init__(
+        self, session_id, source, pool, width=1280, height=720, inference_width=640, canvas_backend="dense",
+        toolbar=None,
+    ):
+        """
+        One independent painter: its own frame source, canvas and tool state, with hand inference done by the pool.
+
+        Args:
+        - session_id: Key of the session in the pool
+        - source: Frame source (helpers/frame_sources.py)
+        - pool: InferencePool the session sends its frames to
+        - width, height: Size of the rendered frames
+        - inference_width: Width of the frames sent for inference (they are downscaled before leaving the process)
+        - canvas_backend: "dense" or "tiled"
+        - toolbar: Optional compiled Toolbar shared with other sessions of the same width
+        """
+        self.session_id = session_id
+        self.source = source
+        self.pool = pool
+        self.width = width
+        self.height = height
+        self.inference_width = inference_width
+        self.painter = PT.Painter(width, height, canvas_backend=canvas_backend, toolbar=toolbar)
+        self.detector = TH.handDetector()  # Only maps the pool's landmarks to frames, never loads the model
+        self.instrumentation = IN.Instrumentation()
+        self.latest = None  # Newest rendered frame
+        self.frames = 0
+        self.errors = 0  # Frames whose inference failed or timed out (rendered without hands)
+        self.last_error = None
+        self.ended = False  # Set when the frame source has no more frames, or the pool was stopped
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pool.register(session_id)
+
+    def step(self):
+        """
+        Renders the next frame: capture, inference on the pool, gestures, compositing.
+
+        A frame whose inference fails or times out is counted in errors and rendered without hands, so the
+        canvas stays on screen.
+
+        Returns:
+        - The composited BGR frame, or None when the source has ended or the pool was stopped
+        """
+        timer = self.instrumentation
+        timer.start()
+        ret, frame = self.source.read()
+        if not ret:
+            self.ended = True
+            return None
+        timer.lap("capture")
+        frame = cv2.flip(frame, 1)
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height))
+        timer.lap("flip")
+
+        # Only the small inference frame crosses the process boundary
+        small = frame
+        if self.inference_width and self.inference_width < self.width:
+            inference_height = max(1, round(self.height * self.inference_width / self.width))
+            small = cv2.resize(frame, (self.inference_width, inference_height), interpolation=cv2.INTER_AREA)
+        future = self.pool.submit(self.session_id, small)
+        try:
+            result = future.result(timeout=30)
+        except CancelledError:  # The pool was stopped
+            self.ended = True
+            return None
+        except Exception as exc:  # Failed in the worker, or timed out
+            future.cancel()  # A late result is dropped
+            self.errors += 1
+            self.last_error = repr(exc)
+            result = None
+        timer.lap("detect")
+
+        if result is not None:
+            self.detector.setLandmarks(*result)
+            frame = self.detector.drawHands(frame)
+            landmark_list = self.detector.findPosition(frame, draw=False)
+            my_fingers = self.detector.fingerStatus() if len(landmark_list) != 0 else []
+            timer.lap("landmarks")
+            self.painter.update(frame, landmark_list, my_fingers)
+            timer.lap("draw")
+        frame = self.painter.composite(frame)
+        timer.lap("composite")
+
+        timer.tick()
+        self.latest = frame
+        self.frames += 1
+        return frame
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"session-{self.session_id}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.is_set() and self.step() is not None:
+            pass
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(5.0)
+        self.pool.unregister(self.session_id)
+        self.source.release()
+
+    def stats(self):
+        return {
+            "session": self.session_id,
+            "frames": self.frames,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "ended": self.ended,
+            "fps": round(self.instrumentation.fps(), 2),
+            "stages": self.instrumentation.snapshot()["stages"],
+        }
+
+
+class SessionManager:
+    def __init__(self, workers=None, inference_width=640, **detector_params):
+        """
+        Hosts many independent painting sessions in one process, with hand inference on a shared InferencePool.
+
+        Args:
+        - workers: Number of inference worker processes (default is the number of CPU cores)
+        - inference_width: Width of the frames sent for inference
+        - detector_params: Arguments for the workers' handDetectors (default min_detection_confidence is 0.85, like
+          app.py)
+        """
+        detector_params.setdefault("min_detection_confidence", 0.85)
+        self.pool = InferencePool(workers, **detector_params).start()
+        self.inference_width = inference_width
+        self.sessions = {}
+        self.toolbars = {}  # Width -> compiled Toolbar, shared by the sessions of that width
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def add_session(self, source, width=1280, height=720, canvas_backend="dense", start=True):
+        """
+        Adds a session reading from source and (by default) starts rendering it on its own thread.
+
+        Returns:
+        - The PaintSession (its id is session.session_id, its newest frame session.latest)
+        """
+        with self.lock:
+            session_id = self.next_id
+            self.next_id += 1
+            if width not in self.toolbars:
+                self.toolbars[width] = TB.Toolbar().compile(width)
+            session = PaintSession(
+                session_id, source, self.pool, width, height, self.inference_width, canvas_backend,
+                toolbar=self.toolbars[width],
+            )
+            self.sessions[session_id] = session
+        return session.start() if start else session
+
+    def remove_session(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+
+    def stats(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return {"pool": self.pool.stats(), "sessions": [session.stats() for session in sessions]}
+
+    def stop(self):
+        for session_id in list(self.sessions):
+            self.remove_session(session_id)
+        self.pool.stop()
@@ -0,0 +1,210 @@
+import asyncio
+import threading
+import time
+
+BOUNDARY = b"frame"  # multipart boundary between JPEG parts
+
+
+class ClientState:
+    def __init__(self, peer):
+        # One viewer: holds at most one pending frame, newer frames replace it (the client then skips frames)
+        self.peer = peer
+        self.queue = asyncio.Queue(maxsize=1)
+        self.sent = 0  # Frames written to the socket
+        self.skipped = 0  # Frames replaced before this client was ready for them
+        self.bytes_sent = 0
+
+
+class StreamServer:
+    def __init__(self, produce_frame, host="0.0.0.0", port=5000, max_fps=None, encoder=None):
+        """
+        MJPEG server that runs the capture -> detect -> composite -> encode pipeline once per frame and fans the same
+        JPEG bytes out to every connected viewer.
+
+        Each viewer has a one-slot queue: a slow viewer simply skips frames (its pending frame is replaced by the
+        newest one), while socket writes await drain() so backpressure stays per client and never reaches the producer.
+
+        Args:
+        - produce_frame: Callable returning the JPEG bytes of the next frame (or None when the source has ended).
+          It runs on its own thread, e.g. lambda: camera.get_frame()[0] (None at the end of the camera's source)
+        - host, port: Address the HTTP server listens on
+        - max_fps: Optional cap on the producer rate (default is None, as fast as produce_frame allows)
+        - encoder: Optional EncoderPool (helpers/encoder.py). When given, produce_frame returns BGR frames instead of
+          JPEG bytes and encoding runs on the pool, overlapping the next capture. Frames that arrive while every
+          encoder worker is busy are dropped and counted.
+        """
+        self.produce_frame = produce_frame
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.clients = set()
+        self.frames_produced = 0
+        self.encoder = encoder
+        self.in_flight = 0  # Frames submitted to the encoder pool and not finished yet
+        self.encode_dropped = 0  # Frames dropped because every encoder worker was busy
+        self.last_published = -1  # Index of the newest encoded frame sent out (older results arriving late are dropped)
+        self.last_encoded = None  # EncodedFrame of the newest published frame
+        self.in_flight_lock = threading.Lock()
+        self.loop = None
+        self.server = None
+        self.producer_thread = None
+        self.stop_event = threading.Event()
+
+    # --- producer (runs on its own thread) ---
+
+    def _producer_loop(self):
+        min_interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            data = self.produce_frame()
+            if data is None:
+                break
+            self.frames_produced += 1
+            if self.encoder is None:
+                self.loop.call_soon_threadsafe(self._publish, data)
+            else:
+                self._submit(data)
+            remaining = min_interval - (time.perf_counter() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _submit(self, frame):
+        with self.in_flight_lock:
+            if self.in_flight >= self.encoder.workers:
+                self.encode_dropped += 1
+                return
+            self.in_flight += 1
+        self.encoder.submit(frame).add_done_callback(self._encoded)
+
+    def _encoded(self, future):
+        # Runs on an encoder thread when a frame is done
+        with self.in_flight_lock:
+            self.in_flight -= 1
+        if future.exception() is None:
+            self.loop.call_soon_threadsafe(self._publish_encoded, future.result())
+
+    def _publish_encoded(self, encoded):
+        if encoded.index <= self.last_published:
+            return  # A newer frame already went out
+        self.last_published = encoded.index
+        self.last_encoded = encoded
+        self._publish(encoded.data)
+
+    def _publish(self, data):
+        # Runs on the event loop: hand the same bytes to every client, replacing any frame it has not taken yet
+        for client in self.clients:
+            if client.queue.full():
+                client.queue.get_nowait()
+                client.skipped += 1
+            client.queue.put_nowait(data)
+
+    # --- HTTP side (runs on the event loop) ---
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Skip the request headers
+        except ConnectionError:
+            writer.close()
+            return
+
+        parts = request_line.split()
+        if len(parts) < 2 or parts[1] not in (b"/", b"/video_feed"):
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        client = ClientState(writer.get_extra_info("peername"))
+        self.clients.add(client)
+        try:
+            while True:
+                data = await client.queue.get()
+                writer.write(
+                    b"--" + BOUNDARY + b"\r\n"
+                    b"Content-Type: image/jpeg\r\n"
+                    b"Content-Length: " + str(len(data)).encode() + b"\r\n\r\n"
+                )
+                writer.write(data)
+                writer.write(b"\r\n")
+                await writer.drain()  # Per-client backpressure: only this coroutine waits for a slow socket
+                client.sent += 1
+                client.bytes_sent += len(data)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # Resolves port=0 to the actual port
+        self.stop_event.clear()
+        self.producer_thread = threading.Thread(target=self._producer_loop, name="producer", daemon=True)
+        self.producer_thread.start()
+        return self
+
+    async def stop(self):
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.producer_thread is not None:
+            await asyncio.to_thread(self.producer_thread.join, 1.0)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of produced frames and the per-client sent/skipped counters.
+        """
+        encoded = self.last_encoded
+        return {
+            "frames_produced": self.frames_produced,
+            "encode_dropped": self.encode_dropped,
+            "quality": encoded.quality if encoded else None,
+            "scale": encoded.scale if encoded else None,
+            "encoded_size": encoded.size if encoded else None,
+            "encode_ms": round(encoded.encode_ms, 2) if encoded else None,
+            "clients": [
+                {"peer": client.peer, "sent": client.sent, "skipped": client.skipped, "bytes_sent": client.bytes_sent}
+                for client in self.clients
+            ],
+        }
+
+
+def main():
+    from helpers.encoder import AdaptiveJpegController, EncoderPool
+    from helpers.web_helper import VideoCamera
+
+    camera = VideoCamera()
+    t_prev = time.time()
+
+    def produce_frame():
+        nonlocal t_prev
+        frame, t_prev = camera.render_frame(t_prev)
+        return frame
+
+    # Encode off the capture thread, keeping each frame's encode within ~10 ms
+    encoder = EncoderPool(workers=2, controller=AdaptiveJpegController(target_frame_ms=10))
+    server = StreamServer(produce_frame, port=5000, encoder=encoder)
+    print("Streaming on http://localhost:5000/video_feed")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import struct
+import zlib
+
+import cv2
+import numpy as np
+
+MAGIC = b"APSK"  # File signature of saved stroke logs
+VERSION = 1
+HEADER = struct.Struct("<4sHHHI")  # magic, version, width, height, stroke count
+STROKE_HEADER = struct.Struct("<B3BHI")  # tool, color (B, G, R), thickness, point count
+
+TOOLS = ("brush", "eraser")
+
+
+class Stroke:
+    def __init__(self, color, thickness, tool="brush", points=None):
+        """
+        One continuous stroke: a polyline with the color, thickness and tool it was drawn with.
+
+        Args:
+        - color: BGR color (black for the eraser)
+        - thickness: Line thickness in pixels of the log's canvas
+        - tool: "brush" or "eraser"
+        - points: Optional (n, 2) array of (x, y) points
+        """
+        self.color = tuple(int(c) for c in color)
+        self.thickness = int(thickness)
+        self.tool = tool
+        self.points = np.zeros((16, 2), np.int32)  # Grows by doubling, only the first `size` rows are used
+        self.size = 0
+        if points is not None:
+            for point in points:
+                self.add(point)
+
+    def add(self, point):
+        if self.size == len(self.points):
+            self.points = np.concatenate([self.points, np.zeros((max(16, len(self.points)), 2), np.int32)])
+        self.points[self.size] = point
+        self.size += 1
+
+    def polyline(self):
+        return self.points[:self.size]
+
+    def draw(self, canvas, scale=(1.0, 1.0)):
+        """
+        Draws the stroke on a canvas, segment by segment like the live drawing code, so at scale 1 the result is
+        pixel-identical to what was drawn live.
+
+        Args:
+        - canvas: BGR image to draw on
+        - scale: (x, y) factors from the log's canvas to this one
+        """
+        points = self.polyline()
+        if len(points) == 0:
+            return canvas
+        sx, sy = scale
+        if sx != 1.0 or sy != 1.0:
+            points = np.rint(points * (sx, sy)).astype(np.int32)
+        thickness = max(1, int(round(self.thickness * min(sx, sy))))
+        if len(points) == 1:
+            points = np.repeat(points, 2, axis=0)  # A single point still leaves a dot
+        for (x0, y0), (x1, y1) in zip(points[:-1].tolist(), points[1:].tolist()):
+            cv2.line(canvas, (x0, y0), (x1, y1), color=self.color, thickness=thickness)
+        return canvas
+
+
+class StrokeLog:
+    def __init__(self, width, height, checkpoint_every=16, max_checkpoints=8):
+        """
+        The drawing as a list of vector strokes, from which the raster canvas can be rebuilt at any size.
+
+        Rebuilding at the native size starts from the newest cached canvas (a checkpoint taken every
+        checkpoint_every strokes), so undo only replays the last few strokes instead of the whole drawing.
+
+        Args:
+        - width, height: Size of the canvas the strokes were drawn on
+        - checkpoint_every: Number of strokes between cached canvases
+        - max_checkpoints: Number of cached canvases kept (the oldest are dropped first)
+        """
+        self.width = width
+        self.height = height
+        self.checkpoint_every = checkpoint_every
+        self.max_checkpoints = max_checkpoints
+        self.strokes = []
+        self.current = None  # Stroke being drawn, not in self.strokes until it ends
+        self.checkpoints = {}  # Stroke count -> canvas after that many strokes
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def begin(self, point, color, thickness, tool=None):
+        """
+        Starts a new stroke at point (ending the current one, if any).
+        """
+        self.end()
+        if tool is None:
+            tool = "brush" if any(color) else "eraser"
+        self.current = Stroke(color, thickness, tool)
+        self.current.add(point)
+        return self.current
+
+    def add(self, point):
+        self.current.add(point)
+
+    def end(self, canvas=None):
+        """
+        Ends the current stroke.
+
+        Args:
+        - canvas: Optional live canvas (an array or a compositor), already showing the stroke. It is cached as a checkpoint when the stroke count
+          reaches a multiple of checkpoint_every, so undo never has to replay the whole drawing.
+        """
+        if self.current is None:
+            return
+        stroke, self.current = self.current, None
+        self.commit(stroke, canvas)
+
+    def commit(self, stroke, canvas=None):
+        """
+        Appends a finished stroke that was built outside the log (e.g. by one of several brushes drawing at once).
+
+        Args:
+        - stroke: The finished Stroke
+        - canvas: Optional live canvas, checkpointed like in end(). Only pass it when it shows exactly the
+          committed strokes, i.e. no other stroke is still being drawn on it.
+        """
+        self.strokes.append(stroke)
+        if canvas is not None and len(self.strokes) % self.checkpoint_every == 0:
+            self._checkpoint(len(self.strokes), canvas)
+
+    def _checkpoint(self, count, canvas):
+        self.checkpoints[count] = canvas.to_array() if hasattr(canvas, "to_array") else canvas.copy()
+        while len(self.checkpoints) > self.max_checkpoints:
+            del self.checkpoints[min(self.checkpoints)]
+
+    def undo(self):
+        """
+        Removes the last stroke (the current one if a stroke is being drawn).
+
+        Returns:
+        - The removed Stroke, or None if there was nothing to undo
+        """
+        if self.current is not None:
+            stroke, self.current = self.current, None
+            return stroke
+        if not self.strokes:
+            return None
+        stroke = self.strokes.pop()
+        for count in [count for count in self.checkpoints if count > len(self.strokes)]:
+            del self.checkpoints[count]
+        return stroke
+
+    def clear(self):
+        self.strokes = []
+        self.current = None
+        self.checkpoints = {}
+
+    def scaled(self, width, height):
+        """
+        Returns a copy of the log with its finished strokes scaled to another canvas size (e.g. a log saved on
+        another screen), so new strokes can be added in that size's pixel coordinates.
+        """
+        sx, sy = width / self.width, height / self.height
+        log = StrokeLog(width, height, self.checkpoint_every, self.max_checkpoints)
+        for stroke in self.strokes:
+            points = np.rint(stroke.polyline() * (sx, sy)).astype(np.int32)
+            log.strokes.append(Stroke(stroke.color, max(1, round(stroke.thickness * min(sx, sy))), stroke.tool, points))
+        return log
+
+    def render(self, width=None, height=None, out=None):
+        """
+        Rebuilds the raster canvas from the strokes.
+
+        Args:
+        - width, height: Output size (default is the log's own size). Points and thicknesses are scaled to it.
+        - out: Optional BGR array of that size to render into
+
+        Returns:
+        - BGR canvas with the strokes on a black background
+        """
+        width = width or self.width
+        height = height or self.height
+        if out is None:
+            out = np.zeros((height, width, 3), np.uint8)
+        strokes = self.strokes + ([self.current] if self.current is not None else [])
+
+        if (width, height) != (self.width, self.height):
+            scale = (width / self.width, height / self.height)
+            for stroke in strokes:
+                stroke.draw(out, scale)
+            return out
+
+        # Native size: start from the newest checkpoint, and cache new ones on the way
+        start = max((count for count in self.checkpoints if count <= len(self.strokes)), default=0)
+        if start:
+            out[:] = self.checkpoints[start]
+        else:
+            out[:] = 0
+        for count, stroke in enumerate(strokes[start:], start + 1):
+            stroke.draw(out)
+            if count <= len(self.strokes) and count % self.checkpoint_every == 0 and count not in self.checkpoints:
+                self._checkpoint(count, out)
+        return out
+
+    def to_bytes(self):
+        """
+        Encodes the finished strokes in a compact binary format: a header, then per stroke its tool, color,
+        thickness and points as int16 deltas, the whole body compressed with zlib.
+        """
+        body = []
+        for stroke in self.strokes:
+            points = stroke.polyline()
+            deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), np.int32)).astype("<i2")
+            body.append(STROKE_HEADER.pack(TOOLS.index(stroke.tool), *stroke.color, stroke.thickness, len(points)))
+            body.append(deltas.tobytes())
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height, len(self.strokes))
+        return header + zlib.compress(b"".join(body))
+
+    @classmethod
+    def from_bytes(cls, data, **kwargs):
+        magic, version, width, height, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a stroke log (or an unsupported version)")
+        body = zlib.decompress(data[HEADER.size:])
+        log = cls(width, height, **kwargs)
+        offset = 0
+        for _ in range(count):
+            tool, b, g, r, thickness, n = STROKE_HEADER.unpack_from(body, offset)
+            offset += STROKE_HEADER.size
+            deltas = np.frombuffer(body, "<i2", count=2 * n, offset=offset).reshape(n, 2)
+            offset += deltas.nbytes
+            stroke = Stroke((b, g, r), thickness, TOOLS[tool])
+            stroke.points = np.cumsum(deltas, axis=0, dtype=np.int32)
+            stroke.size = n
+            log.strokes.append(stroke)
+        return log
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read(), **kwargs)
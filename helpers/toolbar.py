@@ -0,0 +1,76 @@
+import os
+
+import cv2
+import numpy as np
+
+# Folder with the header images shipped with the app
+HEADER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "header_images")
+
+# Height of the toolbar strip at the top of the frame (in pixels)
+TOOLBAR_HEIGHT = 125
+
+# Width the header images and slot ranges below were designed for (720p)
+REFERENCE_WIDTH = 1280
+
+# Declarative toolbar layout: one entry per selectable slot
+#   (header image shown while the slot is active, draw color, x-range of the slot at REFERENCE_WIDTH)
+TOOLBAR_SLOTS = [
+    ("1.png", (255, 255, 0), (355, 460)),  # Aqua blue
+    ("2.png", (47, 225, 245), (475, 560)),  # Yellow
+    ("3.png", (197, 47, 245), (610, 685)),  # Pink
+    ("4.png", (81, 242, 56), (755, 865)),  # Leafy green
+    ("5.png", (0, 0, 0), (1060, 1220)),  # Black (eraser mode)
+]
+
+
+class Toolbar:
+    def __init__(self, slots=TOOLBAR_SLOTS, header_dir=HEADER_DIR, images=None, height=TOOLBAR_HEIGHT):
+        """
+        Toolbar built from the declarative TOOLBAR_SLOTS layout and shared by every front-end.
+
+        Call compile(width) at startup (and again whenever the frame width changes) to get the pre-resized header
+        images and the per-column lookup table used by hit().
+
+        Args:
+        - slots: List of (header image file, draw color, (x_min, x_max) at REFERENCE_WIDTH)
+        - header_dir: Folder the header image files are read from
+        - images: Already loaded header images, one per slot (default is None, which reads them from header_dir)
+        - height: Height of the toolbar strip (default is 125)
+        """
+        self.slots = slots
+        self.height = height
+        self.colors = [color for _, color, _ in slots]
+        if images:
+            self.images = list(images)
+        else:
+            self.images = [cv2.imread(os.path.join(header_dir, file_name)) for file_name, _, _ in slots]
+        self.width = 0
+        self.headers = []  # Header images resized to the compiled width
+        self.lut = np.empty(0, np.int8)  # Slot index for every pixel column, -1 outside every slot
+
+    def compile(self, width):
+        """
+        Pre-resizes the header images and builds the column lookup table for a frame of the given width.
+        """
+        self.width = width
+        self.headers = [cv2.resize(image, (width, self.height)) for image in self.images]
+        self.lut = np.full(width, -1, np.int8)
+        magnification_factor = width / REFERENCE_WIDTH
+        for slot, (_, _, (x_min, x_max)) in enumerate(self.slots):
+            # Same strict bounds as the original range checks: x_min < x < x_max
+            self.lut[int(x_min * magnification_factor) + 1:int(x_max * magnification_factor)] = slot
+        return self
+
+    def hit(self, x, y):
+        """
+        Returns:
+        - The index of the slot under (x, y), or -1 if the point is not on a slot
+        """
+        if y < self.height and 0 <= x < self.width:
+            return int(self.lut[x])
+        return -1
+
+    def draw(self, frame, slot):
+        # Paste the pre-resized header of the given slot at the top of the frame
+        frame[0:self.height, 0:self.width] = self.headers[slot]
+        return frame
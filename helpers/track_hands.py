@@ -2,16 +2,24 @@ import time
 
 import cv2
 import mediapipe as mp
+import numpy as np
+
+from helpers import buffers as BF  # Preallocated frame buffers
+from helpers import hand_backends as HB  # Hand landmark models (MediaPipe solutions, Tasks live stream, replay)
 
 
 class handDetector:
     def __init__(
         self,
         image_mode=False,                   # Whether to treat input images as static images or as a continuous stream
-        max_num_hands=3,                    # Maximum number of hands to detect in the frame
+        max_num_hands=1,                    # Maximum number of hands to detect in the frame (each one costs inference)
         modelComplexity=1,                  # Model complexity: higher value increases accuracy but reduces speed
         min_detection_confidence=0.5,       # Minimum confidence required for initial hand detection
         min_tracking_confidence=0.5,        # Minimum confidence required for tracking hand landmarks
+        track_every=1,                      # Run full inference every N frames, optical flow in between (1 = always infer)
+        min_track_quality=0.8,              # Fraction of landmarks optical flow must keep, or inference runs again
+        backend="solutions",                # Hand landmark model: "solutions", "tasks" or "replay" (see hand_backends.py)
+        backend_params=None,                # Backend-specific arguments, e.g. {"model_path": ...} or {"path": ...}
     ):
         # Initializing variables with provided arguments or default values
         self.image_mode = image_mode
@@ -19,44 +27,216 @@ class handDetector:
         self.min_detection_confidence = min_detection_confidence
         self.min_tracking_confidence = min_tracking_confidence
         self.modelComplex = modelComplexity
+        self.track_every = max(1, int(track_every))
+        self.min_track_quality = min_track_quality
+        self.backend = backend
+        self.backend_params = dict(backend_params or {})
 
-        # Initialize MediaPipe's hands solution
-        self.mphands = mp.solutions.hands
-        self.hands = self.mphands.Hands(
-            self.image_mode,
-            self.max_num_hands,
-            self.modelComplex,
-            self.min_detection_confidence,
-            self.min_tracking_confidence,
-        )
+        # The hand landmark backend is only created by the first inference (see the hands property), so a detector
+        # that only receives landmarks from an inference worker never loads a model
+        self.mphands = mp.solutions.hands  # Hand connections for drawing
+        self._hands = None
+        self._stale = False  # Set by setOptions: the graph is rebuilt before the next inference
         # Drawing utility for rendering hand landmarks and connections
         self.mpdraw = mp.solutions.drawing_utils  
         # Indices of finger tip landmarks for thumb, index, middle, ring, and pinky
         self.finger_tip_id = [4, 8, 12, 16, 20]  
+        # Landmarks of every hand found by the last findHands call: (n_hands, 21, 3) normalized (x, y, z)
+        self.landmarks = np.empty((0, 21, 3), np.float32)
+        # "Left"/"Right" label of each hand in self.landmarks, and MediaPipe's confidence in it
+        self.handedness = []
+        self.scores = []
+        # Detect-then-track state: grayscale inference frame of the previous call, frames since the last inference
+        self.prev_gray = None
+        self.frames_since_inference = 0
+        self.track_quality = 1.0  # Fraction of landmarks optical flow followed in the last tracked frame
+        self.inferred = True  # Whether the last findHands call ran full inference (False: landmarks were tracked)
+        self.updated = True  # Whether the last findHands call produced new landmarks (False: async result not ready)
+        # Downscaled, RGB and grayscale inference frames, reused between calls (two of each: prev_gray is the other one)
+        self.buffers = BF.FramePool(depth=2)
+
+    @property
+    def hands(self):
+        # The HandBackend doing inference, created on first use
+        if self._hands is not None and self._stale:
+            # Options changed by setOptions: rebuild the graph here, on the thread that runs inference
+            self._hands.close()
+            self._hands = None
+        self._stale = False
+        if self._hands is None:
+            self._hands = HB.make_backend(
+                self.backend,
+                image_mode=self.image_mode,
+                max_num_hands=self.max_num_hands,
+                model_complexity=self.modelComplex,
+                min_detection_confidence=self.min_detection_confidence,
+                min_tracking_confidence=self.min_tracking_confidence,
+                **self.backend_params,
+            )
+        return self._hands
+
+    @property
+    def asynchronous(self):
+        # True when the backend's results belong to earlier frames (known without creating the backend)
+        return HB.BACKENDS[self.backend].asynchronous
+
+    def setOptions(self, max_num_hands=None, modelComplexity=None, track_every=None):
+        """
+        This method changes detection options while the detector is in use (e.g. by a quality governor). A changed
+        max_num_hands or modelComplexity rebuilds the MediaPipe graph before the next inference; track_every applies
+        from the next frame.
+        
+        Args:
+        - max_num_hands, modelComplexity, track_every: New values (None keeps the current one)
+        """
+        if max_num_hands is not None and max_num_hands != self.max_num_hands:
+            self.max_num_hands = max_num_hands
+            self._stale = True
+        if modelComplexity is not None and modelComplexity != self.modelComplex:
+            self.modelComplex = modelComplexity
+            self._stale = True
+        if track_every is not None:
+            self.track_every = max(1, int(track_every))
 
-    def findHands(self, img, draw=True):
+    def close(self):
+        """
+        This method releases the hand landmark backend (MediaPipe's native graph) if one was created. The detector can
+        still be used: the next inference creates a new one.
+        """
+        if self._hands is not None:
+            self._hands.close()
+            self._hands = None
+
+    def setLandmarks(self, landmarks, handedness=(), scores=()):
+        """
+        This method stores landmarks found elsewhere (e.g. by an inference worker process), so drawHands,
+        findPosition, fingerStatus and the other methods work on them as if findHands had found them.
+        
+        Args:
+        - landmarks: (n_hands, 21, 3) normalized landmarks
+        - handedness, scores: "Left"/"Right" label and confidence of each hand
+        """
+        self.landmarks = np.asarray(landmarks, np.float32).reshape(-1, 21, 3)
+        self.handedness = list(handedness)
+        self.scores = list(scores)
+        self.inferred = True
+
+    def findHands(self, img, draw=True, inference_width=None):
         """
         This method processes the input image to detect hands, and optionally draws hand landmarks on the image.
         
         Args:
         - img: Input image (in BGR format)
         - draw: Flag to indicate if the landmarks should be drawn on the image (default is True)
+        - inference_width: If given and smaller than the image width, detection runs on a copy downscaled to this
+          width (aspect ratio kept). Landmarks are normalized, so they still map onto img or any other resolution.
+        
+        With track_every > 1, full MediaPipe inference runs only every track_every frames (or sooner when optical flow
+        follows less than min_track_quality of the landmarks); in between, the landmarks are moved with optical flow.
+        self.inferred tells which of the two happened. An asynchronous backend is never tracked: its landmarks belong
+        to an earlier frame than the one optical flow would start from.
         
         Returns:
         - img: Image with detected hand landmarks drawn (if draw=True)
         """
-        # Convert BGR image to RGB, as MediaPipe requires RGB input
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        # Process the image and detect hands
-        self.results = self.hands.process(imgRGB)
+        # Downscale for inference only; the caller's image keeps its resolution
+        img_small = img
+        h, w = img.shape[:2]
+        if inference_width and inference_width < w:
+            inference_height = max(1, round(h * inference_width / w))
+            img_small = self.buffers.get("small", (inference_height, inference_width, 3))
+            cv2.resize(img, (inference_width, inference_height), dst=img_small, interpolation=cv2.INTER_AREA)
 
-        # Check if any hands are detected
-        if self.results.multi_hand_landmarks:
-            # Loop through each detected hand
-            for i in self.results.multi_hand_landmarks:
-                if draw:
-                    # Draw hand landmarks and connections on the original image
-                    self.mpdraw.draw_landmarks(img, i, self.mphands.HAND_CONNECTIONS)
+        # Detect-then-track: between full inferences, follow the landmarks with pyramidal optical flow
+        gray = None
+        if self.track_every > 1 and not self.asynchronous:
+            gray = cv2.cvtColor(img_small, cv2.COLOR_BGR2GRAY, dst=self.buffers.get("gray", img_small.shape[:2]))
+        if gray is not None and self._shouldTrack() and self._trackLandmarks(gray):
+            self.frames_since_inference += 1
+            self.inferred = False
+            self.updated = True
+        else:
+            # Convert BGR image to RGB, as MediaPipe requires RGB input
+            imgRGB = cv2.cvtColor(img_small, cv2.COLOR_BGR2RGB, dst=self.buffers.get("rgb", img_small.shape))
+            # Process the image and detect hands (an asynchronous backend may have no new result yet: keep the last one)
+            result = self.hands.process(imgRGB, time.perf_counter_ns() // 1_000_000)
+            self.updated = result is not None
+            if result is not None:
+                landmarks, handedness, scores = result
+                # A copy: optical flow moves self.landmarks in place, which must not reach back into the backend's
+                # arrays (a replayed recording, or NO_HANDS)
+                self.landmarks = np.array(landmarks, np.float32)
+                self.handedness = list(handedness)
+                self.scores = list(scores)
+                self.frames_since_inference = 0
+            self.inferred = True
+        if self.updated:  # Tracking starts from the frame the landmarks belong to
+            self.prev_gray = gray
+
+        if draw:
+            self.drawHands(img)
+
+        return img
+
+    def _shouldTrack(self):
+        # Track only with hands to follow and before the next scheduled inference. How well the hand is followed is
+        # judged by _trackLandmarks (track_quality); self.scores are handedness scores, not a tracking confidence.
+        return (
+            self.prev_gray is not None
+            and len(self.landmarks) > 0
+            and self.frames_since_inference < self.track_every - 1
+        )
+
+    def _trackLandmarks(self, gray):
+        """
+        Moves the stored landmarks from the previous frame to this one with pyramidal Lucas-Kanade optical flow.
+        
+        Returns:
+        - True if enough landmarks were followed, False if inference has to run on this frame
+        """
+        if gray.shape != self.prev_gray.shape:
+            return False
+        h, w = gray.shape
+        n_hands = len(self.landmarks)
+        scale = np.array([w, h], np.float32)
+        prev_pts = (self.landmarks[:, :, :2] * scale).reshape(-1, 1, 2)
+        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.prev_gray, gray, prev_pts, None, winSize=(21, 21), maxLevel=3
+        )
+        good = status.reshape(n_hands, 21).astype(bool)
+        self.track_quality = float(good.mean())
+        if self.track_quality < self.min_track_quality:
+            return False
+
+        moved = next_pts.reshape(n_hands, 21, 2)
+        prev_pts = prev_pts.reshape(n_hands, 21, 2)
+        for hand in range(n_hands):
+            lost = ~good[hand]
+            if lost.any():
+                # Motion model for lost points: shift them with the median motion of the hand's tracked points
+                shift = np.median(moved[hand][good[hand]] - prev_pts[hand][good[hand]], axis=0)
+                moved[hand][lost] = prev_pts[hand][lost] + shift
+        self.landmarks[:, :, :2] = moved / scale
+        return True
+
+    def drawHands(self, img):
+        """
+        This method draws the landmarks found by the last findHands call onto an image of any resolution.
+        
+        Args:
+        - img: Image to draw on (typically the display frame, which may be larger than the inference frame)
+        
+        Returns:
+        - img: Image with hand landmarks and connections drawn
+        """
+        # Drawn from self.landmarks rather than MediaPipe's result, so tracked frames are drawn too
+        for hand in self.findLandmarks(img):
+            points = hand[:, :2]
+            # Connections first, then the landmark dots on top (same look as MediaPipe's drawing_utils)
+            for start, end in self.mphands.HAND_CONNECTIONS:
+                cv2.line(img, tuple(points[start]), tuple(points[end]), color=(224, 224, 224), thickness=2)
+            for point in points:
+                cv2.circle(img, tuple(point), radius=2, color=(0, 0, 255), thickness=-1)
 
         return img
 
@@ -65,7 +245,7 @@ class handDetector:
         This method extracts and returns the pixel positions of hand landmarks.
         
         Args:
-        - img: Input image
+        - img: Image whose resolution the normalized landmarks are mapped to (need not be the inference image)
         - hand_num: Index of the hand to extract landmarks from (default is 0, which is the first hand)
         - draw: Flag to indicate if circles should be drawn on each landmark (default is True)
         
@@ -75,16 +255,14 @@ class handDetector:
         # List to store hand landmark positions
         self.lm_list = []
         # Check if hand landmarks are detected
-        if self.results.multi_hand_landmarks:
-            # Select the hand (based on hand_num) from the results
-            myHand = self.results.multi_hand_landmarks[hand_num]  
-            for id, lm in enumerate(myHand.landmark):
-                # Convert normalized landmarks to pixel coordinates
-                h, w, c = img.shape  # Get dimensions of the image
-                cx, cy = int(lm.x * w), int(lm.y * h)  # Convert landmark positions to pixel positions
-                self.lm_list.append([id, cx, cy])  # Store ID, x, and y positions
-
-                if draw:
+        if len(self.landmarks) > hand_num:
+            # Convert the normalized landmarks of the selected hand (based on hand_num) to pixel positions
+            myHand = self.findLandmarks(img)[hand_num]
+            # Store ID, x, and y positions
+            self.lm_list = np.column_stack((np.arange(21), myHand[:, :2])).tolist()
+
+            if draw:
+                for id, cx, cy in self.lm_list:
                     # Draw a small circle at each landmark point (for visualization)
                     cv2.circle(
                         img,
@@ -130,6 +308,79 @@ class handDetector:
 
         return fingers
 
+    def findLandmarks(self, img=None):
+        """
+        This method returns the landmarks of all detected hands as one NumPy array.
+        
+        Args:
+        - img: Image whose resolution the landmarks are mapped to (default is None, which keeps them normalized)
+        
+        Returns:
+        - landmarks: Array of shape (n_hands, 21, 3) holding (x, y, z) for every landmark of every hand;
+          int32 pixel coordinates if img is given (z is scaled like x), float32 normalized coordinates otherwise
+        """
+        if img is None:
+            return self.landmarks.copy()
+        h, w = img.shape[:2]
+        return (self.landmarks * np.array([w, h, w], np.float32)).astype(np.int32)
+
+    def fingersUp(self, landmarks=None):
+        """
+        Vectorized version of fingerStatus, for every hand at once.
+        
+        Args:
+        - landmarks: (n_hands, 21, 3) array from findLandmarks (default is None, which uses the last detection)
+        
+        Returns:
+        - fingers: uint8 array of shape (n_hands, 5), 1 where the finger (thumb, index, middle, ring, pinky) is up
+        """
+        if landmarks is None:
+            landmarks = self.landmarks
+        landmarks = np.asarray(landmarks)
+        tips = np.array(self.finger_tip_id)
+        fingers = np.empty((landmarks.shape[0], 5), np.uint8)
+        # Thumb: tip to the left of the knuckle-joint just below it (i)
+        fingers[:, 0] = landmarks[:, tips[0], 0] < landmarks[:, tips[0] - 1, 0]
+        # Other fingers: tip above the second knuckle, with the y-axis pointing down (ii)
+        fingers[:, 1:] = landmarks[:, tips[1:], 1] < landmarks[:, tips[1:] - 2, 1]
+        return fingers
+
+    def findHandedness(self):
+        """
+        Returns:
+        - labels: List with the "Left"/"Right" label of each hand, in the same order as findLandmarks
+        """
+        return list(self.handedness)
+
+    def findDistance(self, p1, p2, landmarks=None):
+        """
+        This method measures the distance between landmarks, for every hand at once.
+        
+        Args:
+        - p1, p2: Landmark ids (e.g. 4 and 8 for thumb and index tips), or equally long sequences of ids
+        - landmarks: (n_hands, 21, 3) array from findLandmarks (default is None, which uses the last detection)
+        
+        Returns:
+        - distances: Array of shape (n_hands,) for single ids, or (n_hands, len(p1)) for sequences, measured in the
+          (x, y) plane of the given landmarks (pixels or normalized units)
+        """
+        if landmarks is None:
+            landmarks = self.landmarks
+        landmarks = np.asarray(landmarks, np.float32)
+        return np.linalg.norm(landmarks[:, p1, :2] - landmarks[:, p2, :2], axis=-1)
+
+    def pairwiseDistances(self, ids=None, landmarks=None):
+        """
+        Returns:
+        - distances: Array of shape (n_hands, k, k) with the (x, y) distance between every pair of the given
+          landmark ids (default is None, which uses all 21 landmarks)
+        """
+        if landmarks is None:
+            landmarks = self.landmarks
+        landmarks = np.asarray(landmarks, np.float32)
+        points = landmarks[:, :, :2] if ids is None else landmarks[:, ids, :2]
+        return np.linalg.norm(points[:, :, None, :] - points[:, None, :, :], axis=-1)
+
 
 def main():
     cap = cv2.VideoCapture(0)  # Open the default camera (0 usually represents the first camera device)
@@ -2,155 +2,198 @@ import os
 import time
 
 import cv2
-import numpy as np
 
+from helpers import compositor as CP  # Incremental canvas compositing
+from helpers import encoder as EC  # JPEG encoding (optionally adaptive, on a worker pool)
+from helpers import frame_sources as FS  # Webcam / video file / image sequence / synthetic frame sources
+from helpers import instrumentation as IN  # Per-stage timing and FPS
+from helpers import painter as PT  # SELECT/PAINT gestures shared with app.py
+from helpers import persistence as PS  # Canvas checkpoints and crash recovery
+from helpers import strokes as SK  # Vector stroke log (undo, save/load, re-rendering at any size)
+from helpers import toolbar as TB  # Toolbar layout shared with app.py
 from helpers import track_hands as TH  # Importing the hand tracking module
 
 
 class VideoCamera():
-    def __init__(self, overlay_image=[], draw_color=(81, 242, 56)):
-        # Initialize video capture (webcam)
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        self.cap.set(3, 1280)  # Set the frame width
-        self.cap.set(4, 720)   # Set the frame height
-        self.xp = 0  # Previous x-coordinate for drawing
-        self.yp = 0  # Previous y-coordinate for drawing
-        self.x1 = 0  # Current x-coordinate for index finger
-        self.y1 = 0  # Current y-coordinate for index finger
-        self.x2 = 0  # Current x-coordinate for middle finger
-        self.y2 = 0  # Current y-coordinate for middle finger
+    def __init__(
+        self,
+        overlay_image=[],
+        draw_color=(81, 242, 56),
+        inference_width=640,
+        encoder=None,
+        source=None,
+        width=1280,
+        height=720,
+        track_every=1,
+        canvas_backend="dense",
+        canvas_file=None,
+        checkpoint_interval=10.0,
+    ):
+        self.width = width  # Width of the rendered frame
+        self.height = height  # Height of the rendered frame
+        # Initialize video capture (the webcam, unless another frame source is given)
+        self.cap = source if source is not None else FS.WebcamSource(0, width, height)
         self.brush_thickness = 15  # Thickness of the brush for drawing
         self.eraser_thickness = 100  # Thickness of the eraser
         self.overlay_image = overlay_image  # List of images to overlay (color palette)
-        self.draw_color = draw_color  # Initial drawing color (RGB)
+        # Toolbar layout shared with app.py, pre-resized for the frame width (uses overlay_image if given)
+        self.toolbar = TB.Toolbar(images=overlay_image).compile(width)
+        self.inference_width = inference_width  # Width of the frame given to hand detection (None = full frame)
+        self.encoder = encoder or EC.EncoderPool(workers=1)  # JPEG encoder (see helpers/encoder.py)
+        self.ended = False  # Set when the frame source has no more frames
+        self.last_encoded = None  # EncodedFrame of the last get_frame call (quality, size and encode latency)
+        self.instrumentation = IN.Instrumentation()  # Per-stage latency histograms and the render frame rate
+        self.show_stage_overlay = False  # Draw the per-stage latencies on the frame
         
         # Initialize hand detection using track_hands module with a minimum confidence level
-        self.detector = TH.handDetector(min_detection_confidence=0.85)
+        # (with track_every > 1, inference runs every track_every frames and optical flow follows the hand in between)
+        self.detector = TH.handDetector(min_detection_confidence=0.85, track_every=track_every)
         
-        # A blank canvas where drawing will be stored
-        self.image_canvas = np.zeros((720, 1280, 3), np.uint8)
-        
-        # Set the default overlay image (first one from the list)
-        self.default_overlay = overlay_image[0]
+        # A blank canvas where drawing will be stored, along with its ink mask
+        # ("dense", or "tiled" to allocate canvas memory only where there is ink), resumed from canvas_file if given
+        self.compositor = PS.open_compositor(width, height, canvas_backend, canvas_file)
+        self.image_canvas = getattr(self.compositor, "canvas", None)  # The tiled backend has no single canvas array
+
+        # The same drawing as vector strokes, for undo and export
+        self.strokes = SK.StrokeLog(width, height)
+        # Selected color and header, previous brush point and the SELECT/PAINT gestures, drawing on the canvas above
+        self.painter = PT.Painter(
+            width,
+            height,
+            draw_color=draw_color,
+            brush_thickness=self.brush_thickness,
+            eraser_thickness=self.eraser_thickness,
+            toolbar=self.toolbar,
+            compositor=self.compositor,
+            strokes=self.strokes,
+        )
+        self.canvas_dirty = False  # Set by undo(): the canvas is rebuilt from the strokes before the next composite
+
+        # Canvas changes since the last take_canvas_changes call, for delta streaming (helpers/delta_stream.py)
+        self.changed_rect = None  # Union of the rectangles strokes touched
+        self.canvas_reset = False  # Set when the whole canvas was replaced (undo)
+
+        # With a canvas_file, a background thread checkpoints the canvas every checkpoint_interval seconds
+        self.checkpointer = None
+        if canvas_file:
+            self.checkpointer = PS.CanvasCheckpointer(
+                self.compositor, interval=checkpoint_interval, canvas_path=canvas_file
+            ).start()
 
     def __del__(self):
-        # Release the webcam when the object is destroyed
+        # Release the webcam when the object is destroyed, after a last checkpoint of the canvas
+        if self.checkpointer is not None:
+            self.checkpointer.stop()
         self.cap.release()
 
     def set_overlay(self, frame, overlay_image):
         # Set the default overlay (header) image
-        self.default_overlay = overlay_image[0]
-        frame[0:125, 0:1280] = self.default_overlay  # Display the overlay image on top of the frame
+        self.painter.default_overlay = overlay_image[0]
+        frame[0:self.toolbar.height, 0:self.width] = self.painter.default_overlay  # Display the overlay image on top of the frame
         return frame
 
-    def get_frame(self, overlay_image, t_prev=0):
+    def undo(self):
+        """
+        Removes the last stroke; the canvas is rebuilt from the remaining ones before the next frame is composited.
+        """
+        if self.strokes.undo() is not None:
+            self.canvas_dirty = True
+
+    def take_canvas_changes(self):
+        """
+        Returns:
+        - (rect, reset): union (x0, y0, x1, y1) of the canvas rectangles changed since the last call (None if
+          nothing changed), and whether the whole canvas was replaced meanwhile
+        """
+        changes = self.changed_rect, self.canvas_reset
+        self.changed_rect = None
+        self.canvas_reset = False
+        return changes
+
+    def get_frame(self, overlay_image=None, t_prev=0):
+        """
+        Renders the next frame and encodes it as JPEG on the calling thread.
+
+        Returns:
+        - (jpeg bytes, time of this frame), or (None, t_prev) when the source has ended; quality, size and encode
+          latency are kept in self.last_encoded
+        """
+        frame, previousT = self.render_frame(t_prev)
+        if frame is None:
+            return None, previousT
+
+        # Encode the final frame as JPEG to be sent for rendering
+        with self.instrumentation.stage("encode"):
+            self.last_encoded = self.encoder.encode(frame)
+        return self.last_encoded.data, previousT
+
+    def render_frame(self, t_prev=0):
+        """
+        Captures, detects, paints and composites the next frame without encoding it, so the caller can hand it to
+        an encoder pool (see helpers/encoder.py) and move on to the next capture.
+
+        Returns:
+        - (composited BGR frame, time of this frame), or (None, t_prev) when the source has ended (a video file,
+          an image sequence or a synthetic source with a frame limit)
+        """
+        timer = self.instrumentation
+        timer.start()
+
         # Capture the current frame from the webcam
-        _, frame = self.cap.read()
+        ret, frame = self.cap.read()
+        if not ret:
+            self.ended = True
+            return None, t_prev
+        timer.lap("capture")
         frame = cv2.flip(frame, 1)  # Flip the frame horizontally (mirror effect)
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height))  # The camera may not support the requested size
+        timer.lap("flip")
         
-        # Set the header image (palette) at the top
-        frame[0:125, 0:1280] = self.default_overlay
-        
-        # Detect hands and find hand landmarks (without drawing landmarks on the frame)
-        frame = self.detector.findHands(frame, draw=True)
-        landmark_list = self.detector.findPosition(frame, draw=False)
+        # Detect hands on a downscaled copy of the camera frame (before the palette covers the top of it)
+        self.detector.findHands(frame, draw=False, inference_width=self.inference_width)
+        timer.lap("detect")
 
-        if len(landmark_list) != 0:
-            # Get the positions of the index finger (landmark 8) and middle finger (landmark 12)
-            self.x1, self.y1 = (landmark_list[8][1:])  # Index finger tip
-            self.x2, self.y2 = landmark_list[12][1:]  # Middle finger tip
-
-            # Get the status of fingers (which are up or down)
-            my_fingers = self.detector.fingerStatus()
-
-            # If both index and middle fingers are up, enter SELECT mode
-            if my_fingers[1] and my_fingers[2]:
-                # Reset previous drawing points
-                self.xp, self.yp = 0, 0
-
-                # If the hand is within the top color palette area, change the color
-                if self.y1 < 125:
-                    # Change color based on the x-position of the index finger
-                    if 355 < self.x1 < 460:
-                        self.default_overlay = overlay_image[0]
-                        frame[0:125, 0:1280] = self.default_overlay
-                        self.draw_color = (255, 255, 0)  # Aqua blue
-                    elif 475 < self.x1 < 560:
-                        self.default_overlay = overlay_image[1]
-                        self.draw_color = (47, 225, 245)  # Yellow
-                        frame[0:125, 0:1280] = self.default_overlay
-                    elif 610 < self.x1 < 685:
-                        self.default_overlay = overlay_image[2]
-                        self.draw_color = (197, 47, 245)  # Pink
-                        frame[0:125, 0:1280] = self.default_overlay
-                    elif 755 < self.x1 < 865:
-                        self.default_overlay = overlay_image[3]
-                        self.draw_color = (81, 242, 56)  # Bright leafy green
-                        frame[0:125, 0:1280] = self.default_overlay
-                    elif 1060 < self.x1 < 1220:
-                        self.default_overlay = overlay_image[4]
-                        self.draw_color = (0, 0, 0)  # Eraser (Black)
-                        frame[0:125, 0:1280] = self.default_overlay
-
-                # Display text for color selection mode
-                cv2.putText(frame, 'SELECT Mode', (900, 680), fontFace=cv2.FONT_HERSHEY_DUPLEX, color=(0, 255, 255), thickness=2, fontScale=0.9)
-
-                # Draw a line connecting index and middle fingers
-                cv2.line(frame, (self.x1, self.y1), (self.x2, self.y2), color=self.draw_color, thickness=3)
-
-            # If only the index finger is up, enter painting mode (drawing on canvas)
-            if my_fingers[1] and not my_fingers[2]:
-                cv2.putText(frame, "PAINT Mode", (900, 680), fontFace=cv2.FONT_HERSHEY_DUPLEX, color=(0, 255, 255), thickness=2, fontScale=0.9)
-                
-                # Draw a circle at the tip of the index finger (brush tip)
-                cv2.circle(frame, (self.x1, self.y1), 15, self.draw_color, thickness=-1)
-
-                # Reset previous points if not initialized
-                if self.xp == 0 and self.yp == 0:
-                    self.xp = self.x1
-                    self.yp = self.y1
-
-                # If using the eraser (draw_color is black), draw thicker lines
-                if self.draw_color == (0, 0, 0):
-                    cv2.line(frame, (self.xp, self.yp), (self.x1, self.y1), color=self.draw_color, thickness=self.eraser_thickness)
-                    cv2.line(self.image_canvas, (self.xp, self.yp), (self.x1, self.y1), color=self.draw_color, thickness=self.eraser_thickness)
-                else:
-                    # Draw lines with the brush color and thickness
-                    cv2.line(frame, (self.xp, self.yp), (self.x1, self.y1), color=self.draw_color, thickness=self.brush_thickness)
-                    cv2.line(self.image_canvas, (self.xp, self.yp), (self.x1, self.y1), color=self.draw_color, thickness=self.brush_thickness)
-
-                # Update previous points to current points
-                self.xp, self.yp = self.x1, self.y1
-
-        # Add the header image (color palette) at the top
-        frame[0:125, 0:1280] = self.default_overlay
-
-        # Convert the drawing canvas to grayscale and create an inverse mask
-        img_gray = cv2.cvtColor(self.image_canvas, cv2.COLOR_BGR2GRAY)
-        _, imginv = cv2.threshold(img_gray, 50, 255, cv2.THRESH_BINARY_INV)
-        imginv = cv2.cvtColor(imginv, cv2.COLOR_GRAY2BGR)
-
-        # Combine the frame with the drawing canvas using bitwise operations
-        frame = cv2.bitwise_and(frame, imginv)  # Mask the frame where drawing exists
-        frame = cv2.bitwise_or(frame, self.image_canvas)  # Add the drawing on top of the frame
-
-        # Calculate the FPS (Frames per second) for rendering performance display
-        currentT = time.time()
-        previousT = t_prev
-        fps = 1 / (currentT - previousT)
-        previousT = currentT
+        # Draw the hand and map the normalized landmarks to frame coordinates
+        frame = self.detector.drawHands(frame)
+        landmark_list = self.detector.findPosition(frame, draw=False)
+        timer.lap("landmarks")
+
+        # Gestures: pick a color in SELECT mode, paint in PAINT mode; the header (color palette) and the mode text
+        # go on top of the frame
+        my_fingers = self.detector.fingerStatus() if len(landmark_list) != 0 else []
+        self.painter.update(frame, landmark_list, my_fingers)
+        self.changed_rect = CP.union_rect(self.changed_rect, self.painter.changed_rect)
+        timer.lap("draw")
+
+        # After an undo, rebuild the canvas from the remaining strokes
+        if self.canvas_dirty:
+            self.compositor.load(self.strokes.render())
+            self.canvas_dirty = False
+            self.canvas_reset = True
+
+        # Put the drawing on top of the frame (only the inked area is touched)
+        frame = self.compositor.composite(frame)
+        timer.lap("composite")
+
+        # Calculate the FPS (Frames per second) from the time between rendered frames. t_prev is only kept for
+        # callers of the old API: the rate comes from the rolling frame intervals, so the first frame shows 0
+        # instead of dividing by zero.
+        timer.tick()
+        fps = timer.fps()
+        previousT = time.time()
 
         # Display the FPS on the screen
         cv2.putText(
             frame,
             "Render FPS:" + str(int(fps)),
-            (10, 685),
+            (10, self.height - 35),
             fontFace=cv2.FONT_HERSHEY_SIMPLEX,
             fontScale=0.8,
             color=(0, 0, 255),
             thickness=2,
         )
-        
-        # Encode the final frame as JPEG to be sent for rendering
-        _, jpeg = cv2.imencode('.jpg', frame)
-        return jpeg.tobytes(), previousT
+        if self.show_stage_overlay:
+            timer.draw_overlay(frame, origin=(10, self.toolbar.height + 30))
+
+        return frame, previousT
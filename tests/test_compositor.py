@@ -0,0 +1,62 @@
+"""
+Canvas backends (helpers/compositor.py): the tiled canvas must hold exactly the pixels the dense one does.
+"""
+import numpy as np
+import pytest
+
+from helpers import compositor as CP
+
+WIDTH, HEIGHT = 640, 360
+
+
+def draw_both(draw):
+    dense = CP.make_compositor(WIDTH, HEIGHT, "dense")
+    tiled = CP.make_compositor(WIDTH, HEIGHT, "tiled")
+    assert draw(dense) == draw(tiled)  # Same dirty rectangles
+    return dense, tiled
+
+
+def assert_same(dense, tiled):
+    assert np.count_nonzero(np.any(dense.to_array() != tiled.to_array(), axis=2)) == 0
+    assert np.array_equal(dense.patch(), tiled.patch())  # The ink masks too
+
+
+@pytest.mark.parametrize(
+    "pt1, pt2, thickness",
+    [
+        ((10, 10), (600, 300), 60),  # Thick, crosses the top and left borders
+        ((-50, 200), (700, 150), 25),  # Runs off both sides
+        ((320, -40), (330, 400), 15),  # Runs off the top and the bottom
+        ((630, 350), (700, 420), 40),  # Mostly off the canvas
+        ((100, 100), (500, 250), 1),  # Thin, inside
+        ((127, 0), (129, 359), 9),  # Along a tile border
+    ],
+)
+def test_line_matches_the_dense_canvas(pt1, pt2, thickness):
+    assert_same(*draw_both(lambda compositor: compositor.line(pt1, pt2, (255, 0, 255), thickness)))
+
+
+def test_random_strokes_and_erasing_match_the_dense_canvas():
+    rng = np.random.default_rng(0)
+    segments = [
+        (tuple(int(v) for v in rng.integers((-80, -80), (WIDTH + 80, HEIGHT + 80))),
+         tuple(int(v) for v in rng.integers((-80, -80), (WIDTH + 80, HEIGHT + 80))),
+         int(rng.integers(1, 70)))
+        for _ in range(200)
+    ]
+
+    def draw(compositor):
+        rects = []
+        for i, (pt1, pt2, thickness) in enumerate(segments):
+            color = (0, 0, 0) if i % 4 == 3 else (0, 200, 255)  # Every fourth segment erases
+            rects.append(compositor.line(pt1, pt2, color, thickness))
+        return rects
+
+    assert_same(*draw_both(draw))
+
+
+def test_lines_match_the_dense_canvas():
+    # The dense backend draws a batch with one polylines call, the tiled one segment by segment
+    path = [(-30, 20), (200, 340), (420, 10), (680, 200), (500, 390)]
+    segments = list(zip(path, path[1:]))
+    assert_same(*draw_both(lambda compositor: compositor.lines(segments, (255, 255, 0), 35)))
@@ -0,0 +1,55 @@
+"""
+Replays a recorded finger-tip path through the landmark filters (helpers/filters.py) and checks their jitter and lag.
+
+The recording is the synthetic trajectory of benchmarks/bench_filters.py (a figure eight with pauses, observed 60 ms
+late with 2.5 px of jitter), saved and loaded in the --replay format, so the true path is known.
+"""
+import numpy as np
+import pytest
+
+from benchmarks import bench_filters as BF
+from helpers import filters as FT
+
+LATENCY = 0.06
+SHIFTS = np.arange(-0.1, 0.25, 0.002)
+
+
+@pytest.fixture(scope="module")
+def recording(tmp_path_factory):
+    t, observed, truth, still = BF.synthetic_trajectory(latency=LATENCY, noise=2.5, seed=0)
+    path = tmp_path_factory.mktemp("replay") / "points.npy"
+    np.save(path, np.column_stack([t, observed]))
+    recorded = np.load(path)
+    return recorded[:, 0], recorded[:, 1:3], truth, still
+
+
+def jitter(t, output, still):
+    # Spread of the output around its mean within each pause, in pixels
+    pauses = np.floor(t[still] / 3.0)
+    return np.sqrt(np.mean([np.var(output[still][pauses == p], axis=0).sum() for p in np.unique(pauses)]))
+
+
+def run(recording, name, **params):
+    t, observed, truth, still = recording
+    output = BF.replay(FT.make_filter(name, **params), t, observed)
+    return jitter(t, output, still), BF.best_shift(t, output, truth, SHIFTS)
+
+
+def test_none_draws_the_raw_path(recording):
+    t, observed, _, _ = recording
+    output = BF.replay(FT.make_filter("none"), t, observed)
+    assert np.abs(output - observed).max() <= 1  # Only rounded to pixels
+
+
+def test_one_euro_reduces_jitter_with_little_lag(recording):
+    raw_jitter, raw_lag = run(recording, "none")
+    filtered_jitter, filtered_lag = run(recording, "one_euro")
+    assert raw_lag == pytest.approx(LATENCY, abs=0.005)
+    assert filtered_jitter < 0.6 * raw_jitter
+    assert filtered_lag - raw_lag < 0.015
+
+
+@pytest.mark.parametrize("name", ["one_euro", "kalman"])
+def test_lead_cancels_most_of_the_latency(recording, name):
+    _, lag = run(recording, name, lead=LATENCY)
+    assert abs(lag) < 0.025
@@ -0,0 +1,116 @@
+"""
+Painting (helpers/painter.py): single-hand gestures, hand ids across frames, and a stroke log that rebuilds the live
+canvas.
+"""
+import numpy as np
+
+from helpers import compositor as CP
+from helpers import painter as PT
+from helpers import strokes as SK
+from helpers import toolbar as TB
+
+WIDTH, HEIGHT = 640, 360
+PAINT = [0, 1, 0, 0, 0]  # Only the index finger up
+REST = [0, 0, 0, 0, 0]
+
+
+def hand(tip):
+    # Pixel landmarks of a hand pointing up with its index finger tip at tip (the palm 120 px below it)
+    landmarks = np.zeros((21, 3), np.int32)
+    landmarks[:, 0] = tip[0]
+    landmarks[:, 1] = tip[1] + 120
+    landmarks[8, :2] = tip
+    return landmarks
+
+
+def position(tip):
+    # The same hand as a findPosition landmark list: [ID, x, y] per landmark
+    return [[i, x, y] for i, (x, y, _) in enumerate(hand(tip).tolist())]
+
+
+def make_painter():
+    compositor = CP.make_compositor(WIDTH, HEIGHT, "dense")
+    painter = PT.MultiHandPainter(compositor, SK.StrokeLog(WIDTH, HEIGHT), TB.Toolbar().compile(WIDTH))
+    return painter, compositor
+
+
+def paint(painter, tips, fingers):
+    frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    hands = np.array([hand(tip) for tip in tips], np.int32).reshape(-1, 21, 3)
+    return painter.update(frame, hands, np.array(fingers, np.uint8).reshape(-1, 5), ["Right", "Left"][:len(tips)])
+
+
+def run(frames):
+    # frames: list of (brush tip, eraser tip or None); the first hand paints, the second one erases
+    painter, compositor = make_painter()
+    brushes = paint(painter, frames[0], [REST, REST])  # Both hands come in before they start painting
+    brushes[1].color = (0, 0, 0)
+    for brush_tip, eraser_tip in frames:
+        tips = [brush_tip] + ([eraser_tip] if eraser_tip is not None else [])
+        paint(painter, tips, [PAINT] * len(tips))
+    paint(painter, [], [])  # Both hands gone: every stroke ends
+    paint(painter, [], [])
+    return painter, compositor
+
+
+def assert_log_rebuilds_canvas(painter, compositor):
+    assert not painter.order
+    rebuilt = painter.stroke_log.render()
+    assert np.count_nonzero(np.any(rebuilt != compositor.to_array(), axis=2)) == 0
+
+
+def test_eraser_crossing_a_live_stroke_and_lifting_first():
+    # The brush paints left to right while the eraser crosses its path top to bottom, then the eraser leaves first
+    frames = [((100 + 20 * i, 200), (300, 140 + 10 * i)) for i in range(12)]
+    frames += [((340 + 20 * i, 200), None) for i in range(6)]
+    painter, compositor = run(frames)
+    assert_log_rebuilds_canvas(painter, compositor)
+    assert len(painter.stroke_log) >= 3  # The brush stroke was split around the eraser stroke
+
+
+def test_brush_painting_over_an_earlier_erased_area():
+    # The eraser goes through first, the brush paints across the erased area later, the eraser lifts last
+    frames = [((100 + 10 * i, 120), (300, 100 + 20 * i)) for i in range(10)]
+    frames += [((200 + 20 * i, 200), (500, 100)) for i in range(10)]
+    painter, compositor = run(frames)
+    assert_log_rebuilds_canvas(painter, compositor)
+
+
+def test_single_hand_strokes_are_not_split():
+    painter, compositor = make_painter()
+    for i in range(10):
+        paint(painter, [(100 + 20 * i, 200)], [PAINT])
+    paint(painter, [(300, 200)], [REST])
+    assert len(painter.stroke_log) == 1
+    assert_log_rebuilds_canvas(painter, compositor)
+
+
+def test_single_hand_painter_starts_a_new_stroke_after_pausing():
+    # Paint, rest and move the hand away, paint again: two strokes, and no segment joins them
+    painter = PT.Painter(WIDTH, HEIGHT)
+    frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    for i in range(5):
+        painter.update(frame, position((100 + 20 * i, 200)), PAINT)
+    painter.update(frame, position((400, 250)), REST)
+    for i in range(5):
+        painter.update(frame, position((400 + 20 * i, 250)), PAINT)
+    painter.update(frame, [], [])
+    assert len(painter.strokes) == 2
+    assert not painter.compositor.to_array()[200:250, 250:390].any()  # Nothing between the end of one and the other
+    assert np.count_nonzero(np.any(painter.strokes.render() != painter.compositor.to_array(), axis=2)) == 0
+
+
+def test_tracker_matches_past_a_too_far_pair():
+    # The left track is 150 px from the new hand, but the labels differ (cost 150 + 100); the right track is
+    # 210 px away with matching labels (cost 210), too far to match. The hand must still keep the left track's id.
+    tracker = PT.HandTracker(max_distance=200, handedness_penalty=0.5)
+    (left, right), _ = tracker.update([(0, 0), (360, 0)], ["Right", "Left"])
+    ids, _ = tracker.update([(150, 0)], ["Left"])
+    assert ids == [left]
+
+
+def test_tracker_keeps_ids_when_hands_come_in_another_order():
+    tracker = PT.HandTracker()
+    ids, _ = tracker.update([(100, 100), (500, 100)], ["Right", "Left"])
+    swapped, _ = tracker.update([(505, 100), (105, 100)], ["Left", "Right"])
+    assert swapped == ids[::-1]